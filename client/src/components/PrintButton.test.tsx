@@ -0,0 +1,113 @@
+import { describe, it, expect, beforeEach, afterEach, vi } from "vitest";
+import { render, screen, cleanup, act } from "@testing-library/react";
+import userEvent from "@testing-library/user-event";
+
+vi.mock("../lib/api", () => ({
+  printLabel: vi.fn(),
+  followPrintJob: vi.fn(),
+  batchPrint: vi.fn(),
+  cancelBatchPrint: vi.fn(),
+}));
+
+import { PrintButton } from "./PrintButton";
+import * as api from "../lib/api";
+import { useLabelStore } from "../state/useLabelStore";
+import { DEFAULT_FONT_SCALE, DEFAULT_MARGIN_PX } from "../lib/constants";
+
+const mockPrint = vi.mocked(api.printLabel);
+const mockFollow = vi.mocked(api.followPrintJob);
+
+const queued = {
+  status: "queued",
+  message: "Label queued (1 ahead of it).",
+  jobId: "job1",
+  queuePosition: 1,
+  etaSeconds: 4,
+  statusUrl: "/api/print/job1",
+};
+
+beforeEach(() => {
+  mockPrint.mockReset();
+  mockFollow.mockReset();
+  useLabelStore.setState({
+    widgets: [
+      {
+        id: "w1",
+        type: "text",
+        text: "Hello",
+        fontStyle: "regular",
+        fontScale: DEFAULT_FONT_SCALE,
+        frameWidthPx: 0,
+        align: "left",
+      },
+    ],
+    settings: {
+      tapeSizeMm: 12,
+      marginPx: DEFAULT_MARGIN_PX,
+      minLengthMm: 0,
+      justify: "center",
+      foregroundColor: "black",
+      backgroundColor: "white",
+      showMargins: false,
+      cutMark: false,
+    },
+    batch: {
+      copies: 1,
+      pauseTime: 0,
+      rows: [{ id: "r0", values: {} }],
+      selectedRowIndex: null,
+    },
+  });
+});
+
+afterEach(() => {
+  cleanup();
+});
+
+describe("PrintButton single prints", () => {
+  it("follows a queued print and shows that it failed", async () => {
+    mockPrint.mockResolvedValue(queued);
+    mockFollow.mockResolvedValue({ status: "error", message: "Tape jammed", jobId: "job1" });
+
+    render(<PrintButton />);
+    await userEvent.click(screen.getByRole("button", { name: /print label/i }));
+
+    expect(await screen.findByText("Tape jammed")).toBeInTheDocument();
+    expect(mockFollow).toHaveBeenCalledWith(
+      "/api/print/job1",
+      expect.any(Function),
+      expect.any(AbortSignal),
+    );
+    expect(screen.queryByText(queued.message)).not.toBeInTheDocument();
+  });
+
+  it("shows the queue position while waiting, then success", async () => {
+    let finish: (value: Awaited<ReturnType<typeof api.followPrintJob>>) => void = () => {};
+    mockPrint.mockResolvedValue(queued);
+    mockFollow.mockImplementation((_url, onProgress) => {
+      onProgress({ jobId: "job1", state: "queued", queuePosition: 1, etaSeconds: 4 });
+      return new Promise((resolve) => {
+        finish = resolve;
+      });
+    });
+
+    render(<PrintButton />);
+    await userEvent.click(screen.getByRole("button", { name: /print label/i }));
+
+    expect(await screen.findByRole("button", { name: /queued behind 1 job/i })).toBeDisabled();
+    await act(async () => {
+      finish({ status: "success", message: "Label sent to printer.", jobId: "job1" });
+    });
+    expect(await screen.findByText("Label sent to printer.")).toBeInTheDocument();
+  });
+
+  it("does not poll a print that finished within the request", async () => {
+    mockPrint.mockResolvedValue({ status: "success", message: "Label sent to printer." });
+
+    render(<PrintButton />);
+    await userEvent.click(screen.getByRole("button", { name: /print label/i }));
+
+    expect(await screen.findByText("Label sent to printer.")).toBeInTheDocument();
+    expect(mockFollow).not.toHaveBeenCalled();
+  });
+});
@@ -1,7 +1,12 @@
 import { useState, useRef, useEffect, useMemo } from "react";
 import { v4 as uuidv4 } from "uuid";
 import { useLabelStore } from "../state/useLabelStore";
-import { printLabel, batchPrint, cancelBatchPrint } from "../lib/api";
+import {
+  printLabel,
+  followPrintJob,
+  batchPrint,
+  cancelBatchPrint,
+} from "../lib/api";
 import type { BatchEvent } from "../lib/api";
 import { detectVariables } from "../lib/variables";
 
@@ -21,8 +26,8 @@ export function PrintButton() {
   const abortRef = useRef<AbortController | null>(null);
 
   // On unmount, abort the client-side SSE read AND tell the server to stop
-  // — otherwise the server-side print loop keeps running and the next mount
-  // will hit 409 until it finishes.
+  // — otherwise the server-side print loop keeps running and every later
+  // print to the same printer queues behind it until it finishes.
   useEffect(() => {
     return () => {
       abortRef.current?.abort();
@@ -53,7 +58,7 @@ export function PrintButton() {
         abortRef.current = controller;
         // Generate the jobId client-side so the unmount cleanup can cancel
         // the server-side batch immediately, even if it fires before the
-        // `started` SSE event arrives (which is the only place the server
+        // `queued` SSE event arrives (which is the first place the server
         // would otherwise echo back a server-chosen id).
         const jobId = uuidv4();
         jobIdRef.current = jobId;
@@ -66,6 +71,14 @@ export function PrintButton() {
           jobId,
           (event: BatchEvent) => {
             switch (event.event) {
+              case "queued":
+                if (event.position) {
+                  setStatus({
+                    type: "loading",
+                    message: `Queued behind ${event.position} job(s), ~${Math.ceil(event.etaSeconds ?? 0)}s...`,
+                  });
+                }
+                break;
               case "started":
                 setStatus({
                   type: "loading",
@@ -101,7 +114,26 @@ export function PrintButton() {
           controller.signal,
         );
       } else {
-        const result = await printLabel(widgets, settings);
+        let result = await printLabel(widgets, settings);
+        // "queued": accepted behind other work. Follow it to its real
+        // outcome, since the label can still fail or be cancelled.
+        if (result.status === "queued" && result.statusUrl) {
+          const controller = new AbortController();
+          abortRef.current = controller;
+          setStatus({ type: "loading", message: result.message });
+          result = await followPrintJob(
+            result.statusUrl,
+            (job) => {
+              setStatus({
+                type: "loading",
+                message: job.queuePosition
+                  ? `Queued behind ${job.queuePosition} job(s), ~${Math.ceil(job.etaSeconds ?? 0)}s...`
+                  : "Printing...",
+              });
+            },
+            controller.signal,
+          );
+        }
         if (result.status === "success") {
           setStatus({ type: "success", message: result.message });
         } else {
@@ -1,10 +1,12 @@
-import { describe, it, expect, vi, beforeEach } from "vitest";
+import { describe, it, expect, vi, beforeEach, afterEach } from "vitest";
 import {
   fetchPrinters,
   fetchPowerStatus,
   powerOn,
   powerOff,
   printLabel,
+  followPrintJob,
+  followBatchEvents,
   fetchServerPreview,
   uploadImage,
 } from "./api";
@@ -98,6 +100,194 @@ describe("printLabel", () => {
   });
 });
 
+describe("followPrintJob", () => {
+  beforeEach(() => {
+    vi.useFakeTimers();
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  function statusResponse(body: Record<string, unknown>) {
+    return { ok: true, status: 200, json: async () => body };
+  }
+
+  it("polls until the print is done", async () => {
+    mockFetch
+      .mockResolvedValueOnce(statusResponse({ jobId: "j1", state: "queued", queuePosition: 2, etaSeconds: 8 }))
+      .mockResolvedValueOnce(statusResponse({ jobId: "j1", state: "running" }))
+      .mockResolvedValueOnce(statusResponse({ jobId: "j1", state: "done" }));
+    const onProgress = vi.fn();
+
+    const promise = followPrintJob("/api/print/j1", onProgress);
+    await vi.runAllTimersAsync();
+
+    await expect(promise).resolves.toEqual({
+      status: "success",
+      message: "Label sent to printer.",
+      jobId: "j1",
+    });
+    expect(mockFetch).toHaveBeenCalledTimes(3);
+    expect(mockFetch).toHaveBeenCalledWith("/api/print/j1", { signal: undefined });
+    expect(onProgress.mock.calls.map(([job]) => job.state)).toEqual(["queued", "running"]);
+  });
+
+  it("reports a print that failed after it was queued", async () => {
+    mockFetch
+      .mockResolvedValueOnce(statusResponse({ jobId: "j2", state: "queued", queuePosition: 1 }))
+      .mockResolvedValueOnce(statusResponse({ jobId: "j2", state: "failed", message: "Tape jammed" }));
+
+    const promise = followPrintJob("/api/print/j2", vi.fn());
+    await vi.runAllTimersAsync();
+
+    await expect(promise).resolves.toEqual({ status: "error", message: "Tape jammed", jobId: "j2" });
+  });
+
+  it("reports a cancelled print as an error", async () => {
+    mockFetch.mockResolvedValueOnce(statusResponse({ jobId: "j3", state: "cancelled" }));
+
+    await expect(followPrintJob("/api/print/j3", vi.fn())).resolves.toEqual({
+      status: "error",
+      message: "Print was cancelled",
+      jobId: "j3",
+    });
+  });
+
+  it("retries after a network error", async () => {
+    mockFetch
+      .mockRejectedValueOnce(new TypeError("Failed to fetch"))
+      .mockResolvedValueOnce(statusResponse({ jobId: "j4", state: "done" }));
+
+    const promise = followPrintJob("/api/print/j4", vi.fn());
+    await vi.runAllTimersAsync();
+
+    await expect(promise).resolves.toMatchObject({ status: "success" });
+    expect(mockFetch).toHaveBeenCalledTimes(2);
+  });
+
+  it("throws when the server no longer knows the print", async () => {
+    mockFetch.mockResolvedValueOnce({ ok: false, status: 404, json: async () => ({}) });
+
+    await expect(followPrintJob("/api/print/gone", vi.fn())).rejects.toThrow(
+      "Print status is no longer available",
+    );
+  });
+});
+
+describe("followBatchEvents", () => {
+  beforeEach(() => {
+    vi.useFakeTimers();
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  // An SSE response whose body delivers `frames` as one chunk, then ends
+  // cleanly or (`drop`) fails like a connection cut mid-stream.
+  function sseResponse(frames: [number, Record<string, unknown>][], drop = false) {
+    const text = frames.map(([id, data]) => `id: ${id}\ndata: ${JSON.stringify(data)}\n\n`).join("");
+    let sent = false;
+    const body = new ReadableStream<Uint8Array>({
+      pull(controller) {
+        if (!sent) {
+          sent = true;
+          controller.enqueue(new TextEncoder().encode(`retry: 2000\n\n${text}`));
+        } else if (drop) {
+          controller.error(new TypeError("network error"));
+        } else {
+          controller.close();
+        }
+      },
+    });
+    return { ok: true, status: 200, body };
+  }
+
+  it("stops at the terminal event", async () => {
+    mockFetch.mockResolvedValueOnce(sseResponse([
+      [1, { event: "queued", position: 0 }],
+      [2, { event: "started", total: 1 }],
+      [3, { event: "done", total: 1 }],
+      [4, { event: "printed", index: 0 }],
+    ]));
+    const onProgress = vi.fn();
+
+    await followBatchEvents("/api/batch-print/b1/events", onProgress);
+
+    expect(onProgress.mock.calls.map(([e]) => e.event)).toEqual(["queued", "started", "done"]);
+    expect(mockFetch).toHaveBeenCalledTimes(1);
+    expect(mockFetch).toHaveBeenCalledWith("/api/batch-print/b1/events", {
+      headers: {},
+      signal: undefined,
+    });
+  });
+
+  it("reconnects a dropped stream from the last event id", async () => {
+    mockFetch
+      .mockResolvedValueOnce(sseResponse([
+        [1, { event: "queued", position: 0 }],
+        [2, { event: "started", total: 2 }],
+      ], true))
+      .mockResolvedValueOnce(sseResponse([
+        [3, { event: "printed", index: 0 }],
+        [4, { event: "error", index: 1, message: "jammed" }],
+      ]));
+    const onProgress = vi.fn();
+
+    const promise = followBatchEvents("/api/batch-print/b2/events", onProgress);
+    await vi.runAllTimersAsync();
+    await promise;
+
+    expect(mockFetch).toHaveBeenCalledTimes(2);
+    expect(mockFetch).toHaveBeenLastCalledWith("/api/batch-print/b2/events", {
+      headers: { "Last-Event-ID": "2" },
+      signal: undefined,
+    });
+    expect(onProgress.mock.calls.map(([e]) => e.event)).toEqual(["queued", "started", "printed", "error"]);
+  });
+
+  it("reconnects after a stream that ended without a terminal event", async () => {
+    // The server closes a stream after a while; the batch goes on.
+    mockFetch
+      .mockResolvedValueOnce(sseResponse([[1, { event: "queued", position: 3 }]]))
+      .mockResolvedValueOnce(sseResponse([[2, { event: "cancelled", printed: 0 }]]));
+    const onProgress = vi.fn();
+
+    const promise = followBatchEvents("/api/batch-print/b3/events", onProgress);
+    await vi.runAllTimersAsync();
+    await promise;
+
+    expect(mockFetch).toHaveBeenLastCalledWith("/api/batch-print/b3/events", {
+      headers: { "Last-Event-ID": "1" },
+      signal: undefined,
+    });
+    expect(onProgress).toHaveBeenLastCalledWith({ event: "cancelled", printed: 0 });
+  });
+
+  it("throws when the batch is no longer known", async () => {
+    mockFetch.mockResolvedValueOnce({ ok: false, status: 404 });
+
+    await expect(followBatchEvents("/api/batch-print/gone/events", vi.fn())).rejects.toThrow(
+      "Batch progress is no longer available",
+    );
+  });
+
+  it("stops retrying once the signal aborts", async () => {
+    const controller = new AbortController();
+    mockFetch.mockImplementation(async () => {
+      // Aborted while the server is unavailable.
+      controller.abort();
+      return { ok: false, status: 503 };
+    });
+
+    await expect(
+      followBatchEvents("/api/batch-print/b4/events", vi.fn(), controller.signal),
+    ).rejects.toThrow("Aborted");
+    expect(mockFetch).toHaveBeenCalledTimes(1);
+  });
+});
+
 describe("fetchServerPreview", () => {
   it("sends POST to /api/preview and returns object URL", async () => {
     const fakeBlob = new Blob(["fake-png"], { type: "image/png" });
@@ -8,6 +8,19 @@ import type {
 interface PrintResponse {
   status: string;
   message: string;
+  jobId?: string;
+  queuePosition?: number;
+  etaSeconds?: number;
+  statusUrl?: string;
+}
+
+export interface PrintJobStatus {
+  jobId: string;
+  state: "queued" | "running" | "done" | "failed" | "cancelled";
+  printer?: string;
+  queuePosition?: number;
+  etaSeconds?: number;
+  message?: string;
 }
 
 interface PrintersResponse {
@@ -19,10 +32,21 @@ interface PowerResponse extends PowerStatus {
 }
 
 export interface BatchEvent {
-  event: "started" | "printing" | "printed" | "done" | "cancelled" | "error";
+  event:
+    | "queued"
+    | "started"
+    | "printing"
+    | "printed"
+    | "done"
+    | "cancelled"
+    | "error";
   jobId?: string;
   index?: number;
   total?: number;
+  position?: number;
+  etaSeconds?: number;
+  printer?: string;
+  printerPrinted?: number;
   printed?: number;
   message?: string;
 }
@@ -39,6 +63,49 @@ export async function printLabel(
   return res.json() as Promise<PrintResponse>;
 }
 
+const PRINT_POLL_INTERVAL_MS = 1000;
+
+/**
+ * Poll a queued single print (a 202 from /api/print) until it finishes,
+ * reporting each still-pending status. Resolves with the print's real
+ * outcome: the label may yet fail, or be cancelled with the batch it
+ * was queued behind.
+ */
+export async function followPrintJob(
+  statusUrl: string,
+  onProgress: (status: PrintJobStatus) => void,
+  signal?: AbortSignal,
+): Promise<PrintResponse> {
+  while (true) {
+    let res: Response | null = null;
+    try {
+      res = await fetch(statusUrl, { signal });
+    } catch (err) {
+      if (signal?.aborted) throw err;
+      // Network error: retry below.
+    }
+
+    if (res?.status === 404) {
+      throw new Error("Print status is no longer available");
+    }
+    if (res?.ok) {
+      const job = (await res.json()) as PrintJobStatus;
+      switch (job.state) {
+        case "done":
+          return { status: "success", message: "Label sent to printer.", jobId: job.jobId };
+        case "failed":
+          return { status: "error", message: job.message ?? "Print error", jobId: job.jobId };
+        case "cancelled":
+          return { status: "error", message: "Print was cancelled", jobId: job.jobId };
+        default:
+          onProgress(job);
+      }
+    }
+
+    await delay(PRINT_POLL_INTERVAL_MS, signal);
+  }
+}
+
 export async function uploadImage(
   file: File,
 ): Promise<{ filename: string }> {
@@ -83,6 +150,16 @@ export async function fetchPrinters(): Promise<PrinterInfo[]> {
   return data.printers;
 }
 
+interface BatchStartResponse {
+  status: string;
+  jobId: string;
+  total: number;
+  events: string;
+}
+
+const TERMINAL_BATCH_EVENTS = new Set(["done", "cancelled", "error"]);
+const BATCH_RECONNECT_DELAY_MS = 2000;
+
 export async function batchPrint(
   widgets: LabelWidget[],
   settings: LabelSettings,
@@ -111,30 +188,91 @@ export async function batchPrint(
     throw new Error(message);
   }
 
-  const reader = res.body?.getReader();
-  if (!reader) throw new Error("No response body");
+  const started = (await res.json()) as BatchStartResponse;
+  await followBatchEvents(started.events, onProgress, signal);
+}
+
+function delay(ms: number, signal?: AbortSignal): Promise<void> {
+  return new Promise((resolve, reject) => {
+    // An abort that already fired won't fire its event again.
+    if (signal?.aborted) {
+      reject(new DOMException("Aborted", "AbortError"));
+      return;
+    }
+    const timer = setTimeout(resolve, ms);
+    signal?.addEventListener("abort", () => {
+      clearTimeout(timer);
+      reject(new DOMException("Aborted", "AbortError"));
+    });
+  });
+}
 
-  const decoder = new TextDecoder();
-  let buffer = "";
+/**
+ * Read a batch's progress stream until the batch finishes. The batch runs
+ * server-side regardless of this connection, so a dropped stream (flaky
+ * Wi-Fi, or the server's periodic stream rotation) is simply reopened with
+ * Last-Event-ID and picks up where it left off.
+ */
+export async function followBatchEvents(
+  url: string,
+  onProgress: (event: BatchEvent) => void,
+  signal?: AbortSignal,
+): Promise<void> {
+  let lastEventId = "";
 
   while (true) {
-    const { done, value } = await reader.read();
-    if (done) break;
-    buffer += decoder.decode(value, { stream: true });
-
-    const lines = buffer.split("\n");
-    buffer = lines.pop() ?? "";
-
-    for (const line of lines) {
-      if (line.startsWith("data: ")) {
-        try {
-          const event = JSON.parse(line.slice(6)) as BatchEvent;
-          onProgress(event);
-        } catch (err) {
-          console.warn("Malformed SSE data line:", line, err);
+    let res: Response | null = null;
+    try {
+      res = await fetch(url, {
+        headers: lastEventId ? { "Last-Event-ID": lastEventId } : {},
+        signal,
+      });
+    } catch (err) {
+      if (signal?.aborted) throw err;
+      // Network error: retry below.
+    }
+
+    if (res?.status === 404) {
+      throw new Error("Batch progress is no longer available");
+    }
+
+    const reader = res?.ok ? res.body?.getReader() : undefined;
+    if (reader) {
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let pendingId = "";
+
+      try {
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+
+          const lines = buffer.split("\n");
+          buffer = lines.pop() ?? "";
+
+          for (const line of lines) {
+            if (line.startsWith("id: ")) {
+              pendingId = line.slice(4);
+            } else if (line.startsWith("data: ")) {
+              try {
+                const event = JSON.parse(line.slice(6)) as BatchEvent;
+                lastEventId = pendingId;
+                onProgress(event);
+                if (TERMINAL_BATCH_EVENTS.has(event.event)) return;
+              } catch (err) {
+                console.warn("Malformed SSE data line:", line, err);
+              }
+            }
+          }
         }
+      } catch (err) {
+        if (signal?.aborted) throw err;
+        // Stream dropped mid-read: reconnect below.
       }
     }
+
+    await delay(BATCH_RECONNECT_DELAY_MS, signal);
   }
 }
 
@@ -0,0 +1,206 @@
+"""Admission control: per-route-class bulkheads and per-client rate limits.
+
+Every request runs on one of waitress's worker threads. Without limits,
+a burst of `/api/preview` renders from one busy tab, or a handful of
+long-lived batch progress streams, can hold all of them so that
+`/api/print` and `/api/batch-print/cancel` wait behind work that doesn't
+matter. `app.py` maps each route to a class (preview, print, stream,
+control, printer) and each class gets a `Bulkhead`: at most `limit` requests in
+flight, a short queue of up to `limit` more waiting at most
+`queue_timeout` seconds, and a 429 with `Retry-After` past that.
+`thread_budget()` sizes the server's thread pool so that every class
+can be full at once and unclassified requests (health, static files)
+still get a thread.
+
+`ClientRateLimiter` adds a token bucket per client address in front of
+the preview bulkhead, so one client typing fast can't use the whole
+preview class on its own.
+"""
+
+import collections
+import math
+import threading
+import time
+
+# Weight of the newest hold time in a class's average, used to suggest
+# a Retry-After to rejected clients.
+_HOLD_SMOOTHING = 0.2
+# Retry-After bounds (seconds). Streams hold their slot for minutes; a
+# client shouldn't be told to go away for that long.
+_MIN_RETRY_AFTER_SECONDS = 1
+_MAX_RETRY_AFTER_SECONDS = 30
+# Threads left over for requests outside every class.
+_UNCLASSIFIED_THREADS = 4
+# Rate limiter buckets kept at most; the least recently seen clients are
+# dropped first.
+_MAX_TRACKED_CLIENTS = 1024
+
+
+class Saturated(Exception):
+    """A request was refused; `retry_after` is a whole-second hint."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is saturated")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Permit:
+    """One admitted request's slot. `release()` is safe to call more than
+    once, so every exit path of a request can call it."""
+
+    def __init__(self, bulkhead: "Bulkhead", waited: float):
+        self.bulkhead = bulkhead
+        self.waited = waited
+        self.admitted_at = bulkhead._clock()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.bulkhead._release(self.bulkhead._clock() - self.admitted_at)
+
+
+class Bulkhead:
+    """Concurrency limit for one class of requests, with a bounded wait."""
+
+    def __init__(self, name: str, limit: int, queue_timeout: float, clock=time.monotonic):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = limit
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_last = 0.0
+        self._avg_hold = 0.0
+
+    def acquire(self) -> Permit:
+        """Take a slot, waiting up to `queue_timeout` for one to free up.
+        Raises `Saturated` if the queue is full or the wait times out."""
+        start = self._clock()
+        with self._cond:
+            if self.in_flight >= self.limit:
+                if self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise Saturated(self.name, self._retry_after())
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(
+                        lambda: self.in_flight < self.limit, self.queue_timeout
+                    )
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self.rejected += 1
+                    raise Saturated(self.name, self._retry_after())
+            self.in_flight += 1
+            waited = self._clock() - start
+            self.admitted += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._wait_last = waited
+        return Permit(self, waited)
+
+    def try_acquire(self) -> Permit:
+        """Take a slot only if one is free right now; never waits."""
+        with self._cond:
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                raise Saturated(self.name, self._retry_after())
+            self.in_flight += 1
+            self.admitted += 1
+            self._wait_last = 0.0
+        return Permit(self, 0.0)
+
+    def _release(self, held: float) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._avg_hold += _HOLD_SMOOTHING * (held - self._avg_hold)
+            self._cond.notify()
+
+    def _retry_after(self) -> int:
+        return min(
+            _MAX_RETRY_AFTER_SECONDS,
+            max(_MIN_RETRY_AFTER_SECONDS, math.ceil(self._avg_hold)),
+        )
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "inFlight": self.in_flight,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "waitMs": {
+                    "last": round(self._wait_last * 1000, 1),
+                    "avg": round(self._wait_total / self.admitted * 1000, 1) if self.admitted else 0.0,
+                    "max": round(self._wait_max * 1000, 1),
+                },
+            }
+
+
+class ClientRateLimiter:
+    """A token bucket per client: `rate` requests per second sustained,
+    bursts of up to `burst`. A `rate` of 0 disables limiting."""
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # client -> (tokens, updated_at), least recently seen first.
+        self._buckets: collections.OrderedDict[str, tuple[float, float]] = collections.OrderedDict()
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def take(self, client: str) -> int:
+        """Spend one token for `client`. Returns 0 if allowed, else the
+        whole seconds until a token will be available."""
+        if not self.enabled:
+            return 0
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[client] = (tokens - 1, now)
+                self._prune()
+                return 0
+            self._buckets[client] = (tokens, now)
+            self.limited += 1
+            return max(_MIN_RETRY_AFTER_SECONDS, math.ceil((1 - tokens) / self.rate))
+
+    def _prune(self) -> None:
+        while len(self._buckets) > _MAX_TRACKED_CLIENTS:
+            self._buckets.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ratePerSecond": self.rate,
+                "burst": self.burst,
+                "clients": len(self._buckets),
+                "limited": self.limited,
+            }
+
+
+def thread_budget(limits: dict[str, int]) -> int:
+    """Server threads needed for every class (`limits`: class -> limit)
+    to be full, queue included, with some left for unclassified
+    requests. Takes the configured limits rather than the bulkheads so
+    the server can size its pool before the app is imported."""
+    # Each bulkhead queues up to `limit` more behind its `limit` in flight.
+    return sum(2 * limit for limit in limits.values()) + _UNCLASSIFIED_THREADS
@@ -1,54 +1,89 @@
+import collections
+import functools
 import json
 import math
 import os
 import re
+import shutil
 import subprocess
+import sys
 import tempfile
 import threading
 import time
 import traceback
 import uuid
 
-from dotenv import load_dotenv
+if __name__ == "__main__":
+    # Started as a script: hand over to main.py, which loads .env and
+    # binds the port before importing this module (as `app`).
+    import main
 
-load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"))
+    main.run()
+    sys.exit()
 
-from flask import Flask, Response, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory
 from flask_cors import CORS
-from labelle.lib.constants import DEFAULT_MARGIN_PX
+from labelle.lib.constants import DEFAULT_MARGIN_PX, PIXELS_PER_MM
 from werkzeug.utils import secure_filename
 
+import admission
+import batch_journal
+import config
+import power_metrics
 import power_save
+import static_assets
 import usb_power
-from label_builder import paint_cut_mark_in_trailing_margin, preview_label, render_payload
-from printer_service import list_printers, print_bitmap, print_label
-
-# Seconds to wait after power-on before reading status, so the device has
-# time to re-enumerate on the USB bus.
-POWER_ON_SETTLE_SECONDS = 1.5
+from label_builder import (
+    RenderCache,
+    join_payloads,
+    paint_cut_mark_in_trailing_margin,
+    preview_label,
+    render_payload,
+)
+from batch_journal import BatchJournal
+from job_queue import JobGroup, PrintJob, PrintScheduler
+from printer_pool import PoolPlan
+from printer_service import (
+    POOL_PREFIX,
+    get_printer_pool,
+    healthy_pool_members,
+    is_known_printer,
+    list_printers,
+    print_bitmap,
+    print_label,
+    printer_readiness,
+    queue_key,
+    start_hotplug_monitor,
+    virtual_writer_stats,
+)
 
 # Routes that should NOT count as "activity" for the idle timer:
-# - /api/health: monitoring tools poll it constantly, would keep the
-#   printer awake forever
+# - /api/health, /api/ready: monitoring tools poll them constantly,
+#   would keep the printer awake forever
+# - /api/queue, /api/admission: status polling, same reason
 # - /api/power/*: manual control endpoints, shouldn't feed back into
 #   the auto-idle logic
-_POWER_SAVE_IGNORED_PATHS = ("/api/health",)
+_POWER_SAVE_IGNORED_PATHS = ("/api/health", "/api/ready", "/api/queue", "/api/admission")
 _POWER_SAVE_IGNORED_PREFIXES = ("/api/power/",)
 
-# Routes that need the printer to be powered on. The before_request
-# hook will block on a power-on for these if the saver has turned the
-# port off. Membership check uses exact equality (not prefix), so
-# /api/batch-print triggers wake-up but /api/batch-print/cancel
-# deliberately does not — cancelling shouldn't be gated on the
-# printer being awake.
+# Routes that talk to the printer over USB. The before_request hook
+# blocks on a power-on for these if the saver has turned the port off;
+# every other recorded request only starts the wake in the background
+# (previews and uploads render without the printer). Membership check
+# uses exact equality (not prefix), so /api/batch-print waits for the
+# wake but /api/batch-print/cancel deliberately does not — cancelling
+# shouldn't be gated on the printer being awake.
 _PRINTER_USING_PATHS = (
     "/api/print",
-    "/api/preview",
     "/api/printers",
-    "/api/upload-image",
     "/api/batch-print",
+    "/api/batch-print/resume",
 )
 
+# WSGI environ flag set by asgi.py once it has handled the power-on for
+# a printer-using request.
+POWER_READY_ENVIRON_KEY = "labelle.power_ready"
+
 app = Flask(__name__, static_folder=None)
 CORS(app)
 
@@ -59,6 +94,32 @@ UPLOAD_DIR = tempfile.mkdtemp(prefix="labelle-uploads-")
 _batch_jobs: dict[str, dict] = {}
 _batch_lock = threading.Lock()
 
+# Recent batches by job id, for progress streams and status. Running
+# batches always stay; only the newest BATCH_HISTORY_SIZE finished ones
+# are kept for late or reconnecting watchers.
+_batch_history: "collections.OrderedDict[str, JobGroup]" = collections.OrderedDict()
+BATCH_HISTORY_SIZE = 20
+
+# One FIFO queue + worker per printer: single prints and batches for the
+# same printer run in submission order, different printers concurrently.
+_scheduler = PrintScheduler()
+
+# A single print that starts right away is waited for up to this long,
+# so the usual case still answers with the print's outcome. One queued
+# behind other work (or slower than this) gets a 202 and is followed at
+# /api/print/<jobId>; the newest PRINT_HISTORY_SIZE are kept for that.
+PRINT_WAIT_SECONDS = 15
+_print_history: "collections.OrderedDict[str, PrintJob]" = collections.OrderedDict()
+PRINT_HISTORY_SIZE = 50
+
+# Comment line sent on idle SSE streams so proxies don't time out a batch
+# that's waiting in a long queue or sitting in a long pause.
+SSE_KEEPALIVE_SECONDS = 15
+# A progress stream ends after this long and the client reconnects with
+# Last-Event-ID, so no server thread is tied to one watcher for hours.
+SSE_STREAM_MAX_SECONDS = 300
+SSE_RETRY_MS = 2000
+
 # Caps for batch requests. Untrusted JSON otherwise; without these a client
 # could tie up the printer indefinitely and lock out every other batch run.
 MAX_BATCH_COPIES = 999
@@ -69,6 +130,101 @@ MAX_BATCH_PAUSE_SECONDS = 60
 # the product — 10000 × 60s would be ~7 days holding the print slot — so the
 # combined wall-clock budget caps that out at 8h.
 MAX_BATCH_DURATION_SECONDS = 8 * 3600
+# Caps for continuous-strip mode, where several consecutive labels are
+# joined into one bitmap and sent as a single print job.
+MAX_STRIP_LABELS = 100
+MAX_STRIP_LENGTH_MM = 1000
+
+
+# Admission classes by endpoint (see admission.py). Each class has its
+# own concurrency limit so previews can't starve prints, and cancelling
+# always has room. Printer listing and power control get a class of
+# their own ("printer"): they can block for a wake, a USB scan or
+# uhubctl, which must not hold the slots a cancel needs. Endpoints not listed —
+# health, queue and admission status, static files — are never limited.
+_ROUTE_CLASSES = {
+    "api_preview": "preview",
+    "api_upload_image": "preview",
+    "api_print": "print",
+    "api_batch_print": "print",
+    "api_batch_resume": "print",
+    "api_batch_events": "stream",
+    "api_batch_status": "control",
+    "api_print_status": "control",
+    "api_batch_cancel": "control",
+    "api_batch_resumable": "control",
+    "api_printers": "printer",
+    "api_power_status": "printer",
+    "api_power_on": "printer",
+    "api_power_off": "printer",
+}
+
+_admission_config = config.get_admission_config()
+_bulkheads = {
+    name: admission.Bulkhead(name, limit, _admission_config["queueTimeout"])
+    for name, limit in _admission_config["limits"].items()
+}
+_preview_limiter = admission.ClientRateLimiter(
+    _admission_config["previewRate"], _admission_config["previewBurst"]
+)
+
+
+def _too_many_requests(message: str, retry_after: int):
+    response = jsonify(status="error", message=message)
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+# Registered before the power-save hook so a refused request neither
+# counts as activity nor waits for a power-on.
+@app.before_request
+def _admit_request():
+    route_class = _ROUTE_CLASSES.get(request.endpoint)
+    if route_class is None:
+        return None
+    if request.endpoint == "api_preview":
+        retry_after = _preview_limiter.take(request.remote_addr or "")
+        if retry_after:
+            return _too_many_requests("Too many preview requests, slow down", retry_after)
+    try:
+        g.admission_permit = _bulkheads[route_class].acquire()
+    except admission.Saturated as e:
+        return _too_many_requests(f"Server busy ({route_class} requests), try again shortly", e.retry_after)
+    return None
+
+
+def _release_when_done(body, permit: admission.Permit):
+    try:
+        yield from body
+    finally:
+        permit.release()
+
+
+@app.after_request
+def _hand_off_admission_permit(response):
+    permit = g.pop("admission_permit", None)
+    if permit is None:
+        return response
+    response.headers["Server-Timing"] = (
+        f'admission;desc="{permit.bulkhead.name}";dur={permit.waited * 1000:.1f}'
+    )
+    if response.is_streamed:
+        # A stream holds its slot until the body is exhausted or the
+        # client goes away, not just until the view returns.
+        response.response = _release_when_done(response.response, permit)
+        response.call_on_close(permit.release)
+    else:
+        permit.release()
+    return response
+
+
+@app.teardown_request
+def _release_admission_permit(exc):
+    # Error paths that skipped after_request.
+    permit = g.pop("admission_permit", None)
+    if permit is not None:
+        permit.release()
 
 
 @app.before_request
@@ -79,33 +235,72 @@ def _track_activity_and_wake_printer():
     if any(path.startswith(p) for p in _POWER_SAVE_IGNORED_PREFIXES):
         return
     power_save.record_activity()
-    if path in _PRINTER_USING_PATHS:
-        try:
+    # The async server (asgi.py) has already woken the printer without
+    # tying up a thread for the settle delay.
+    if request.environ.get(POWER_READY_ENVIRON_KEY):
+        return
+    try:
+        if path in _PRINTER_USING_PATHS:
             power_save.ensure_powered()
-        except Exception:
-            # ensure_powered failures must not break the request — the
-            # downstream handler will fail loudly enough on its own if
-            # the printer really isn't there.
-            traceback.print_exc()
+        else:
+            power_save.start_wake()
+    except Exception:
+        # Wake failures must not break the request — the downstream
+        # handler will fail loudly enough on its own if the printer
+        # really isn't there.
+        traceback.print_exc()
+
+
+_background_started = False
+
+
+def start_background_services() -> None:
+    """Start the power-save idle checker and the USB hotplug monitor.
+
+    Called by the server entry points (main.py, asgi.py lifespan) once
+    the port is bound rather than at import, so importing the app —
+    tests, tooling — starts no threads. Safe to call more than once.
+    """
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+    power_save.start()
+    start_hotplug_monitor()
 
 
-power_save.start()
+def warm_up() -> None:
+    """Render a throwaway preview so fonts, render engines and the PNG
+    encoder are loaded before the first real preview asks for them."""
+    try:
+        preview_label([{"type": "text", "text": "Labelle"}], {"tapeSizeMm": 12})
+    except Exception:
+        traceback.print_exc()
 
 
 def _print_label_with_cut_mark(
-    widgets: list, settings: dict, printer_id: str | None
+    widgets: list,
+    settings: dict,
+    printer_id: str | None,
+    render_cache: RenderCache | None = None,
+    job: tuple[str, int] | None = None,
 ) -> None:
     """Print a label with a cut mark painted into its trailing margin.
 
     Renders the label normally then injects the dotted column into the
     already-allocated trailing blank — no extra tape consumed, dot
     sits in the middle of what would otherwise be the inter-label gap.
+    A cached bitmap is copied first so the mark never leaks into the
+    shared render (the batch's last label must stay unmarked).
     """
-    bitmap = render_payload(widgets, settings, upload_dir=UPLOAD_DIR)
+    if render_cache is not None:
+        bitmap = render_cache.payload(widgets, settings, upload_dir=UPLOAD_DIR).copy()
+    else:
+        bitmap = render_payload(widgets, settings, upload_dir=UPLOAD_DIR)
     paint_cut_mark_in_trailing_margin(
         bitmap, margin_px=settings.get("marginPx", DEFAULT_MARGIN_PX)
     )
-    print_bitmap(bitmap, settings, printer_id=printer_id, widgets=widgets)
+    print_bitmap(bitmap, settings, printer_id=printer_id, widgets=widgets, job=job)
 
 
 @app.route("/api/print", methods=["POST"])
@@ -118,12 +313,78 @@ def api_print():
     if not widgets or not isinstance(widgets, list) or len(widgets) == 0:
         return jsonify(status="error", message="No widgets provided"), 400
 
-    try:
+    # A single label sent to a pool goes to whichever member frees up first.
+    pool = get_printer_pool(printer_id)
+    if pool is not None:
+        members = healthy_pool_members(pool)
+        if not members:
+            return jsonify(
+                status="error",
+                message=f"No printers in pool {printer_id} are available",
+            ), 503
+        printer_id = min(members, key=_scheduler.eta)
+    elif not is_known_printer(printer_id):
+        return jsonify(status="error", message=f"Unknown printer: {printer_id}"), 400
+    key = queue_key(printer_id)
+
+    # Queue behind whatever the printer is already doing (e.g. a batch)
+    # instead of interleaving USB writes with it.
+    def run(job):
         print_label(widgets, settings, upload_dir=UPLOAD_DIR, printer_id=printer_id)
-        return jsonify(status="success", message="Label sent to printer.")
-    except Exception as e:
-        traceback.print_exc()
-        return jsonify(status="error", message=str(e)), 500
+        job.label_done()
+
+    job = PrintJob(run)
+    position, eta = _scheduler.submit(key, job)
+    _remember_print(job)
+    # The slot bounds request handling, not time spent waiting on the
+    # printer; holding it here would let a few prints queued behind a
+    # long batch lock out every other print request.
+    permit = g.get("admission_permit")
+    if permit is not None:
+        permit.release()
+    if position == 0 and job.wait(PRINT_WAIT_SECONDS):
+        if job.error is not None:
+            return jsonify(status="error", message=str(job.error), jobId=job.id), 500
+        return jsonify(
+            status="success",
+            message="Label sent to printer.",
+            jobId=job.id,
+            queuePosition=position,
+            etaSeconds=round(eta, 1),
+        )
+    return jsonify(
+        status="queued",
+        message=f"Label queued ({position} ahead of it)." if position else "Label is printing.",
+        jobId=job.id,
+        queuePosition=position,
+        etaSeconds=round(eta, 1),
+        statusUrl=f"/api/print/{job.id}",
+    ), 202
+
+
+def _remember_print(job: PrintJob) -> None:
+    with _batch_lock:
+        _print_history[job.id] = job
+        while len(_print_history) > PRINT_HISTORY_SIZE:
+            _print_history.popitem(last=False)
+
+
+@app.route("/api/print/<job_id>", methods=["GET"])
+def api_print_status(job_id):
+    """State of a single print: its position while queued, then its
+    outcome."""
+    with _batch_lock:
+        job = _print_history.get(job_id)
+    if job is None:
+        return jsonify(status="error", message="Job not found"), 404
+    body = {"jobId": job.id, "state": job.state, "printer": job.printer_key}
+    queued = _scheduler.position(job)
+    if queued is not None:
+        body["queuePosition"], eta = queued
+        body["etaSeconds"] = round(eta, 1)
+    if job.error is not None:
+        body["message"] = str(job.error)
+    return jsonify(body)
 
 
 @app.route("/api/preview", methods=["POST"])
@@ -220,8 +481,9 @@ def api_power_on():
         return err
     hub, port_num = port
     try:
-        usb_power.power_on(hub, port_num)
-        time.sleep(POWER_ON_SETTLE_SECONDS)
+        transition = usb_power.power_on(hub, port_num)
+        # Read status once the device is back on the bus.
+        usb_power.wait_until_enumerated(hub, port_num, transition=transition)
         status = usb_power.get_port_status(hub, port_num)
     except _POWER_ERRORS as e:
         return _power_error_response(e)
@@ -242,6 +504,13 @@ def api_power_off():
     return jsonify(status="success", hub=hub, port=port_num, **status)
 
 
+@app.route("/api/power/metrics", methods=["GET"])
+def api_power_metrics():
+    """Power transition history and aggregates (see power_metrics.py).
+    Memory only — no uhubctl."""
+    return jsonify(saver=power_save.is_enabled(), **power_metrics.log.stats())
+
+
 _VAR_PATTERN = re.compile(r"\{\{([\w-]+)\}\}")
 
 
@@ -266,56 +535,179 @@ def _substitute_widgets(widgets, values):
     return result
 
 
-@app.route("/api/batch-print", methods=["POST"])
-def api_batch_print():
-    data = request.get_json(silent=True) or {}
+def _parse_strip_options(data: dict):
+    """Validate the optional continuous-strip fields of a batch request.
+
+    Returns ((max_labels, max_length_px), None) on success — either may be
+    None when unset, and both None means strip mode is off — or
+    (None, error_response) on invalid input.
+    """
+    max_labels = None
+    raw_labels = data.get("stripLabels")
+    if raw_labels is not None:
+        if isinstance(raw_labels, bool) or not isinstance(raw_labels, (int, float)):
+            return None, (jsonify(status="error", message="stripLabels must be an integer"), 400)
+        if not math.isfinite(raw_labels) or not float(raw_labels).is_integer():
+            return None, (jsonify(status="error", message="stripLabels must be a finite integer"), 400)
+        max_labels = int(raw_labels)
+        if max_labels < 1 or max_labels > MAX_STRIP_LABELS:
+            return None, (
+                jsonify(
+                    status="error",
+                    message=f"stripLabels must be between 1 and {MAX_STRIP_LABELS}",
+                ),
+                400,
+            )
+
+    max_length_px = None
+    raw_length = data.get("stripMaxLengthMm")
+    if raw_length is not None:
+        if isinstance(raw_length, bool) or not isinstance(raw_length, (int, float)):
+            return None, (jsonify(status="error", message="stripMaxLengthMm must be a number"), 400)
+        if not math.isfinite(raw_length) or raw_length <= 0 or raw_length > MAX_STRIP_LENGTH_MM:
+            return None, (
+                jsonify(
+                    status="error",
+                    message=f"stripMaxLengthMm must be between 0 and {MAX_STRIP_LENGTH_MM} mm",
+                ),
+                400,
+            )
+        max_length_px = raw_length * PIXELS_PER_MM
+
+    return (max_labels, max_length_px), None
+
+
+class _StripRenderError(Exception):
+    """A label failed to render while a strip was being assembled."""
+
+    def __init__(self, index: int, cause: Exception):
+        super().__init__(str(cause))
+        self.index = index
+
+
+def _iter_strips(labels, widgets, settings, render_cache, max_labels, max_length_px):
+    """Group consecutive batch labels into strips of at most `max_labels`
+    labels and `max_length_px` total width.
+
+    `labels` yields (index, row_values) and is consumed lazily. Yields
+    ([indices], [substituted widgets], [payload bitmaps], more), where
+    `more` says whether another label follows this strip. A label wider
+    than the length cap on its own still gets a strip of one rather than
+    being dropped. If a label fails to render, the strip assembled so far
+    is yielded first so it can still print, then `_StripRenderError`
+    carries the failing label's index.
+    """
+    indices: list[int] = []
+    strip_widgets: list[list[dict]] = []
+    strip_bitmaps = []
+    width = 0
+    for idx, row_values in labels:
+        try:
+            substituted = _substitute_widgets(widgets, row_values)
+            bitmap = render_cache.payload(substituted, settings, upload_dir=UPLOAD_DIR)
+        except Exception as e:
+            if strip_bitmaps:
+                yield indices, strip_widgets, strip_bitmaps, True
+            raise _StripRenderError(idx, e) from e
+
+        full = max_labels is not None and len(strip_bitmaps) >= max_labels
+        too_long = max_length_px is not None and width + bitmap.width > max_length_px
+        if strip_bitmaps and (full or too_long):
+            yield indices, strip_widgets, strip_bitmaps, True
+            indices, strip_widgets, strip_bitmaps, width = [], [], [], 0
+        indices.append(idx)
+        strip_widgets.append(substituted)
+        strip_bitmaps.append(bitmap)
+        width += bitmap.width
+    if strip_bitmaps:
+        yield indices, strip_widgets, strip_bitmaps, False
+
+
+def _print_strip(
+    strip_widgets: list[list[dict]],
+    bitmaps: list,
+    settings: dict,
+    printer_id: str | None,
+    mark_last: bool,
+    job: tuple[str, int] | None = None,
+) -> None:
+    """Join a strip's labels into one bitmap and send it as a single job.
+
+    A cut mark separates every pair of labels inside the strip; the last
+    label is marked only when `mark_last` (another strip follows and the
+    user asked for cut marks). Cached renders are copied before painting.
+    `job` carries the strip's first label index.
+    """
+    margin_px = settings.get("marginPx", DEFAULT_MARGIN_PX)
+    marked = []
+    for i, bitmap in enumerate(bitmaps):
+        if i < len(bitmaps) - 1 or mark_last:
+            bitmap = bitmap.copy()
+            paint_cut_mark_in_trailing_margin(bitmap, margin_px=margin_px)
+        marked.append(bitmap)
+    print_bitmap(
+        join_payloads(marked),
+        settings,
+        printer_id=printer_id,
+        widgets=[w for label in strip_widgets for w in label],
+        job=job,
+    )
+
+
+def _parse_batch_request(data: dict):
+    """Validate a batch-print request body.
+
+    Returns (spec, None) with the normalised batch, or (None,
+    error_response) on invalid input. `spec["request"]` is the normalised
+    body itself: it's what the batch journal records, so a resumed batch
+    is re-validated exactly like a fresh one.
+    """
     widgets = data.get("widgets")
     settings = data.get("settings", {})
-    printer_id = settings.get("printerId")
     rows = data.get("rows", [])
 
     # Presence checks first: a user with both missing widgets and bad
     # copies should hear about the more fundamental problem first.
     if not widgets or not isinstance(widgets, list) or len(widgets) == 0:
-        return jsonify(status="error", message="No widgets provided"), 400
+        return None, (jsonify(status="error", message="No widgets provided"), 400)
     if not rows or not isinstance(rows, list):
-        return jsonify(status="error", message="No rows provided"), 400
+        return None, (jsonify(status="error", message="No rows provided"), 400)
     if len(rows) > MAX_BATCH_ROWS:
-        return jsonify(status="error", message=f"Too many rows (max {MAX_BATCH_ROWS})"), 400
+        return None, (jsonify(status="error", message=f"Too many rows (max {MAX_BATCH_ROWS})"), 400)
 
     raw_copies = data.get("copies", 1)
     # Reject bool (True/False are ints in Python) and non-integer numerics
     # like 1.9 — silent truncation is surprising for API consumers.
     if isinstance(raw_copies, bool):
-        return jsonify(status="error", message="copies must be an integer"), 400
+        return None, (jsonify(status="error", message="copies must be an integer"), 400)
     try:
         copies_float = float(raw_copies)
     except (TypeError, ValueError):
-        return jsonify(status="error", message="copies must be numeric"), 400
+        return None, (jsonify(status="error", message="copies must be numeric"), 400)
     if not math.isfinite(copies_float) or not copies_float.is_integer():
-        return jsonify(status="error", message="copies must be a finite integer"), 400
+        return None, (jsonify(status="error", message="copies must be a finite integer"), 400)
     copies = int(copies_float)
 
     raw_pause = data.get("pauseTime", 0)
     if isinstance(raw_pause, bool):
-        return jsonify(status="error", message="pauseTime must be a number"), 400
+        return None, (jsonify(status="error", message="pauseTime must be a number"), 400)
     try:
         pause_time = float(raw_pause)
     except (TypeError, ValueError):
-        return jsonify(status="error", message="pauseTime must be numeric"), 400
+        return None, (jsonify(status="error", message="pauseTime must be numeric"), 400)
     if not math.isfinite(pause_time):
-        return jsonify(status="error", message="pauseTime must be a finite number"), 400
+        return None, (jsonify(status="error", message="pauseTime must be a finite number"), 400)
 
     if copies < 1 or copies > MAX_BATCH_COPIES:
-        return jsonify(
+        return None, (jsonify(
             status="error",
             message=f"copies must be between 1 and {MAX_BATCH_COPIES}",
-        ), 400
+        ), 400)
     if pause_time < 0 or pause_time > MAX_BATCH_PAUSE_SECONDS:
-        return jsonify(
+        return None, (jsonify(
             status="error",
             message=f"pauseTime must be between 0 and {MAX_BATCH_PAUSE_SECONDS} seconds",
-        ), 400
+        ), 400)
 
     # Validate row shape up front so failures surface as clean 400s rather
     # than blowing up the SSE stream mid-print. Numeric values are coerced
@@ -326,143 +718,449 @@ def api_batch_print():
     normalised_rows = []
     for i, row in enumerate(rows):
         if not isinstance(row, dict):
-            return jsonify(status="error", message=f"Row {i + 1} must be an object"), 400
+            return None, (jsonify(status="error", message=f"Row {i + 1} must be an object"), 400)
         clean: dict[str, str] = {}
         for k, v in row.items():
             if isinstance(v, bool) or not isinstance(v, (str, int, float)):
-                return jsonify(
+                return None, (jsonify(
                     status="error",
                     message=f"Row {i + 1} field {k!r} must be a string or number",
-                ), 400
+                ), 400)
             clean[str(k)] = str(v)
         normalised_rows.append(clean)
     rows = normalised_rows
 
     total = len(rows) * copies
     if total > MAX_BATCH_TOTAL:
-        return jsonify(
+        return None, (jsonify(
             status="error",
             message=f"Batch too large: {total} labels (max {MAX_BATCH_TOTAL})",
-        ), 400
+        ), 400)
+
+    strip_options, err = _parse_strip_options(data)
+    if err:
+        return None, err
+    strip_max_labels, strip_max_length_px = strip_options
 
     pause_budget = total * pause_time
     if pause_budget > MAX_BATCH_DURATION_SECONDS:
-        return jsonify(
+        return None, (jsonify(
             status="error",
             message=(
                 f"Batch pause budget too long: {pause_budget:.0f}s "
                 f"(max {MAX_BATCH_DURATION_SECONDS}s = "
                 f"{MAX_BATCH_DURATION_SECONDS // 3600}h)"
             ),
-        ), 400
-
-    # Reserve the slot atomically here so concurrent requests get a
-    # consistent HTTP 409 + JSON error (instead of one client racing past
-    # the check and finding out via an SSE error frame later). Cleanup is
-    # registered on the Response via call_on_close so the slot is released
-    # even if the generator never iterates (e.g. client aborts before
-    # reading the body).
-    #
+        ), 400)
+
+    return {
+        "widgets": widgets,
+        "settings": settings,
+        "rows": rows,
+        "copies": copies,
+        "pause_time": pause_time,
+        "total": total,
+        "strip_max_labels": strip_max_labels,
+        "strip_max_length_px": strip_max_length_px,
+        "request": {
+            "widgets": widgets,
+            "settings": settings,
+            "rows": rows,
+            "copies": copies,
+            "pauseTime": pause_time,
+            "stripLabels": data.get("stripLabels"),
+            "stripMaxLengthMm": data.get("stripMaxLengthMm"),
+        },
+    }, None
+
+
+_JOB_ID_PATTERN = re.compile(r"[a-zA-Z0-9_-]{8,64}")
+
+
+def _image_files(widgets) -> list[str]:
+    """Upload file names used by a batch's image widgets."""
+    return sorted({
+        os.path.basename(widget["filename"])
+        for widget in widgets
+        if isinstance(widget, dict) and widget.get("type") == "image"
+        and isinstance(widget.get("filename"), str) and widget["filename"]
+    })
+
+
+def _restore_images(job_id: str, widgets):
+    """Put a resumed batch's images back into UPLOAD_DIR from its
+    journal's copies (uploads don't survive a restart). Returns an error
+    response if one is gone, rather than printing labels without it."""
+    for filename in _image_files(widgets):
+        target = os.path.join(UPLOAD_DIR, filename)
+        if os.path.isfile(target):
+            continue
+        saved = batch_journal.image_path(job_id, filename)
+        if saved is None:
+            return jsonify(
+                status="error",
+                message=f"Image {filename} used by this batch is no longer available",
+            ), 409
+        try:
+            shutil.copyfile(saved, target)
+        except OSError as e:
+            return jsonify(status="error", message=f"Could not restore image {filename}: {e}"), 500
+    return None
+
+
+@app.route("/api/batch-print", methods=["POST"])
+def api_batch_print():
+    data = request.get_json(silent=True) or {}
+    spec, err = _parse_batch_request(data)
+    if err:
+        return err
+
     # The client may provide its own jobId so it can request cancellation
-    # without waiting for the `started` SSE event (closes an unmount-race
+    # without waiting for the `queued` SSE event (closes an unmount-race
     # window). Server falls back to its own uuid if the client didn't
     # supply one. Accepted format: 8-64 chars of [a-zA-Z0-9_-].
     raw_job_id = data.get("jobId")
     if raw_job_id is not None:
-        if not isinstance(raw_job_id, str) or not re.fullmatch(r"[a-zA-Z0-9_-]{8,64}", raw_job_id):
+        if not isinstance(raw_job_id, str) or not _JOB_ID_PATTERN.fullmatch(raw_job_id):
             return jsonify(status="error", message="jobId must be 8-64 chars of [a-zA-Z0-9_-]"), 400
         job_id = raw_job_id
     else:
         job_id = uuid.uuid4().hex
 
+    return _start_batch(spec, job_id)
+
+
+def _start_batch(spec: dict, job_id: str, printed: frozenset[int] = frozenset()):
+    """Queue a validated batch; responds 202 with the job id and the URL
+    of its progress stream.
+
+    `printed` holds label indices already printed by an earlier run of
+    the same job (from its journal); those are skipped.
+    """
+    widgets = spec["widgets"]
+    settings = spec["settings"]
+    printer_id = settings.get("printerId")
+    rows = spec["rows"]
+    copies = spec["copies"]
+    pause_time = spec["pause_time"]
+    total = spec["total"]
+    strip_max_labels = spec["strip_max_labels"]
+    strip_max_length_px = spec["strip_max_length_px"]
+    strip_mode = strip_max_labels is not None or strip_max_length_px is not None
+
+    # A pool target splits the batch across its healthy members; any other
+    # target is a pool of one (the printer auto-select would pick, for
+    # printerId=None). Members are (queue key, printer id to print to).
+    pool = get_printer_pool(printer_id)
+    if pool is not None:
+        members = [(member, member) for member in healthy_pool_members(pool)]
+        if not members:
+            return jsonify(
+                status="error",
+                message=f"No printers in pool {printer_id} are available",
+            ), 503
+        strategy = pool["strategy"]
+    elif printer_id and printer_id.startswith(POOL_PREFIX):
+        return jsonify(status="error", message=f"Unknown printer pool: {printer_id}"), 400
+    elif not is_known_printer(printer_id):
+        return jsonify(status="error", message=f"Unknown printer: {printer_id}"), 400
+    else:
+        members = [(queue_key(printer_id), printer_id)]
+        strategy = "round-robin"
+
+    # Register the job id atomically so a duplicate submission gets a clean
+    # HTTP 409 + JSON error. Other batches no longer conflict: each printer
+    # has its own queue, and this job simply waits its turn on it.
+    entry = {"cancelled": False}
     with _batch_lock:
-        if _batch_jobs:
-            return jsonify(status="error", message="Another batch job is already running"), 409
-        _batch_jobs[job_id] = {"cancelled": False}
+        if job_id in _batch_jobs:
+            return jsonify(status="error", message=f"Batch job {job_id} is already running"), 409
+        _batch_jobs[job_id] = entry
 
     def _release_slot():
+        # Identity check: once released, the id may be reused by a new
+        # batch that this job must not unregister.
         with _batch_lock:
-            _batch_jobs.pop(job_id, None)
-
-    # Build print list: each row × copies
-    print_list = []
-    for row in rows:
-        for _ in range(copies):
-            print_list.append(row)
+            if _batch_jobs.get(job_id) is entry:
+                del _batch_jobs[job_id]
+
+    # Rows are handed out whole so every copy of a row prints on the same
+    # printer, back to back (row-major), whichever member takes it. Rows
+    # whose copies all printed in an earlier run are left out.
+    def _pending_copies(row_idx):
+        return [c for c in range(copies) if row_idx * copies + c not in printed]
+
+    plan = PoolPlan(
+        (r for r in range(len(rows)) if _pending_copies(r)),
+        [key for key, _ in members],
+        strategy,
+    )
 
-    def generate():
+    # Append-only record of the plan and every printed label, so the
+    # batch can be resumed after a restart.
+    if printed:
+        journal = BatchJournal.reopen(job_id, printer_id)
+    else:
+        journal = BatchJournal.create(job_id, spec["request"], images=[
+            path for path in (os.path.join(UPLOAD_DIR, name) for name in _image_files(widgets))
+            if os.path.isfile(path)
+        ])
+
+    # One render per distinct substituted label: copies and duplicate
+    # rows reuse the cached bitmap instead of re-running labelle's
+    # render engines for an identical result. Shared by all members.
+    render_cache = RenderCache()
+
+    def _member_labels(key):
+        """Yield (index, row_values, more) for each label `key` prints;
+        `more` says whether another label follows it on this printer.
+        Lazy, so a throughput-plan member only claims a row when it's
+        ready to print it."""
+        for row_idx in plan.rows_for(key):
+            pending = _pending_copies(row_idx)
+            for n, c in enumerate(pending):
+                more = n < len(pending) - 1 or plan.has_more(key)
+                yield row_idx * copies + c, rows[row_idx], more
+
+    def _send_label(target, idx, row_values, mark):
+        def send():
+            substituted = _substitute_widgets(widgets, row_values)
+            # Paint the cut mark into the trailing margin of every
+            # label except the printer's last — that gap is already
+            # there (labelle builds ~14 mm of trailing blank into each
+            # label's bitmap), so the dot lands in its centre with
+            # zero extra tape.
+            if mark:
+                _print_label_with_cut_mark(substituted, settings, target, render_cache, (job_id, idx))
+            else:
+                print_label(
+                    substituted, settings, upload_dir=UPLOAD_DIR,
+                    printer_id=target, render_cache=render_cache, job=(job_id, idx),
+                )
+        return send
+
+    def _batch_print_jobs(key, target):
+        """Yield ([indices], more, send) per printer job: one label each
+        normally, or a run of consecutive labels in strip mode."""
+        cut_mark = bool(settings.get("cutMark"))
+        if not strip_mode:
+            for idx, row_values, more in _member_labels(key):
+                yield [idx], more, _send_label(target, idx, row_values, cut_mark and more)
+            return
+        strips = _iter_strips(
+            ((idx, row_values) for idx, row_values, _ in _member_labels(key)),
+            widgets, settings, render_cache,
+            strip_max_labels, strip_max_length_px,
+        )
         try:
-            yield f"data: {json.dumps({'event': 'started', 'jobId': job_id, 'total': total})}\n\n"
-
-            for idx, row_values in enumerate(print_list):
+            for indices, strip_widgets, bitmaps, more in strips:
+                yield indices, more, functools.partial(
+                    _print_strip, strip_widgets, bitmaps, settings, target, cut_mark and more,
+                    (job_id, indices[0]),
+                )
+        except _StripRenderError as e:
+            # Surface the render failure as that label's print failure so
+            # the stream reports the same `error` event as non-strip mode.
+            cause = e.__cause__
+
+            def fail():
+                raise cause
+            yield [e.index], False, fail
+
+    def _runner(key, target):
+        def run(job):
+            """Print this member's share on its queue worker, streaming
+            progress into the batch's event log."""
+            started = {"event": "started", "jobId": job_id, "total": total, "printer": key}
+            if printed:
+                started["alreadyPrinted"] = len(printed)
+            job.emit(started)
+
+            for indices, more, send in _batch_print_jobs(key, target):
                 # Lockless read of the cancellation flag is intentional:
                 # dict.get and single-field reads are atomic under CPython's
                 # GIL, and this runs on every iteration. Writes (in the
                 # cancel endpoint) take _batch_lock to serialize against
                 # other writers, but readers don't need it.
-                job = _batch_jobs.get(job_id, {})
-                if job.get("cancelled"):
-                    yield f"data: {json.dumps({'event': 'cancelled', 'printed': idx})}\n\n"
+                if entry.get("cancelled"):
+                    job.state = "cancelled"
                     return
 
-                yield f"data: {json.dumps({'event': 'printing', 'index': idx, 'total': total})}\n\n"
+                for i in indices:
+                    job.emit({"event": "printing", "index": i, "total": total, "printer": key})
 
                 # Keep the idle timer happy while a long batch runs — the
-                # initial before_request fires once, but the SSE stream
+                # initial before_request fires once, but the batch
                 # outlives it.
                 power_save.record_activity()
 
                 try:
-                    substituted = _substitute_widgets(widgets, row_values)
-                    # Paint the cut mark into the trailing margin of every
-                    # label except the last — that gap is already there
-                    # (labelle builds ~14 mm of trailing blank into each
-                    # label's bitmap), so the dot lands in its centre with
-                    # zero extra tape.
-                    if idx < total - 1 and settings.get("cutMark"):
-                        _print_label_with_cut_mark(substituted, settings, printer_id)
-                    else:
-                        print_label(substituted, settings, upload_dir=UPLOAD_DIR, printer_id=printer_id)
+                    send()
                 except Exception as e:
-                    traceback.print_exc()
-                    yield f"data: {json.dumps({'event': 'error', 'index': idx, 'message': str(e)})}\n\n"
-                    return
-
-                yield f"data: {json.dumps({'event': 'printed', 'index': idx, 'total': total})}\n\n"
-
-                # Pause between prints (except after last). Use monotonic
-                # deadline so the actual elapsed time matches pause_time
-                # regardless of clock skew or fractional sleep durations.
-                if pause_time > 0 and idx < total - 1:
+                    job.emit({
+                        "event": "error", "index": indices[0], "message": str(e), "printer": key,
+                    })
+                    # One failed printer stops the whole batch, pooled or not.
+                    entry["cancelled"] = True
+                    raise
+
+                journal.printed(indices)
+                job.label_done(len(indices))
+                for i in indices:
+                    job.emit({
+                        "event": "printed", "index": i, "total": total,
+                        "printer": key, "printerPrinted": job.completed,
+                    })
+
+                # Pause between print jobs (except after this printer's
+                # last). Use monotonic deadline so the actual elapsed time
+                # matches pause_time regardless of clock skew or fractional
+                # sleep durations.
+                if pause_time > 0 and more:
                     deadline = time.monotonic() + pause_time
                     while True:
                         remaining = deadline - time.monotonic()
                         if remaining <= 0:
                             break
-                        if _batch_jobs.get(job_id, {}).get("cancelled"):
-                            yield f"data: {json.dumps({'event': 'cancelled', 'printed': idx + 1})}\n\n"
+                        if entry.get("cancelled"):
+                            job.state = "cancelled"
                             return
                         time.sleep(min(0.1, remaining))
+        return run
+
+    def _finish(group, state):
+        if state == "done":
+            group.emit({"event": "done", "total": total})
+        elif state == "cancelled":
+            group.emit({"event": "cancelled", "printed": group.completed})
+        # "failed": the part that failed already emitted its `error` event.
+        journal.finish(state)
+        render_cache.clear()
+        _release_slot()
+
+    # Every part is added before any is submitted, so a part that
+    # finishes instantly can't complete the group on its own.
+    group = JobGroup(job_id, on_finish=_finish, labels=total)
+    group.completed = len(printed)
+    parts = []
+    for key, target in members:
+        # Only the copies still to print: a resumed batch skips rows (and
+        # copies of a row) that printed before.
+        labels = plan.share(key, lambda row_idx: len(_pending_copies(row_idx)))
+        if labels == 0:
+            continue  # more round-robin members than rows
+        parts.append((key, group.add(PrintJob(
+            _runner(key, target),
+            labels=labels,
+            pause_seconds=pause_time * (labels - 1),
+            kind="batch",
+        ))))
+    entry["group"] = group
+    _remember_batch(group)
+    queue = []
+    for key, part in parts:
+        position, eta = _scheduler.submit(key, part)
+        queue.append({"printer": key, "position": position, "etaSeconds": round(eta, 1)})
+
+    # The batch now runs on the printers' queue workers, independent of
+    # this request. Progress is a separate, reconnectable stream.
+    return jsonify(
+        status="queued",
+        jobId=job_id,
+        total=total,
+        queue=queue,
+        events=f"/api/batch-print/{job_id}/events",
+    ), 202
+
+
+def _remember_batch(group: JobGroup) -> None:
+    """Keep a batch's event log reachable for progress streams, including
+    for a while after it finishes so a reconnecting client can still
+    replay how it ended."""
+    with _batch_lock:
+        _batch_history[group.id] = group
+        _batch_history.move_to_end(group.id)
+        finished = [job_id for job_id, g in _batch_history.items() if g.finished]
+        for job_id in finished[: max(0, len(finished) - BATCH_HISTORY_SIZE)]:
+            del _batch_history[job_id]
+
+
+def _last_event_id() -> int:
+    """Sequence number the client already has: the `Last-Event-ID` header
+    a reconnecting EventSource sends, or a `lastEventId` query parameter
+    for clients that can't set headers."""
+    raw = request.headers.get("Last-Event-ID") or request.args.get("lastEventId") or "0"
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+
+@app.route("/api/batch-print/<job_id>/events", methods=["GET"])
+def api_batch_events(job_id):
+    with _batch_lock:
+        group = _batch_history.get(job_id)
+    if group is None:
+        return jsonify(status="error", message="Job not found"), 404
+    after = _last_event_id()
 
-            yield f"data: {json.dumps({'event': 'done', 'total': total})}\n\n"
-        finally:
-            _release_slot()
+    def generate():
+        # Tell EventSource how soon to reconnect when the stream drops.
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        seq = after
+        deadline = time.monotonic() + SSE_STREAM_MAX_SECONDS
+        while True:
+            # Read `finished` before fetching: once it's true, the fetch
+            # below is guaranteed to include the batch's final events.
+            finished = group.finished
+            events = group.events_after(seq, timeout=SSE_KEEPALIVE_SECONDS)
+            for seq, event in events:
+                yield f"id: {seq}\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                return
+            # Hand the server thread back now and then; the client resumes
+            # from the last id it saw. Closing never affects the batch.
+            if time.monotonic() >= deadline:
+                return
+            if not events:
+                yield ": keepalive\n\n"
 
     response = Response(generate(), mimetype="text/event-stream")
     # Disable proxy/server buffering so progress events stream to the client
     # in real time instead of arriving in one chunk at the end.
     response.headers["Cache-Control"] = "no-cache"
     response.headers["X-Accel-Buffering"] = "no"
-    # Defence-in-depth cleanup: if the WSGI layer closes the response before
-    # generate() ever iterates (e.g. client aborts pre-iteration), this fires
-    # and releases the slot. Both paths are idempotent via pop(default=None).
-    # On normal completion, the generator's finally runs first and pops; the
-    # trailing call_on_close is a no-op. _release_slot closes over this job's
-    # id, so a new batch submitted between the two events isn't affected.
-    response.call_on_close(_release_slot)
     return response
 
 
+@app.route("/api/batch-print/<job_id>", methods=["GET"])
+def api_batch_status(job_id):
+    """Point-in-time batch status, for watchers that don't want a stream."""
+    with _batch_lock:
+        group = _batch_history.get(job_id)
+    if group is None:
+        return jsonify(status="error", message="Job not found"), 404
+    return jsonify(
+        jobId=group.id,
+        state=group.state,
+        total=group.labels,
+        printed=group.completed,
+        printers=group.part_states(),
+        lastEventId=group.last_event_id,
+    )
+
+
+def _cancel_batch(entry: dict) -> None:
+    """Flag a batch as cancelled. Parts still waiting in a printer's queue
+    are dropped right away rather than when they reach the front; running
+    parts stop at their next cancellation check."""
+    entry["cancelled"] = True
+    group = entry.get("group")
+    if group is not None:
+        for part in group.parts:
+            _scheduler.cancel(part)
+
+
 @app.route("/api/batch-print/cancel", methods=["POST"])
 def api_batch_cancel():
     data = request.get_json(silent=True) or {}
@@ -477,9 +1175,79 @@ def api_batch_cancel():
             return jsonify(status="error", message="Job not found"), 404
         job["cancelled"] = True
 
+    _cancel_batch(job)
     return jsonify(status="ok")
 
 
+@app.route("/api/batch-print/resumable", methods=["GET"])
+def api_batch_resumable():
+    """Journaled batches that didn't finish (cancelled, failed, or cut
+    short by a restart), newest first."""
+    running = set(_batch_jobs)
+    return jsonify(jobs=[
+        job for job in batch_journal.list_resumable() if job["jobId"] not in running
+    ])
+
+
+@app.route("/api/batch-print/resume", methods=["POST"])
+def api_batch_resume():
+    data = request.get_json(silent=True) or {}
+    job_id = data.get("jobId")
+
+    if not job_id or not isinstance(job_id, str):
+        return jsonify(status="error", message="jobId is required"), 400
+    if not _JOB_ID_PATTERN.fullmatch(job_id):
+        return jsonify(status="error", message="jobId must be 8-64 chars of [a-zA-Z0-9_-]"), 400
+
+    # A USB printer's id includes its bus address, which changes when it
+    # re-enumerates (reboot, replug, power-save wake); `printerId` points
+    # the rest of the batch at the printer as it's now known.
+    printer_id = data.get("printerId")
+    if printer_id is not None and not isinstance(printer_id, str):
+        return jsonify(status="error", message="printerId must be a string"), 400
+
+    record = batch_journal.load(job_id)
+    if record is None:
+        return jsonify(status="error", message="No resumable batch with that jobId"), 404
+
+    batch = record["request"]
+    if "printerId" in data:
+        settings = batch.get("settings")
+        batch = {**batch, "settings": {**(settings if isinstance(settings, dict) else {}), "printerId": printer_id}}
+    spec, err = _parse_batch_request(batch)
+    if err:
+        return err
+    printed = frozenset(i for i in record["printed"] if 0 <= i < spec["total"])
+    if len(printed) >= spec["total"]:
+        # Every label printed but the server stopped before recording the
+        # end; nothing left to do.
+        batch_journal.discard(job_id)
+        return jsonify(status="error", message="Batch already finished printing"), 409
+    err = _restore_images(job_id, spec["widgets"])
+    if err:
+        return err
+
+    # Continues the same job id and journal; its progress stream looks
+    # like a fresh batch's, minus the labels that already printed.
+    return _start_batch(spec, job_id, printed=printed)
+
+
+@app.route("/api/queue", methods=["GET"])
+def api_queue():
+    """Per-printer queue state: running job, waiting jobs, measured rate,
+    plus write-behind virtual printers' file queues."""
+    return jsonify(queues=_scheduler.snapshot(), writers=virtual_writer_stats())
+
+
+@app.route("/api/admission", methods=["GET"])
+def api_admission():
+    """Per-class load and queue wait, plus preview rate limiting."""
+    return jsonify(
+        classes={name: bulkhead.stats() for name, bulkhead in _bulkheads.items()},
+        previewRateLimit=_preview_limiter.stats(),
+    )
+
+
 def _build_info() -> dict:
     """Return {commit, branch} from env vars (set at Docker build time) or git."""
     info = {}
@@ -505,35 +1273,87 @@ def _build_info() -> dict:
         return {}
 
 
-@app.route("/api/health", methods=["GET"])
-def api_health():
+@functools.cache
+def _app_info() -> dict:
+    """Version plus build info. Computed once: monitoring polls the health
+    endpoints every few seconds, and neither package.json nor the git
+    checkout changes while the server runs."""
     pkg_path = os.path.join(os.path.dirname(__file__), "..", "package.json")
     with open(pkg_path) as f:
         version = json.load(f)["version"]
+    return {"version": version, **_build_info()}
+
 
-    return jsonify(status="ok", version=version, **_build_info())
+_app_info()
+
+
+@app.route("/api/health", methods=["GET"])
+def api_health():
+    """Liveness: the process is up and serving. No I/O."""
+    return jsonify(status="ok", **_app_info())
+
+
+@app.route("/api/ready", methods=["GET"])
+def api_ready():
+    """Readiness from cached state only — no USB scan, no uhubctl.
+
+    Not ready (503) only when nothing could print: no virtual printers,
+    the last scan found no USB printer, and the printer's port isn't
+    known to be switched off (a powered-off printer wakes on demand).
+    An unknown state counts as ready.
+    """
+    printers = printer_readiness()
+    power = usb_power.cached_power_state()
+    queues = _scheduler.snapshot()
+    ready = not (
+        printers["virtualPrinters"] == 0
+        and printers["usbPrinters"] == 0
+        and power["powered"] is not False
+    )
+    return jsonify(
+        status="ready" if ready else "not_ready",
+        printers=printers,
+        power={"saver": power_save.is_enabled(), **power},
+        queue={
+            "printers": len(queues),
+            "running": sum(1 for q in queues.values() if q["running"] is not None),
+            "queued": sum(len(q["queued"]) for q in queues.values()),
+        },
+        **_app_info(),
+    ), 200 if ready else 503
 
 
 # --- Static file serving for production (SPA fallback) ---
 
 
+# Built once: the bundle doesn't change while the server runs.
+_static_manifest = static_assets.build_manifest(DIST_DIR)
+
+
+def _serve_asset(asset: static_assets.Asset):
+    encoding, body, etag = asset.negotiate(request.accept_encodings.quality)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=asset.mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = asset.cache_control
+    if asset.variants:
+        response.vary.add("Accept-Encoding")
+    return response
+
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_static(path):
-    # Try to serve the requested file from dist-client
-    full_path = os.path.join(DIST_DIR, path)
-    if path and os.path.isfile(full_path):
-        return send_from_directory(DIST_DIR, path)
+    # Serve the requested file from the in-memory dist-client manifest
+    asset = _static_manifest.get(path) if path else None
+    if asset is not None:
+        return _serve_asset(asset)
     # SPA fallback: serve index.html for all other routes
-    index = os.path.join(DIST_DIR, "index.html")
-    if os.path.isfile(index):
-        return send_from_directory(DIST_DIR, "index.html")
+    index = _static_manifest.get("index.html")
+    if index is not None:
+        return _serve_asset(index)
     return "Client not built. Run 'npm run build' first.", 404
-
-
-if __name__ == "__main__":
-    from waitress import serve
-
-    port = int(os.environ.get("PORT", 5000))
-    print(f"Labelle server running at http://0.0.0.0:{port}")
-    serve(app, host="0.0.0.0", port=port)
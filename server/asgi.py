@@ -0,0 +1,353 @@
+"""Optional asyncio serving mode (`SERVER_MODE=async`).
+
+Under waitress every open batch progress stream, and every request that
+has to wait out a printer power-on, holds a worker thread for as long as
+it lasts. This module is an ASGI application that removes those waits
+from the thread pool:
+
+- `GET /api/batch-print/<jobId>/events` is served natively on the event
+  loop. It listens to the batch's event log (`JobGroup.add_listener`)
+  rather than parking a thread in `events_after()`.
+- Printer-using requests that find the port powered off wait for the
+  background wake (`power_save.start_wake()`) by polling it with
+  `asyncio.sleep`. The Flask hook then skips its own `ensure_powered()`.
+- Everything else is handed to the Flask app unchanged through a small
+  WSGI bridge running on a thread pool. Preview rendering, the CPU-bound
+  route, gets a separate pool sized to the CPU count, so renders can't
+  occupy the threads that prints and cancels need.
+
+Batch pauses already cost no request thread: batches run on the print
+queue workers (`job_queue`) in both modes.
+
+Run with `SERVER_MODE=async python server/main.py`, or directly with any
+ASGI server as `asgi:app`: like `main.py`, this module loads `.env`
+before it imports the app, whose admission limits and printer settings
+are read at import. The built-in entry point needs `uvicorn`,
+which isn't installed by default (`requirements-async.txt` adds it).
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import config
+
+# Before the app import: it reads its configuration from the environment.
+config.load_dotenv()
+
+import admission
+import app as web
+import power_save
+
+logger = logging.getLogger(__name__)
+
+_EVENTS_ROUTE = re.compile(r"/api/batch-print/([^/]+)/events")
+# Routes whose rendering is CPU-bound and runs on the render pool.
+_RENDER_PATHS = ("/api/preview",)
+# How often a printer-using request checks whether the wake has finished.
+_WAKE_POLL_SECONDS = 0.05
+
+_wsgi_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SERVER_THREADS", admission.thread_budget(web._admission_config["limits"]))),
+    thread_name_prefix="wsgi",
+)
+_render_pool = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 2,
+    thread_name_prefix="render",
+)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    match = _EVENTS_ROUTE.fullmatch(scope["path"])
+    if match and scope["method"] == "GET":
+        await _batch_events(scope, receive, send, match.group(1))
+        return
+    await _call_flask(scope, receive, send)
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            web.start_background_services()
+            # Warm the preview path without delaying startup.
+            asyncio.get_running_loop().run_in_executor(_render_pool, web.warm_up)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _wsgi_pool.shutdown(wait=False)
+            _render_pool.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+# --- Printer wake-up ---
+
+
+async def _wake_printer(path: str) -> bool:
+    """Wait for the printer to be powered on for a printer-using request
+    without blocking a thread on it. Returns True if the request no
+    longer needs the Flask hook's `ensure_powered()`."""
+    if path not in web._PRINTER_USING_PATHS or not power_save.is_enabled():
+        return False
+    try:
+        if not power_save.start_wake():
+            return True
+    except Exception:
+        # Same policy as the Flask hook: a failed wake must not break
+        # the request.
+        logger.exception("Power-on before %s failed", path)
+        return True
+    started = time.monotonic()
+    deadline = started + power_save.WAKE_TIMEOUT_SECONDS
+    while power_save.waking() and time.monotonic() < deadline:
+        await asyncio.sleep(_WAKE_POLL_SECONDS)
+    power_save.record_blocked(time.monotonic() - started)
+    return True
+
+
+# --- WSGI bridge ---
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def _environ(scope, body: bytes) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client")
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0] if client else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            key = "CONTENT_TYPE"
+        elif name == "CONTENT_LENGTH":
+            key = "CONTENT_LENGTH"
+        else:
+            key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _call_flask(scope, receive, send) -> None:
+    body = await _read_body(receive)
+    environ = _environ(scope, body)
+    if await _wake_printer(scope["path"]):
+        environ[web.POWER_READY_ENVIRON_KEY] = True
+
+    loop = asyncio.get_running_loop()
+    pool = _render_pool if scope["path"] in _RENDER_PATHS else _wsgi_pool
+    started: dict = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = headers
+
+    def run():
+        result = web.app(environ, start_response)
+        # Buffer sized responses on the worker; only streamed bodies are
+        # pulled chunk by chunk.
+        sized = any(name.lower() == "content-length" for name, _ in started["headers"])
+        if sized:
+            try:
+                return None, [b"".join(result)]
+            finally:
+                _close(result)
+        return result, None
+
+    result, chunks = await loop.run_in_executor(pool, run)
+    await send({
+        "type": "http.response.start",
+        "status": started["status"],
+        "headers": [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in started["headers"]
+        ],
+    })
+    if chunks is not None:
+        await send({"type": "http.response.body", "body": chunks[0]})
+        return
+
+    iterator = iter(result)
+    try:
+        while True:
+            chunk = await loop.run_in_executor(pool, next, iterator, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        await loop.run_in_executor(pool, _close, result)
+
+
+def _close(result) -> None:
+    close = getattr(result, "close", None)
+    if close is not None:
+        close()
+
+
+# --- Native batch progress stream ---
+
+
+def _header(scope, name: bytes) -> str | None:
+    for raw_name, raw_value in scope.get("headers", []):
+        if raw_name.lower() == name:
+            return raw_value.decode("latin-1")
+    return None
+
+
+def _last_event_id(scope) -> int:
+    raw = _header(scope, b"last-event-id")
+    if raw is None:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        raw = (query.get("lastEventId") or ["0"])[0]
+    try:
+        return max(0, int(raw))
+    except ValueError:
+        return 0
+
+
+def _cors_headers(scope) -> list[tuple[bytes, bytes]]:
+    # Matches flask-cors's default (any origin) for the one route that
+    # bypasses Flask.
+    if _header(scope, b"origin") is None:
+        return []
+    return [(b"access-control-allow-origin", b"*")]
+
+
+async def _send_json(scope, send, status: int, payload: dict, headers=()) -> None:
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+            *_cors_headers(scope),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _batch_events(scope, receive, send, job_id: str) -> None:
+    """Async twin of `app.api_batch_events`: same frames, same limits,
+    but an idle watcher costs a coroutine instead of a thread."""
+    with web._batch_lock:
+        group = web._batch_history.get(job_id)
+    if group is None:
+        await _send_json(scope, send, 404, {"status": "error", "message": "Job not found"})
+        return
+    try:
+        # Streams don't queue for a slot here: waiting would only hold a
+        # coroutine, and the client retries on its own.
+        permit = web._bulkheads["stream"].try_acquire()
+    except admission.Saturated as e:
+        await _send_json(
+            scope, send, 429,
+            {"status": "error", "message": "Server busy (stream requests), try again shortly"},
+            headers=[(b"retry-after", str(e.retry_after).encode())],
+        )
+        return
+    power_save.record_activity()
+
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    disconnected = asyncio.Event()
+
+    def notify():
+        loop.call_soon_threadsafe(wake.set)
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+        wake.set()
+
+    group.add_listener(notify)
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+                *_cors_headers(scope),
+            ],
+        })
+        await _send_chunk(send, f"retry: {web.SSE_RETRY_MS}\n\n")
+        seq = _last_event_id(scope)
+        deadline = time.monotonic() + web.SSE_STREAM_MAX_SECONDS
+        while not disconnected.is_set():
+            wake.clear()
+            finished = group.finished
+            events = group.events_after(seq, timeout=0)
+            for seq, event in events:
+                await _send_chunk(send, f"id: {seq}\ndata: {json.dumps(event)}\n\n")
+            remaining = deadline - time.monotonic()
+            if finished or remaining <= 0:
+                break
+            if events:
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), min(web.SSE_KEEPALIVE_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                await _send_chunk(send, ": keepalive\n\n")
+        if not disconnected.is_set():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        group.remove_listener(notify)
+        watcher.cancel()
+        permit.release()
+
+
+async def _send_chunk(send, text: str) -> None:
+    await send({"type": "http.response.body", "body": text.encode(), "more_body": True})
+
+
+def serve(host: str, port: int) -> None:
+    """Run under uvicorn (`SERVER_MODE=async`)."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("SERVER_MODE=async needs uvicorn: pip install -r server/requirements-async.txt") from None
+    uvicorn.run(app, host=host, port=port, lifespan="on")
@@ -0,0 +1,266 @@
+"""Append-only journals that make batch print jobs resumable.
+
+`_batch_jobs` lives in memory, so a server restart (or the Pi losing
+power) halfway through a long batch used to lose all record of what had
+already printed. Each batch now gets a small JSON-lines file under the
+state directory (the directory of `usb_power._STATE_FILE`, which sits on
+the persistent output volume):
+
+    {"jobId": "...", "createdAt": 1718000000.0, "request": {...}}
+    {"printed": [0]}
+    {"printed": [1, 2, 3]}        <- one line per print job (strip = many)
+    {"resumed": 1718000500.0, "printerId": "..."}
+    {"end": "cancelled"}
+
+The first line holds the normalised batch request, enough to rebuild
+the plan; a resume may retarget it (a USB printer's id includes its bus
+address, which changes when it re-enumerates), and records the printer
+it continued on. Uploaded images are kept in a temporary directory that a
+restart loses, so the images the batch's widgets use are copied into
+`<jobId>.images/` next to the journal. A batch that finishes cleanly
+deletes its journal and images; cancelled, failed and interrupted ones
+stay so `/api/batch-print/resume` can continue from the first unprinted
+label.
+
+Writes are one short line per print job, flushed to the OS immediately
+(survives a process crash) and fsync'd at most once per
+`_FSYNC_INTERVAL_SECONDS` (bounds what a power cut can lose to the last
+second of labels) — negligible next to a USB print. Journaling is
+best-effort like `usb_power._save_state`: if the directory isn't
+writable the batch prints unjournaled.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import usb_power
+
+logger = logging.getLogger(__name__)
+
+_FSYNC_INTERVAL_SECONDS = 1.0
+# Unfinished journals older than this are pruned when a new batch starts.
+_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+
+def journal_dir() -> Path:
+    return usb_power._STATE_FILE.parent / "batches"
+
+
+def _path(job_id: str) -> Path:
+    # job ids are validated to [a-zA-Z0-9_-] by the callers, so they're
+    # safe as file names.
+    return journal_dir() / f"{job_id}.jsonl"
+
+
+def _images_path(job_id: str) -> Path:
+    return journal_dir() / f"{job_id}.images"
+
+
+def image_path(job_id: str, filename: str) -> Path | None:
+    """The journal's copy of the uploaded image `filename`, if it has one."""
+    path = _images_path(job_id) / os.path.basename(filename)
+    return path if path.is_file() else None
+
+
+def _save_images(job_id: str, images: list[str]) -> None:
+    directory = _images_path(job_id)
+    shutil.rmtree(directory, ignore_errors=True)
+    if not images:
+        return
+    try:
+        directory.mkdir()
+        for image in images:
+            shutil.copyfile(image, directory / os.path.basename(image))
+    except OSError as e:
+        # Like a failed journal write: the batch still prints, a resume
+        # after a restart reports the missing image.
+        logger.warning("Could not copy images for batch journal %s: %s", job_id, e)
+
+
+def _remove(path: Path) -> None:
+    """Delete a journal and its images."""
+    path.unlink(missing_ok=True)
+    shutil.rmtree(path.with_suffix(".images"), ignore_errors=True)
+
+
+class BatchJournal:
+    """Writer for one batch's journal. A journal whose file couldn't be
+    opened (`fh=None`) silently drops every write."""
+
+    def __init__(self, path: Path, fh=None):
+        self.path = path
+        self._fh = fh
+        self._lock = threading.Lock()
+        self._synced_at = time.monotonic()
+
+    @classmethod
+    def create(cls, job_id: str, request: dict, images: list[str] = ()) -> "BatchJournal":
+        """Start a fresh journal (replacing any old one for this id),
+        keeping copies of the uploaded image files in `images`."""
+        path = _path(job_id)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _prune(path.parent)
+            fh = path.open("w", encoding="utf-8")
+        except OSError as e:
+            logger.warning("Could not create batch journal %s: %s", path, e)
+            return cls(path)
+        _save_images(job_id, list(images))
+        journal = cls(path, fh)
+        journal._write({"jobId": job_id, "createdAt": time.time(), "request": request}, sync=True)
+        return journal
+
+    @classmethod
+    def reopen(cls, job_id: str, printer_id: str | None = None) -> "BatchJournal":
+        """Continue appending to an existing journal, for a resume that
+        prints to `printer_id`."""
+        path = _path(job_id)
+        try:
+            fh = path.open("a", encoding="utf-8")
+        except OSError as e:
+            logger.warning("Could not reopen batch journal %s: %s", path, e)
+            return cls(path)
+        journal = cls(path, fh)
+        record = {"resumed": time.time()}
+        if printer_id is not None:
+            record["printerId"] = printer_id
+        journal._write(record, sync=True)
+        return journal
+
+    def printed(self, indices: list[int]) -> None:
+        self._write({"printed": indices})
+
+    def finish(self, state: str) -> None:
+        """Close the journal; a completed batch's journal is removed."""
+        with self._lock:
+            if self._fh is None:
+                return
+            try:
+                if state == "done":
+                    self._fh.close()
+                    _remove(self.path)
+                else:
+                    self._fh.write(json.dumps({"end": state}) + "\n")
+                    self._fh.flush()
+                    os.fsync(self._fh.fileno())
+                    self._fh.close()
+            except OSError as e:
+                logger.warning("Could not finish batch journal %s: %s", self.path, e)
+            self._fh = None
+
+    def _write(self, record: dict, sync: bool = False) -> None:
+        with self._lock:
+            if self._fh is None:
+                return
+            try:
+                self._fh.write(json.dumps(record, separators=(",", ":")) + "\n")
+                self._fh.flush()
+                now = time.monotonic()
+                if sync or now - self._synced_at >= _FSYNC_INTERVAL_SECONDS:
+                    os.fsync(self._fh.fileno())
+                    self._synced_at = now
+            except OSError as e:
+                # Stop journaling rather than fail the print.
+                logger.warning("Batch journal %s write failed, disabling: %s", self.path, e)
+                self._fh = None
+
+
+def load(job_id: str) -> dict | None:
+    """Read a journal back: {jobId, createdAt, request, printed (set of
+    label indices), state}. `state` is the recorded end state, or
+    "interrupted" if the server stopped mid-batch. The request's
+    printerId is the one the last resume printed to. None if missing or
+    unreadable."""
+    return _read(_path(job_id))
+
+
+def _read(path: Path) -> dict | None:
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning("Could not read batch journal %s: %s", path, e)
+        return None
+    if not lines:
+        return None
+    try:
+        header = json.loads(lines[0])
+        request = header["request"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        logger.warning("Ignoring batch journal %s: bad header", path)
+        return None
+
+    printed: set[int] = set()
+    state = "interrupted"
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # A torn final line from a crash mid-write; everything before
+            # it is intact.
+            continue
+        if "printed" in record:
+            printed.update(record["printed"])
+        elif "end" in record:
+            state = record["end"]
+        elif "resumed" in record:
+            state = "interrupted"
+            if "printerId" in record:
+                settings = request.get("settings")
+                request["settings"] = {**(settings if isinstance(settings, dict) else {}),
+                                       "printerId": record["printerId"]}
+    return {
+        "jobId": header.get("jobId", path.stem),
+        "createdAt": header.get("createdAt"),
+        "request": request,
+        "printed": printed,
+        "state": state,
+    }
+
+
+def list_resumable() -> list[dict]:
+    """Summaries of every journal on disk, newest first."""
+    directory = journal_dir()
+    try:
+        paths = list(directory.glob("*.jsonl"))
+    except OSError:
+        return []
+    summaries = []
+    for path in paths:
+        record = _read(path)
+        if record is None:
+            continue
+        request = record["request"]
+        summaries.append({
+            "jobId": record["jobId"],
+            "createdAt": record["createdAt"],
+            "state": record["state"],
+            "printed": len(record["printed"]),
+            "total": len(request.get("rows", [])) * request.get("copies", 1),
+            "printerId": (request.get("settings") or {}).get("printerId"),
+        })
+    summaries.sort(key=lambda s: s["createdAt"] or 0, reverse=True)
+    return summaries
+
+
+def discard(job_id: str) -> None:
+    try:
+        _remove(_path(job_id))
+    except OSError as e:
+        logger.warning("Could not remove batch journal for %s: %s", job_id, e)
+
+
+def _prune(directory: Path) -> None:
+    cutoff = time.time() - _MAX_AGE_SECONDS
+    for path in directory.glob("*.jsonl"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                _remove(path)
+        except OSError:
+            pass
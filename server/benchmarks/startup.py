@@ -0,0 +1,132 @@
+"""Startup benchmark: how soon a freshly started server is useful.
+
+Starts `server/main.py` on a free port, several times, and records for
+each run the seconds from process start until:
+
+- the port accepts connections,
+- `GET /api/health` first answers 200 (`{"status": "starting"}` counts),
+- `GET /api/health` first reports `"ok"` (the app is loaded),
+- `POST /api/preview` first returns a PNG.
+
+Prints each run and the medians. Uses a virtual printer in a temporary
+directory so no hardware is needed, and disables power-save and the
+hotplug monitor so nothing touches USB.
+
+    python server/benchmarks/startup.py [--runs 5] [--timeout 60]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MILESTONES = ("connect", "health", "ready", "preview")
+
+_PREVIEW_BODY = json.dumps({
+    "widgets": [{"type": "text", "text": "Benchmark", "id": "1"}],
+    "settings": {"tapeSizeMm": 12},
+}).encode()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _connects(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def _request(url: str, body: bytes | None = None) -> tuple[int, bytes]:
+    request = urllib.request.Request(
+        url, data=body, headers={"Content-Type": "application/json"} if body else {}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except OSError:
+        return 0, b""
+
+
+def _reached(milestone: str, base: str, port: int) -> bool:
+    if milestone == "connect":
+        return _connects(port)
+    if milestone in ("health", "ready"):
+        status, body = _request(f"{base}/api/health")
+        if status != 200:
+            return False
+        return milestone == "health" or json.loads(body).get("status") == "ok"
+    status, body = _request(f"{base}/api/preview", _PREVIEW_BODY)
+    return status == 200 and body.startswith(b"\x89PNG")
+
+
+def run_once(timeout: float) -> dict[str, float]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "PORT": str(port),
+            "VIRTUAL_PRINTERS": json.dumps([{"name": "Bench", "path": tmp}]),
+            "USB_POWER_SAVE": "false",
+            "PRINTER_HOTPLUG_INTERVAL_SECONDS": "0",
+            "LABELLE_STATE_FILE": os.path.join(tmp, "state.json"),
+        }
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(SERVER_DIR, "main.py")],
+            cwd=SERVER_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        times: dict[str, float] = {}
+        try:
+            pending = list(MILESTONES)
+            while pending:
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"server did not reach {pending[0]!r} within {timeout}s")
+                if process.poll() is not None:
+                    raise RuntimeError(f"server exited with code {process.returncode}")
+                # One check can pass several milestones at once (a health
+                # answer of "ok" is also the first 200).
+                while pending and _reached(pending[0], base, port):
+                    times[pending.pop(0)] = time.perf_counter() - started
+                time.sleep(0.01)
+        finally:
+            process.terminate()
+            process.wait(10)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.runs):
+        times = run_once(args.timeout)
+        runs.append(times)
+        print(f"run {i + 1}: " + "  ".join(f"{m} {times[m]:.3f}s" for m in MILESTONES))
+    print("median: " + "  ".join(
+        f"{m} {statistics.median(t[m] for t in runs):.3f}s" for m in MILESTONES
+    ))
+
+
+if __name__ == "__main__":
+    main()
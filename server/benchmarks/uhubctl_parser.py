@@ -0,0 +1,106 @@
+"""uhubctl output parser benchmark.
+
+Builds a synthetic `uhubctl` listing with many hubs (each USB 3 hub with
+its companion USB 2 hub, as uhubctl prints them) and one Dymo on the
+last port, then times:
+
+- legacy: the old per-line regex parsing, one pass to find the printer
+  and a second to read its port,
+- snapshot: `usb_power.parse_topology()` once, then `find()` and
+  `port()` on the result (which parse only the printer's hub).
+
+Subprocess time isn't included: the snapshot also halves the number of
+uhubctl calls, which dwarfs parsing on real hardware.
+
+    python server/benchmarks/uhubctl_parser.py [--hubs 64] [--ports 7] [--repeat 200]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import usb_power  # noqa: E402
+
+_HUB_LINE_RE = re.compile(r"Current status for hub (\S+)")
+_PORT_DEVICE_RE = re.compile(r"\s+Port (\d+):.*\[(\S+) ")
+_PORT_LINE_RE = re.compile(r"\s+Port (\d+):\s+(\w+)(.*)")
+
+
+def _legacy_find(output: str, usb_id: str):
+    current_hub = None
+    for line in output.splitlines():
+        if m := _HUB_LINE_RE.match(line):
+            current_hub = m.group(1)
+            continue
+        if current_hub and (m := _PORT_DEVICE_RE.match(line)):
+            if m.group(2) == usb_id:
+                return current_hub, int(m.group(1))
+    return None
+
+
+def _legacy_status(output: str, hub: str, port: int):
+    in_target_hub = False
+    for line in output.splitlines():
+        if m := _HUB_LINE_RE.match(line):
+            in_target_hub = m.group(1) == hub
+            continue
+        if in_target_hub and (m := _PORT_LINE_RE.match(line)) and int(m.group(1)) == port:
+            tokens = m.group(3).split("[", 1)[0].split()
+            return {"powered": "power" in tokens, "connected": "connect" in tokens}
+    raise ValueError(port)
+
+
+def build_listing(hubs: int, ports: int) -> str:
+    lines = []
+    for h in range(1, hubs + 1):
+        lines.append(
+            f"Current status for hub {h + 100} [1d6b:0003 Linux xHCI Host Controller, USB 3.00, {ports} ports, ppps]"
+        )
+        lines += [f"  Port {p}: 02a0 power 5gbps Rx.Detect" for p in range(1, ports + 1)]
+        lines.append(f"Current status for hub {h}-1 [2109:3431 USB2.0 Hub, USB 2.10, {ports} ports, ppps]")
+        for p in range(1, ports + 1):
+            if h == hubs and p == ports:
+                lines.append(f"  Port {p}: 0103 power enable connect [0922:1002 Dymo DYMO LabelManager PnP 0838]")
+            elif p % 3 == 0:
+                lines.append(f"  Port {p}: 0103 power enable connect [046d:c52b Logitech USB Receiver]")
+            else:
+                lines.append(f"  Port {p}: 0100 power")
+    return "\n".join(lines) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hubs", type=int, default=64)
+    parser.add_argument("--ports", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    output = build_listing(args.hubs, args.ports)
+    usb_id = usb_power.DYMO_USB_ID
+    hub, port = _legacy_find(output, usb_id)
+    expected = _legacy_status(output, hub, port)
+
+    def legacy():
+        found = _legacy_find(output, usb_id)
+        return _legacy_status(output, *found)
+
+    def snapshot():
+        topology = usb_power.parse_topology(output)
+        found = topology.find(usb_id)
+        state = topology.port(*found)
+        return {"powered": state["powered"], "connected": state["connected"]}
+
+    assert legacy() == snapshot() == expected
+
+    print(f"{args.hubs * 2} hubs x {args.ports} ports, {len(output.splitlines())} lines")
+    for name, fn in (("legacy", legacy), ("snapshot", snapshot)):
+        best = min(timeit.repeat(fn, number=args.repeat, repeat=5)) / args.repeat
+        print(f"{name:>8}: {best * 1e6:8.1f} us per find + status")
+
+
+if __name__ == "__main__":
+    main()
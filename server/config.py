@@ -5,11 +5,25 @@ Loads environment variables and provides configuration for features like virtual
 
 import json
 import logging
+import math
 import os
 
 LOG = logging.getLogger(__name__)
 
-VALID_OUTPUT_MODES = {"image", "json", "both"}
+VALID_OUTPUT_MODES = {"image", "json", "both", "archive"}
+VALID_WRITE_MODES = {"sync", "behind"}
+VALID_FSYNC_POLICIES = {"never", "each", "idle"}
+VALID_LAYOUTS = {"flat", "hourly"}
+
+
+def load_dotenv(path: str | None = None) -> None:
+    """Load `path` (default: the repo's `.env`) into the environment.
+    Variables that are already set win. Called by the entry points
+    (`main.py`, `asgi.py`) only, so importing the app in tests or tools
+    never reads it."""
+    from dotenv import load_dotenv as _load
+
+    _load(path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env"))
 
 
 def get_virtual_printers() -> list[dict]:
@@ -18,7 +32,17 @@ def get_virtual_printers() -> list[dict]:
     Expected format: JSON array of objects with 'name', 'path', and optional 'output' fields.
     Example: [{"name": "Office Printer", "path": "./output/office", "output": "both"}]
 
-    The 'output' field controls what files are saved: "image" (default), "json", or "both".
+    The 'output' field controls what files are saved: "image" (default), "json", or "both";
+    "archive" appends every label to a SQLite database in 'path' instead (see label_archive.py).
+
+    Optional write-behind fields (see virtual_printer.py):
+    - 'write': "sync" (default, files written before the print returns) or
+      "behind" (queued to a writer thread for this printer),
+    - 'queue': write-behind queue length (default 64); a full queue blocks the print,
+    - 'fsync': "never" (default), "each" (every file) or "idle" (once the queue drains).
+
+    'layout' is "flat" (default) or "hourly": files go into YYYY/MM/DD/HH
+    subdirectories of 'path', listed in an index file (see label_index.py).
 
     Returns:
         List of virtual printer configuration dictionaries.
@@ -50,6 +74,23 @@ def get_virtual_printers() -> list[dict]:
                 continue
             printer.setdefault("output", "image")
 
+            write = printer.get("write", "sync")
+            if write not in VALID_WRITE_MODES:
+                LOG.warning(f"Invalid write mode '{write}' for virtual printer '{printer['name']}' (must be one of {VALID_WRITE_MODES})")
+                continue
+            fsync = printer.get("fsync", "never")
+            if fsync not in VALID_FSYNC_POLICIES:
+                LOG.warning(f"Invalid fsync policy '{fsync}' for virtual printer '{printer['name']}' (must be one of {VALID_FSYNC_POLICIES})")
+                continue
+            queue = printer.get("queue", 64)
+            if not isinstance(queue, int) or isinstance(queue, bool) or queue < 1:
+                LOG.warning(f"Invalid queue length '{queue}' for virtual printer '{printer['name']}' (must be a positive integer)")
+                continue
+            layout = printer.get("layout", "flat")
+            if layout not in VALID_LAYOUTS:
+                LOG.warning(f"Invalid layout '{layout}' for virtual printer '{printer['name']}' (must be one of {VALID_LAYOUTS})")
+                continue
+
             valid_printers.append(printer)
 
         LOG.info(f"Loaded {len(valid_printers)} virtual printer(s) from config")
@@ -57,3 +98,153 @@ def get_virtual_printers() -> list[dict]:
     except json.JSONDecodeError as e:
         LOG.error(f"Failed to parse VIRTUAL_PRINTERS environment variable: {e}")
         return []
+
+
+VALID_POOL_STRATEGIES = {"round-robin", "throughput"}
+
+
+def get_printer_pools() -> list[dict]:
+    """Load printer pool configuration from PRINTER_POOLS environment variable.
+
+    Expected format: JSON array of objects with 'name', 'members', and optional 'strategy' fields.
+    Example: [{"name": "badges", "members": ["virtual:Desk_1", "virtual:Desk_2"], "strategy": "throughput"}]
+
+    'members' are printer ids as returned by /api/printers (repeats are dropped). 'strategy' controls how a batch's
+    rows are split across members: "round-robin" (default) or "throughput".
+
+    Returns:
+        List of pool configuration dictionaries.
+        Returns empty list if not configured or on parse error.
+    """
+    pools_env = os.environ.get("PRINTER_POOLS", "")
+    if not pools_env.strip():
+        return []
+
+    try:
+        pools = json.loads(pools_env)
+        if not isinstance(pools, list):
+            LOG.error("PRINTER_POOLS must be a JSON array")
+            return []
+
+        valid_pools = []
+        for pool in pools:
+            if not isinstance(pool, dict):
+                LOG.warning(f"Skipping invalid printer pool config: {pool}")
+                continue
+            if not isinstance(pool.get("name"), str) or not pool["name"]:
+                LOG.warning(f"Printer pool missing 'name': {pool}")
+                continue
+            members = pool.get("members")
+            if (
+                not isinstance(members, list)
+                or not members
+                or not all(isinstance(m, str) and m for m in members)
+            ):
+                LOG.warning(f"Printer pool '{pool['name']}' needs a non-empty 'members' list of printer ids")
+                continue
+            unique = list(dict.fromkeys(members))
+            if len(unique) < len(members):
+                # A repeated member would get two shares of the rows and
+                # two parts on the same printer queue.
+                LOG.warning(f"Printer pool '{pool['name']}' lists a member more than once; using each once")
+                pool["members"] = unique
+
+            strategy = pool.get("strategy", "round-robin")
+            if strategy not in VALID_POOL_STRATEGIES:
+                LOG.warning(f"Invalid strategy '{strategy}' for printer pool '{pool['name']}' (must be one of {VALID_POOL_STRATEGIES})")
+                continue
+            pool.setdefault("strategy", "round-robin")
+
+            valid_pools.append(pool)
+
+        LOG.info(f"Loaded {len(valid_pools)} printer pool(s) from config")
+        return valid_pools
+    except json.JSONDecodeError as e:
+        LOG.error(f"Failed to parse PRINTER_POOLS environment variable: {e}")
+        return []
+
+
+# Route classes with their own concurrency limit (see admission.py) and
+# the default limit for each.
+DEFAULT_ADMISSION_LIMITS = {"preview": 2, "print": 4, "stream": 4, "control": 2, "printer": 2}
+
+
+def _env_number(name: str, default, cast, minimum):
+    raw = os.environ.get(name, "")
+    if not raw.strip():
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        LOG.warning(f"Invalid {name}={raw!r}, using default {default}")
+        return default
+    # float() accepts "nan" and "inf", which pass (or break) every
+    # comparison the value is used in.
+    if not math.isfinite(value):
+        LOG.warning(f"{name} must be a finite number, using default {default}")
+        return default
+    if value < minimum:
+        LOG.warning(f"{name} must be at least {minimum}, using default {default}")
+        return default
+    return value
+
+
+def get_admission_config() -> dict:
+    """Load admission control settings from environment variables.
+
+    - ADMISSION_<CLASS>_LIMIT: concurrent requests per route class
+      (PREVIEW, PRINT, STREAM, CONTROL, PRINTER; defaults in DEFAULT_ADMISSION_LIMITS)
+    - ADMISSION_QUEUE_TIMEOUT_SECONDS: how long a request waits for a slot
+      in its class before a 429 (default 2)
+    - PREVIEW_RATE_LIMIT_PER_SECOND / PREVIEW_RATE_LIMIT_BURST: per-client
+      token bucket on /api/preview (defaults 5 and 10; a rate of 0 disables it)
+
+    Returns:
+        Dict with 'limits' (class -> int), 'queueTimeout', 'previewRate' and 'previewBurst'.
+        Invalid values fall back to their defaults.
+    """
+    return {
+        "limits": {
+            name: _env_number(f"ADMISSION_{name.upper()}_LIMIT", default, int, 1)
+            for name, default in DEFAULT_ADMISSION_LIMITS.items()
+        },
+        "queueTimeout": _env_number("ADMISSION_QUEUE_TIMEOUT_SECONDS", 2.0, float, 0),
+        "previewRate": _env_number("PREVIEW_RATE_LIMIT_PER_SECOND", 5.0, float, 0),
+        "previewBurst": _env_number("PREVIEW_RATE_LIMIT_BURST", 10, int, 1),
+    }
+
+
+def get_printer_discovery_ttl() -> float:
+    """Seconds a USB printer scan is reused by later /api/printers calls,
+    from PRINTER_DISCOVERY_TTL_SECONDS (default 5; invalid values fall
+    back to it)."""
+    return _env_number("PRINTER_DISCOVERY_TTL_SECONDS", 5.0, float, 0)
+
+
+def get_hotplug_interval() -> float:
+    """Seconds between sysfs polls of the USB hotplug monitor, from
+    PRINTER_HOTPLUG_INTERVAL_SECONDS (default 2, 0 disables the monitor;
+    invalid values fall back to the default)."""
+    return _env_number("PRINTER_HOTPLUG_INTERVAL_SECONDS", 2.0, float, 0)
+
+
+# How usb_power reads and switches port power (see usb_power.py).
+VALID_USB_POWER_BACKENDS = {"uhubctl", "sysfs"}
+
+
+def get_usb_power_backend() -> str:
+    """Load the USB port power backend from USB_POWER_BACKEND.
+
+    "uhubctl" (default) runs the uhubctl binary; "sysfs" reads and writes
+    the kernel's per-port `disable` attributes directly (Linux 6.0+).
+
+    Returns:
+        The backend name; unknown values fall back to "uhubctl".
+    """
+    backend = os.environ.get("USB_POWER_BACKEND", "").strip().lower()
+    if not backend:
+        return "uhubctl"
+    if backend not in VALID_USB_POWER_BACKENDS:
+        LOG.warning(f"Invalid USB_POWER_BACKEND '{backend}' (must be one of {VALID_USB_POWER_BACKENDS}), using uhubctl")
+        return "uhubctl"
+    return backend
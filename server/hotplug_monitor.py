@@ -0,0 +1,163 @@
+"""Background USB hotplug monitor for Dymo printers.
+
+Polls a cheap device source every few seconds and, when the set of
+attached Dymo devices changes, tells a callback which printer ids came
+and went. `printer_service` uses that to keep its device registry fresh
+so `/api/printers` never has to scan synchronously.
+
+The default source reads `/sys/bus/usb/devices/*/{idVendor,busnum,devnum}`
+— plain file reads, no libusb. That matters: re-creating a libusb context
+makes the kernel resume an auto-suspended hub, which re-energizes a port
+that power-save just switched off (see `usb_power.invalidate_libusb_cache`).
+Polling via sysfs can never do that.
+
+Sources are any object with `snapshot() -> set[str]` returning the
+attached devices' printer ids; tests drive the monitor with a fake one
+and `poll_once()`.
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Protocol
+
+logger = logging.getLogger(__name__)
+
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+DYMO_VENDOR_ID = "0922"
+
+# How many recent attach/detach events `stats()` reports.
+_EVENT_HISTORY = 50
+
+
+class DeviceSource(Protocol):
+    def snapshot(self) -> set[str]: ...
+
+
+class SysfsDeviceSource:
+    """Enumerate attached devices of one vendor from sysfs.
+
+    Ids are formatted exactly like labelle's `UsbDevice.usb_id`
+    (`Bus 001 Device 005: ID 0922:1002`), so a detach can be applied to
+    the registry without touching libusb.
+    """
+
+    def __init__(self, root: str = SYSFS_USB_DEVICES, vendor_id: str = DYMO_VENDOR_ID):
+        self.root = Path(root)
+        self.vendor_id = vendor_id
+
+    def available(self) -> bool:
+        return self.root.is_dir()
+
+    def snapshot(self) -> set[str]:
+        ids: set[str] = set()
+        for entry in os.scandir(self.root):
+            path = Path(entry.path)
+            try:
+                if (path / "idVendor").read_text().strip() != self.vendor_id:
+                    continue
+                product = (path / "idProduct").read_text().strip()
+                bus = int((path / "busnum").read_text())
+                address = int((path / "devnum").read_text())
+            except (OSError, ValueError):
+                # Interfaces (`1-1.3:1.0`) and root hubs lack some of these
+                # attributes; a device mid-detach can vanish between reads.
+                continue
+            ids.add(f"Bus {bus:03} Device {address:03}: ID {self.vendor_id}:{product}")
+        return ids
+
+
+class HotplugMonitor:
+    """Poll `source` and call `on_change(attached, detached)` on differences.
+
+    The first poll only records the baseline; it isn't reported as an
+    attach. Latency recorded per event is the time from the poll that
+    noticed the change until `on_change` finished updating the registry.
+    """
+
+    def __init__(
+        self,
+        source: DeviceSource,
+        on_change: Callable[[set[str], set[str]], None],
+        interval: float = 2.0,
+    ):
+        self.source = source
+        self.on_change = on_change
+        self.interval = interval
+        self._known: set[str] | None = None
+        self._events: collections.deque[dict] = collections.deque(maxlen=_EVENT_HISTORY)
+        self._polls = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def poll_once(self) -> bool:
+        """Take one snapshot; returns True iff a change was handled."""
+        observed = time.monotonic()
+        current = self.source.snapshot()
+        self._polls += 1
+        if self._known is None:
+            self._known = current
+            return False
+        attached = current - self._known
+        detached = self._known - current
+        if not attached and not detached:
+            return False
+        self.on_change(attached, detached)
+        # Only commit the new baseline once the registry took it, so a
+        # failing callback is retried on the next poll.
+        self._known = current
+        latency = time.monotonic() - observed
+        for kind, ids in (("attach", attached), ("detach", detached)):
+            if ids:
+                self._events.append({
+                    "event": kind,
+                    "printers": sorted(ids),
+                    "at": time.time(),
+                    "latencySeconds": round(latency, 6),
+                })
+                logger.info("USB hotplug %s: %s (%.1f ms)", kind, sorted(ids), latency * 1000)
+        return True
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception:
+                # Keep the thread alive across transient sysfs or scan
+                # failures; the next poll retries.
+                logger.exception("USB hotplug poll failed")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        try:
+            self.poll_once()
+        except Exception:
+            logger.exception("USB hotplug initial poll failed")
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="usb-hotplug")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        events = list(self._events)
+        latencies = [e["latencySeconds"] for e in events]
+        return {
+            "running": self.running,
+            "intervalSeconds": self.interval,
+            "polls": self._polls,
+            "attached": sorted(self._known or ()),
+            "events": events,
+            "maxLatencySeconds": max(latencies) if latencies else None,
+        }
@@ -0,0 +1,402 @@
+"""Per-printer print job queues.
+
+Every print — a single `/api/print` label or a whole batch — becomes a
+`PrintJob` submitted to `PrintScheduler`, which keeps one FIFO queue and
+one worker thread per printer key. Jobs for the same printer run strictly
+one after another (no interleaved USB writes); jobs for different
+printers, real or virtual, run concurrently.
+
+A job carries an append-only event log (`emit()` / `events_after()`),
+so whoever submitted it can relay progress without running the job on
+its own thread. A `JobGroup` ties together parts of one job queued on
+several printers (a batch split across a printer pool) behind a single
+log.
+"""
+
+import collections
+import logging
+import threading
+import time
+import uuid
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Seconds-per-label guess used for ETAs until a printer has finished a
+# job and we have a measured rate for it.
+_DEFAULT_SECONDS_PER_LABEL = 2.0
+# Weight of the newest measurement in the per-printer rate average.
+_RATE_SMOOTHING = 0.3
+# A printer's queue and worker thread are dropped after sitting empty
+# this long; the next job for that printer starts a fresh one.
+QUEUE_IDLE_SECONDS = 300.0
+
+TERMINAL_STATES = ("done", "failed", "cancelled")
+
+
+class _Progress:
+    """State, label counter and append-only event log shared by a job
+    and a job group."""
+
+    def __init__(self, job_id: str | None):
+        self.id = job_id or uuid.uuid4().hex
+        self.state = "queued"
+        self.error: BaseException | None = None
+        self.completed = 0
+        self._events: list[tuple[int, dict]] = []
+        self._cond = threading.Condition()
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+    def label_done(self, count: int = 1) -> None:
+        self.completed += count
+
+    def emit(self, event: dict) -> int:
+        """Append an event to the log; returns its sequence number."""
+        with self._cond:
+            seq = len(self._events) + 1
+            self._events.append((seq, event))
+            self._cond.notify_all()
+            self._notify_listeners()
+            return seq
+
+    def events_after(self, seq: int, timeout: float | None = None) -> list[tuple[int, dict]]:
+        """Events with sequence number > `seq`, waiting up to `timeout`
+        for one to arrive unless already finished."""
+        with self._cond:
+            if len(self._events) <= seq and not self.finished:
+                self._cond.wait(timeout)
+            return self._events[seq:]
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Call `callback()` (under the log's lock, so it must not block)
+        after every new event or state change. For watchers that can't
+        park a thread in `events_after()`, e.g. an asyncio loop."""
+        with self._cond:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]) -> None:
+        with self._cond:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify_listeners(self) -> None:
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Progress listener for %s failed", self.id)
+
+    @property
+    def last_event_id(self) -> int:
+        with self._cond:
+            return len(self._events)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until a terminal state is reached."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def _set_state(self, state: str) -> None:
+        with self._cond:
+            self.state = state
+            self._cond.notify_all()
+            self._notify_listeners()
+
+
+class PrintJob(_Progress):
+    """One unit of work for a printer's queue.
+
+    `run(job)` does the work on the printer's worker thread; it reports
+    per-label progress via `label_done()` and streams events via `emit()`.
+    It may set `job.state` to "cancelled"; an exception marks it "failed".
+    A job that is part of a `JobGroup` emits into the group's log and
+    counts its labels there too.
+    """
+
+    def __init__(
+        self,
+        run: Callable[["PrintJob"], None],
+        *,
+        labels: int = 1,
+        pause_seconds: float = 0.0,
+        kind: str = "print",
+        job_id: str | None = None,
+    ):
+        super().__init__(job_id)
+        self.run = run
+        self.kind = kind
+        self.labels = labels
+        self.pause_seconds = pause_seconds
+        self.printer_key: str | None = None
+        self.group: "JobGroup | None" = None
+        self.submitted_at = time.monotonic()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+
+    def label_done(self, count: int = 1) -> None:
+        super().label_done(count)
+        if self.group is not None:
+            self.group.label_done(count)
+
+    def emit(self, event: dict) -> int:
+        if self.group is not None:
+            return self.group.emit(event)
+        return super().emit(event)
+
+    def _set_state(self, state: str) -> None:
+        super()._set_state(state)
+        if self.group is None:
+            return
+        if state == "running":
+            self.group._part_started()
+        elif self.finished:
+            self.group._part_finished()
+
+    def remaining_seconds(self, seconds_per_label: float) -> float:
+        left = max(0, self.labels - self.completed)
+        pause_left = self.pause_seconds * (left / self.labels) if self.labels else 0.0
+        return left * seconds_per_label + pause_left
+
+
+class JobGroup(_Progress):
+    """One logical job split into parts on several printers' queues.
+
+    Parts share the group's id and event log. The group is "running" from
+    when its first part starts and finishes when its last part does: "failed" if any part failed, else "cancelled" if any
+    was cancelled, else "done". `on_finish(group, state)` runs just before
+    that state is published, so events it emits reach every watcher.
+    Add all parts before submitting any, or an early part could finish
+    the group on its own.
+
+    Once finished the group lets go of its parts and finish hook (whose
+    closures hold the batch's rows and render cache) and keeps only a
+    per-part summary, so finished groups kept for late watchers stay
+    small.
+    """
+
+    def __init__(
+        self,
+        job_id: str | None = None,
+        on_finish: Callable[["JobGroup", str], None] | None = None,
+        labels: int = 0,
+    ):
+        super().__init__(job_id)
+        self.labels = labels
+        self.parts: list[PrintJob] = []
+        self._on_finish = on_finish
+        self._closing = False
+        self._summary: list[dict] | None = None
+
+    def add(self, job: PrintJob) -> PrintJob:
+        job.group = self
+        job.id = self.id
+        self.parts.append(job)
+        return job
+
+    def label_done(self, count: int = 1) -> None:
+        with self._cond:
+            self.completed += count
+
+    def part_states(self) -> list[dict]:
+        """Printer, state and labels printed of each part."""
+        with self._cond:
+            if self._summary is not None:
+                return [dict(part) for part in self._summary]
+            parts = list(self.parts)
+        return [_part_state(part) for part in parts]
+
+    def _part_started(self) -> None:
+        """The group is "running" from when its first part starts."""
+        with self._cond:
+            if self.state == "queued":
+                self._set_state("running")
+
+    def _part_finished(self) -> None:
+        with self._cond:
+            if self._closing or not all(part.finished for part in self.parts):
+                return
+            self._closing = True
+        states = [part.state for part in self.parts]
+        if "failed" in states:
+            state = "failed"
+            self.error = next(part.error for part in self.parts if part.state == "failed")
+        elif "cancelled" in states:
+            state = "cancelled"
+        else:
+            state = "done"
+        try:
+            if self._on_finish is not None:
+                self._on_finish(self, state)
+        except Exception:
+            logger.exception("Finish hook for job group %s failed", self.id)
+        with self._cond:
+            self._summary = [_part_state(part) for part in self.parts]
+            self.parts = []
+            self._on_finish = None
+        self._set_state(state)
+
+
+def _part_state(part: PrintJob) -> dict:
+    return {"printer": part.printer_key, "state": part.state, "printed": part.completed}
+
+
+class _PrinterQueue:
+    def __init__(self, key: str, scheduler: "PrintScheduler"):
+        self.key = key
+        self.scheduler = scheduler
+        self.pending: collections.deque[PrintJob] = collections.deque()
+        self.running: PrintJob | None = None
+        self.seconds_per_label = scheduler._rates.get(key, _DEFAULT_SECONDS_PER_LABEL)
+        self.wakeup = threading.Condition(scheduler._lock)
+        self.thread = threading.Thread(
+            target=self._work, daemon=True, name=f"print-queue:{key}"
+        )
+        self.thread.start()
+
+    def eta(self, before: PrintJob | None = None) -> float:
+        """Seconds until `before` would start (or until the queue drains)."""
+        total = 0.0
+        if self.running is not None:
+            total += self.running.remaining_seconds(self.seconds_per_label)
+        for job in self.pending:
+            if job is before:
+                break
+            total += job.remaining_seconds(self.seconds_per_label)
+        return total
+
+    def _work(self) -> None:
+        while True:
+            with self.wakeup:
+                while not self.pending:
+                    if not self.wakeup.wait(self.scheduler.idle_seconds) and not self.pending:
+                        self.scheduler._retire(self)
+                        return
+                job = self.pending.popleft()
+                self.running = job
+            try:
+                self._run(job)
+            finally:
+                with self.wakeup:
+                    self.running = None
+
+    def _run(self, job: PrintJob) -> None:
+        if job.state == "cancelled":
+            return
+        job.started_at = time.monotonic()
+        job._set_state("running")
+        try:
+            job.run(job)
+        except BaseException as e:
+            job.error = e
+            logger.exception("Print job %s on %s failed", job.id, self.key)
+        job.finished_at = time.monotonic()
+        self._learn_rate(job)
+        if job.error is not None:
+            job._set_state("failed")
+        elif job.state == "cancelled":
+            job._set_state("cancelled")
+        else:
+            job._set_state("done")
+
+    def _learn_rate(self, job: PrintJob) -> None:
+        if not job.completed or job.started_at is None:
+            return
+        paused = job.pause_seconds * (job.completed / job.labels) if job.labels else 0.0
+        busy = max(0.0, job.finished_at - job.started_at - paused)
+        measured = busy / job.completed
+        self.seconds_per_label += _RATE_SMOOTHING * (measured - self.seconds_per_label)
+
+
+class PrintScheduler:
+    """Routes jobs to per-printer FIFO queues, creating workers lazily
+    and letting them exit once idle for `idle_seconds`."""
+
+    def __init__(self, idle_seconds: float = QUEUE_IDLE_SECONDS) -> None:
+        self._lock = threading.Lock()
+        self._queues: dict[str, _PrinterQueue] = {}
+        self.idle_seconds = idle_seconds
+        # Learnt seconds-per-label of retired queues, so a printer's ETA
+        # survives its worker idling out.
+        self._rates: dict[str, float] = {}
+
+    def _queue(self, key: str) -> _PrinterQueue:
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _PrinterQueue(key, self)
+        return queue
+
+    def _retire(self, queue: _PrinterQueue) -> None:
+        """Drop an idle queue (called by its worker, under the lock)."""
+        if self._queues.get(queue.key) is queue:
+            del self._queues[queue.key]
+        if queue.seconds_per_label != _DEFAULT_SECONDS_PER_LABEL:
+            self._rates[queue.key] = queue.seconds_per_label
+
+    def submit(self, printer_key: str, job: PrintJob) -> tuple[int, float]:
+        """Enqueue `job` for `printer_key`.
+
+        Returns (position, eta_seconds): how many jobs are ahead of it
+        (0 = it starts now) and the estimated wait before it starts. The
+        same numbers are emitted as the job's first event, `queued`, before
+        the worker can pick it up, so watchers always see it first.
+        """
+        job.printer_key = printer_key
+        with self._lock:
+            queue = self._queue(printer_key)
+            position = len(queue.pending) + (1 if queue.running is not None else 0)
+            eta = queue.eta()
+            job.emit({
+                "event": "queued",
+                "jobId": job.id,
+                "printer": printer_key,
+                "total": job.labels,
+                "position": position,
+                "etaSeconds": round(eta, 1),
+            })
+            queue.pending.append(job)
+            queue.wakeup.notify()
+        return position, eta
+
+    def cancel(self, job: PrintJob) -> bool:
+        """Cancel a job that hasn't started yet. Returns True if it was
+        removed from its queue; a running job must stop itself."""
+        with self._lock:
+            queue = self._queues.get(job.printer_key or "")
+            if queue is None or job not in queue.pending:
+                return False
+            queue.pending.remove(job)
+        job._set_state("cancelled")
+        return True
+
+    def eta(self, printer_key: str) -> float:
+        """Estimated seconds until a job submitted now to `printer_key`
+        would start."""
+        with self._lock:
+            queue = self._queues.get(printer_key)
+            return queue.eta() if queue is not None else 0.0
+
+    def position(self, job: PrintJob) -> tuple[int, float] | None:
+        """Current (position, eta_seconds) of a still-queued job, else None."""
+        with self._lock:
+            queue = self._queues.get(job.printer_key or "")
+            if queue is None or job not in queue.pending:
+                return None
+            ahead = list(queue.pending).index(job) + (1 if queue.running is not None else 0)
+            return ahead, queue.eta(before=job)
+
+    def snapshot(self) -> dict:
+        """Per-printer queue state for status endpoints."""
+        with self._lock:
+            return {
+                key: {
+                    "running": queue.running.id if queue.running is not None else None,
+                    "queued": [job.id for job in queue.pending],
+                    "secondsPerLabel": round(queue.seconds_per_label, 3),
+                    "etaSeconds": round(queue.eta(), 1),
+                }
+                for key, queue in self._queues.items()
+            }
@@ -0,0 +1,215 @@
+"""SQLite label archive for virtual printers (`"output": "archive"`).
+
+A virtual printer in the file modes writes one or two small files per
+label, so a long-running archive printer ends up with hundreds of
+thousands of files in one directory, which makes listing and backup
+slow. In archive mode every label is instead one row of
+`<path>/labels.sqlite3`:
+
+    labels(id, name, printer, created_at, widgets, settings, image)
+
+`name` is the base name the files would have had
+(`label_YYYYMMDD_HHMMSS_<uuid>`), `created_at` the Unix time the label
+was printed, `widgets` / `settings` the label JSON and `image` the
+preview PNG. Rows are indexed by `created_at`.
+
+`LabelArchive.append()` writes any number of labels in one transaction;
+with write-behind (`"write": "behind"`) the writer thread hands it
+everything queued at that moment, so a burst of prints costs one
+commit. The database runs in WAL mode, so the export below can read
+while the server writes.
+
+Export back to loose files (the same names and formats the file modes
+write):
+
+    python server/label_archive.py export <archive.sqlite3> <out dir>
+        [--since 2026-01-01] [--until 2026-02-01T12:00] [--printer virtual:Archive]
+        [--format image|json|both]
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Iterator
+
+from PIL import Image
+
+ARCHIVE_FILENAME = "labels.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    printer TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    widgets TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    image BLOB
+);
+CREATE INDEX IF NOT EXISTS labels_created_at ON labels (created_at);
+"""
+
+_INSERT = (
+    "INSERT INTO labels (name, printer, created_at, widgets, settings, image) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+def encode_png(bitmap: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    bitmap.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class LabelArchive:
+    """One archive database, shared by the threads that write to it.
+
+    `synchronous` is SQLite's `PRAGMA synchronous`: "FULL" syncs every
+    commit to disk, "NORMAL" (in WAL mode) only at checkpoints, which
+    `checkpoint()` forces.
+    """
+
+    def __init__(self, path: str, synchronous: str = "NORMAL"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA synchronous={synchronous}")
+            self._conn.executescript(_SCHEMA)
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+
+    def append(self, labels: list[tuple]) -> None:
+        """Insert `(name, printer, created_at, widgets, settings, image)`
+        tuples in a single transaction; `widgets` and `settings` are
+        JSON-encoded here, `image` is PNG bytes."""
+        rows = [
+            (name, printer, created_at, json.dumps(widgets), json.dumps(settings), image)
+            for name, printer, created_at, widgets, settings, image in labels
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(_INSERT, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def checkpoint(self) -> None:
+        """Copy the WAL into the database file and sync it."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def read_labels(
+    path: str,
+    since: float | None = None,
+    until: float | None = None,
+    printer: str | None = None,
+) -> Iterator[dict]:
+    """Rows of the archive at `path`, oldest first, with
+    `since <= created_at < until`, optionally for one printer id.
+    Opens the database read-only."""
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("created_at < ?")
+        params.append(until)
+    if printer is not None:
+        clauses.append("printer = ?")
+        params.append(printer)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            "SELECT name, printer, created_at, widgets, settings, image FROM labels"
+            f"{where} ORDER BY created_at, id",
+            params,
+        )
+        for name, printer_id, created_at, widgets, settings, image in cursor:
+            yield {
+                "name": name,
+                "printer": printer_id,
+                "createdAt": created_at,
+                "widgets": json.loads(widgets),
+                "settings": json.loads(settings),
+                "image": image,
+            }
+    finally:
+        conn.close()
+
+
+def export(
+    path: str,
+    out_dir: str,
+    since: float | None = None,
+    until: float | None = None,
+    printer: str | None = None,
+    output: str = "both",
+) -> int:
+    """Write archived labels back out as `<name>.png` / `<name>.json`
+    files, as the file output modes would have, with each file's mtime
+    set to the label's time. Returns the number of labels exported."""
+    os.makedirs(out_dir, exist_ok=True)
+    exported = 0
+    for label in read_labels(path, since, until, printer):
+        base_path = os.path.join(out_dir, label["name"])
+        written = []
+        if output in ("image", "both") and label["image"] is not None:
+            with open(base_path + ".png", "wb") as f:
+                f.write(label["image"])
+            written.append(base_path + ".png")
+        if output in ("json", "both"):
+            with open(base_path + ".json", "w") as f:
+                json.dump({"widgets": label["widgets"], "settings": label["settings"]}, f, indent=2)
+            written.append(base_path + ".json")
+        for file_path in written:
+            os.utime(file_path, (label["createdAt"], label["createdAt"]))
+        exported += 1
+    return exported
+
+
+def _timestamp(value: str) -> float:
+    """ISO date or date-time in local time, as a Unix timestamp."""
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Labelle label archive tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write archived labels back out as PNG/JSON files")
+    export_parser.add_argument("archive", help=f"path to the archive ({ARCHIVE_FILENAME})")
+    export_parser.add_argument("out_dir", help="directory to write the files to")
+    export_parser.add_argument("--since", type=_timestamp, help="only labels printed at or after this ISO time")
+    export_parser.add_argument("--until", type=_timestamp, help="only labels printed before this ISO time")
+    export_parser.add_argument("--printer", help="only labels from this printer id")
+    export_parser.add_argument("--format", choices=("image", "json", "both"), default="both")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.archive):
+        parser.error(f"no archive at {args.archive}")
+    count = export(args.archive, args.out_dir, args.since, args.until, args.printer, args.format)
+    print(f"Exported {count} label(s) to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
+import collections
+import json
 import os
+import threading
 from io import BytesIO
 
 from PIL import Image
@@ -83,6 +86,23 @@ def paint_cut_mark_in_trailing_margin(bitmap: Image.Image, margin_px: int) -> No
                         pixels[x + ox, y + dy] = 1
 
 
+def join_payloads(bitmaps: list[Image.Image]) -> Image.Image:
+    """Concatenate payload bitmaps left-to-right into one continuous strip.
+
+    Each labelle payload already carries its own trailing margin, so
+    butting them together reproduces the spacing of separate print jobs
+    while the printer sees a single job (one device setup, one feed).
+    """
+    if not bitmaps:
+        raise ValueError("No bitmaps to join")
+    strip = Image.new("1", (sum(b.width for b in bitmaps), max(b.height for b in bitmaps)), 0)
+    x = 0
+    for bitmap in bitmaps:
+        strip.paste(bitmap, (x, 0))
+        x += bitmap.width
+    return strip
+
+
 def _build_render_engines(
     widgets: list[dict], upload_dir: str = "",
 ) -> list[RenderEngine]:
@@ -229,6 +249,65 @@ def render_payload(
     )
 
 
+class RenderCache:
+    """Memoizes rendered bitmaps by substituted widget content.
+
+    A batch prints rows × copies, but copies of a row (and duplicate rows
+    in imported data) render to the exact same bitmap. Scoped to one batch
+    so it never outlives the upload dir contents or the settings it was
+    keyed against. Returned images are shared between hits — callers that
+    post-process a bitmap (e.g. painting a cut mark) must `.copy()` first.
+
+    Bounded to the `max_entries` most recently used renders (a virtual
+    printer's preview is ~350 KB, so an unbounded cache over a batch of
+    unique rows would hold hundreds of MB). Batches print row-major, so
+    copies of a row still hit; only far-apart duplicate rows re-render.
+    """
+
+    DEFAULT_MAX_ENTRIES = 16
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._bitmaps: collections.OrderedDict[tuple[str, str], Image.Image] = collections.OrderedDict()
+        self._max_entries = max_entries
+        # Pool members share one cache from their own worker threads.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(widgets: list[dict], settings: dict) -> str:
+        return json.dumps([widgets, settings], sort_keys=True, default=str)
+
+    def _get_or_render(self, kind, widgets, settings, upload_dir, render) -> Image.Image:
+        key = (kind, self._key(widgets, settings))
+        with self._lock:
+            bitmap = self._bitmaps.get(key)
+            if bitmap is not None:
+                self._bitmaps.move_to_end(key)
+                self.hits += 1
+                return bitmap
+            self.misses += 1
+        bitmap = render(widgets, settings, upload_dir)
+        with self._lock:
+            self._bitmaps[key] = bitmap
+            while len(self._bitmaps) > self._max_entries:
+                self._bitmaps.popitem(last=False)
+        return bitmap
+
+    def clear(self) -> None:
+        """Drop every cached render (the batch has finished)."""
+        with self._lock:
+            self._bitmaps.clear()
+
+    def payload(self, widgets: list[dict], settings: dict, upload_dir: str = "") -> Image.Image:
+        """Cached `render_payload()`."""
+        return self._get_or_render("payload", widgets, settings, upload_dir, render_payload)
+
+    def preview(self, widgets: list[dict], settings: dict, upload_dir: str = "") -> Image.Image:
+        """Cached `render_preview()` (no margin overlay, as virtual printers save it)."""
+        return self._get_or_render("preview", widgets, settings, upload_dir, render_preview)
+
+
 def preview_label(widgets: list[dict], settings: dict, upload_dir: str = "") -> bytes:
     """Build render engines from widgets and return a PNG preview as bytes."""
     bitmap = render_preview(
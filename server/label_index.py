@@ -0,0 +1,143 @@
+"""Lookup index for virtual printers with the hourly layout.
+
+With `"layout": "hourly"` a virtual printer writes each label's files
+under `<path>/YYYY/MM/DD/HH/` (local time) instead of one flat
+directory, and appends one JSON line per label to `<path>/index.jsonl`:
+
+    {"at": 1772355600.123, "name": "2026/03/01/09/label_20260301_090000_ab12cd34",
+     "jobId": "3f2a...", "index": 7}
+
+`name` is the base path relative to `<path>` (add `.png` / `.json`),
+`jobId` / `index` the batch job and label index that printed it (null
+for single prints). So a time range or a job can be located from the
+index without listing a directory of hundreds of thousands of files.
+
+`at` never goes backwards within the file (`LabelIndex` raises it to
+the previous entry's if the clock did, or a label was queued a moment
+after one that was saved later), so `read_index()` finds the start of
+a time range by bisecting the file's byte offsets and only reads the
+lines in the range. A job query has no such order and reads it all.
+"""
+
+import json
+import os
+import threading
+from typing import BinaryIO, Iterator
+
+INDEX_FILENAME = "index.jsonl"
+
+# Bytes read from the end of an existing index to find its last entry.
+_TAIL_BYTES = 4096
+
+
+def _parse(line: bytes) -> dict | None:
+    """One index entry, or None for a torn or garbled line."""
+    try:
+        entry = json.loads(line)
+        entry["at"] = float(entry["at"])
+        return entry
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _last_at(path: str) -> float:
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(0, os.path.getsize(path) - _TAIL_BYTES))
+            lines = f.read().splitlines()
+    except OSError:
+        return 0.0
+    for line in reversed(lines):
+        if (entry := _parse(line)) is not None:
+            return entry["at"]
+    return 0.0
+
+
+class LabelIndex:
+    """Append-only writer for one printer's `index.jsonl`, shared by the
+    threads that save to it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_at = _last_at(path)
+        self._fh = open(path, "ab")
+
+    def append(
+        self,
+        at: float,
+        name: str,
+        job_id: str | None = None,
+        index: int | None = None,
+        sync: bool = False,
+    ) -> None:
+        with self._lock:
+            self._last_at = max(at, self._last_at)
+            entry = {"at": round(self._last_at, 3), "name": name, "jobId": job_id, "index": index}
+            self._fh.write(json.dumps(entry).encode() + b"\n")
+            self._fh.flush()
+            if sync:
+                os.fsync(self._fh.fileno())
+
+    def sync(self) -> None:
+        with self._lock:
+            os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+
+def _seek_since(f: BinaryIO, size: int, since: float) -> int:
+    """Offset of the first line with `at >= since`.
+
+    Invariant: every line starting before `lo` is earlier than `since`
+    and every line starting at or after `hi` isn't; `lo` is a line
+    start. A torn line counts as not earlier (it can only be the last).
+    """
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        f.seek(mid - 1 if mid else 0)
+        if mid:
+            f.readline()
+        pos = f.tell()
+        if pos >= hi:
+            hi = mid
+            continue
+        line = f.readline()
+        entry = _parse(line)
+        if entry is not None and entry["at"] < since:
+            lo = pos + len(line)
+        else:
+            hi = pos
+    return lo
+
+
+def read_index(
+    output_path: str,
+    since: float | None = None,
+    until: float | None = None,
+    job_id: str | None = None,
+) -> Iterator[dict]:
+    """Index entries of the printer writing to `output_path` with
+    `since <= at < until`, optionally for one job, oldest first. Each
+    entry also gets `path`, its absolute base path."""
+    path = os.path.join(output_path, INDEX_FILENAME)
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        if since is not None:
+            f.seek(_seek_since(f, os.fstat(f.fileno()).st_size, since))
+        for line in f:
+            entry = _parse(line)
+            if entry is None:
+                continue
+            if until is not None and entry["at"] >= until:
+                break
+            if job_id is not None and entry.get("jobId") != job_id:
+                continue
+            entry["path"] = os.path.join(output_path, entry["name"])
+            yield entry
@@ -0,0 +1,144 @@
+"""Server entry point: bind the port first, load the app behind it.
+
+Importing `app` pulls in Flask, every labelle render engine, Pillow,
+pyusb and the barcode/QR libraries, which takes seconds on a Pi. Rather
+than keep the port closed (and health checks failing) for all of that,
+`run()`:
+
+1. loads `.env` (`config.load_dotenv()`; only the entry points do, so
+   importing the app in tests or tools never reads it),
+2. binds the port with waitress, serving a `_DeferredApp`,
+3. imports `app` on a background thread, starts its background
+   services (power-save idle checks, USB hotplug monitor) and renders a
+   throwaway preview, so the first real preview doesn't pay for font
+   and render engine loading.
+
+While `app` is loading, `/api/health` answers `{"status": "starting"}`
+at once and every other request waits for it (up to
+`APP_LOAD_TIMEOUT_SECONDS`, then 503).
+
+With `SERVER_MODE=async` uvicorn serves `asgi.app` instead. The app is
+imported before uvicorn binds; the ASGI lifespan startup then starts the
+background services and the warm-up.
+"""
+
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+import admission
+import config
+
+logger = logging.getLogger(__name__)
+
+# How long a request that arrives during startup waits for the app.
+APP_LOAD_TIMEOUT_SECONDS = 60
+
+_HEALTH_PATH = "/api/health"
+
+
+def _json_response(start_response, status: str, payload: dict, headers=()):
+    body = json.dumps(payload).encode()
+    start_response(status, [
+        ("Content-Type", "application/json"),
+        ("Content-Length", str(len(body))),
+        *headers,
+    ])
+    return [body]
+
+
+class _DeferredApp:
+    """WSGI app that stands in for the Flask app until `load()` (run on a
+    background thread by `start()`) has returned it."""
+
+    def __init__(self, load, timeout: float = APP_LOAD_TIMEOUT_SECONDS):
+        self._load = load
+        self._timeout = timeout
+        self._app = None
+        self._loaded = threading.Event()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self._run_load, name="app-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def _run_load(self) -> None:
+        try:
+            self._app = self._load()
+        finally:
+            # Set even on failure: waiting requests get a 503 instead of
+            # hanging for the full timeout.
+            self._loaded.set()
+
+    def __call__(self, environ, start_response):
+        app = self._app
+        if app is not None:
+            return app(environ, start_response)
+        if environ.get("PATH_INFO") == _HEALTH_PATH and not self._loaded.is_set():
+            return _json_response(start_response, "200 OK", {"status": "starting"})
+        self._loaded.wait(self._timeout)
+        if self._app is None:
+            return _json_response(
+                start_response, "503 Service Unavailable",
+                {"status": "error", "message": "Server is still starting"},
+                headers=[("Retry-After", "1")],
+            )
+        return self._app(environ, start_response)
+
+
+def _load_app():
+    """Import the Flask app, start its background services and warm the
+    preview path. Exits the process if the import fails, as it did when
+    the import ran before the port was bound, so the service manager
+    restarts it."""
+    started = time.monotonic()
+    try:
+        import app as web
+    except BaseException:
+        logger.exception("Loading the app failed")
+        os._exit(1)
+    web.start_background_services()
+    loaded = time.monotonic()
+    web.warm_up()
+    print(f"App loaded in {loaded - started:.2f}s, preview warmed in {time.monotonic() - loaded:.2f}s")
+    return web.app
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    # Python's default SIGTERM action skips atexit handlers, which drain
+    # write-behind virtual printers; exit normally instead.
+    sys.exit(0)
+
+
+def run() -> None:
+    config.load_dotenv()
+    port = int(os.environ.get("PORT", 5000))
+
+    if os.environ.get("SERVER_MODE", "").lower() == "async":
+        import asgi
+
+        print(f"Labelle server running at http://0.0.0.0:{port}")
+        asgi.serve("0.0.0.0", port)
+        return
+
+    from waitress.server import create_server
+
+    # Enough threads for every admission class to be full at once, with
+    # spares for health checks and static files.
+    threads = int(os.environ.get(
+        "SERVER_THREADS", admission.thread_budget(config.get_admission_config()["limits"])
+    ))
+    deferred = _DeferredApp(_load_app)
+    server = create_server(deferred, host="0.0.0.0", port=port, threads=threads)
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    print(f"Labelle server running at http://0.0.0.0:{port}")
+    deferred.start()
+    server.run()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,195 @@
+"""Power transition log for the printer's USB port.
+
+`usb_power` records every power-on and power-off this process performs
+(and every change its state refresh notices that something else made)
+in a bounded ring buffer, so the cost of power-save can be seen rather
+than guessed: how often the printer cycles, how long a wake takes and
+how many requests waited for one.
+
+Each transition records:
+- `cause`: `wake` (power-save woke it for a request), `idle`
+  (power-save switched it off), `manual` (`/api/power/*`) or
+  `external` (found switched by something other than this process),
+- `switchSeconds`: how long the backend (uhubctl, or the sysfs write)
+  took to switch the port,
+- `enumerateSeconds` / `enumerated`: for power-ons, the wait for the
+  printer to re-appear on the bus (`usb_power.wait_until_enumerated`),
+- `durationSeconds`: switch plus enumeration, i.e. the wake latency,
+- `blockedRequests` / `blockedSeconds`: requests that waited for this
+  wake, and their summed wait.
+
+`stats()` adds aggregates over the buffer: powered-on hours per local
+calendar day and the wake latency distribution. Both only cover the
+transitions still in the buffer (`since`).
+"""
+
+import collections
+import datetime
+import threading
+import time
+
+# Transitions kept; older ones drop out of the buffer and the aggregates.
+_HISTORY = 500
+
+# Upper bounds (seconds) of the wake latency histogram buckets; the last
+# bucket counts everything slower.
+_LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0)
+
+CAUSES = ("wake", "idle", "manual", "external")
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending, non-empty list."""
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def latency_distribution(latencies: list[float]) -> dict:
+    """Count, percentiles and histogram of wake latencies in seconds."""
+    ordered = sorted(latencies)
+    overflow = f"gt{_LATENCY_BUCKETS[-1]:g}"
+    buckets = {f"le{bound:g}": 0 for bound in _LATENCY_BUCKETS}
+    buckets[overflow] = 0
+    for seconds in ordered:
+        bound = next((b for b in _LATENCY_BUCKETS if seconds <= b), None)
+        buckets[f"le{bound:g}" if bound is not None else overflow] += 1
+    if not ordered:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None, "buckets": buckets}
+    return {
+        "count": len(ordered),
+        "p50": _percentile(ordered, 50),
+        "p90": _percentile(ordered, 90),
+        "p99": _percentile(ordered, 99),
+        "max": ordered[-1],
+        "buckets": buckets,
+    }
+
+
+def on_hours_by_day(events: list[dict], now: float) -> dict[str, float]:
+    """Hours the port was powered per local calendar day, from the first
+    event to `now`. The state between two events is the earlier one's;
+    before the first event it is unknown and not counted."""
+    if not events:
+        return {}
+    seconds: dict[datetime.date, float] = {}
+    day = datetime.date.fromtimestamp(events[0]["at"])
+    while day <= datetime.date.fromtimestamp(now):
+        seconds[day] = 0.0
+        day += datetime.timedelta(days=1)
+    for event, following in zip(events, events[1:] + [None]):
+        if not event["powered"]:
+            continue
+        start = event["at"]
+        end = following["at"] if following else now
+        while start < end:
+            day = datetime.date.fromtimestamp(start)
+            midnight = datetime.datetime.combine(
+                day + datetime.timedelta(days=1), datetime.time()
+            ).timestamp()
+            stop = min(end, midnight)
+            seconds[day] = seconds.get(day, 0.0) + stop - start
+            start = stop
+    return {day.isoformat(): round(total / 3600, 3) for day, total in sorted(seconds.items())}
+
+
+class PowerLog:
+    """Ring buffer of power transitions plus blocked-request totals.
+
+    `record()` returns the transition's dict; the wake path fills in
+    its enumeration time and blocked requests afterwards through
+    `record_enumeration()` and `record_blocked()`, under the same lock
+    that `events()` and `stats()` copy under.
+    """
+
+    def __init__(self, history: int = _HISTORY, clock=time.time):
+        self._events: collections.deque[dict] = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._clock = clock
+        self.recorded = 0
+        self.blocked_requests = 0
+        self.blocked_seconds = 0.0
+        self.blocked_max = 0.0
+
+    def record(
+        self,
+        powered: bool,
+        cause: str,
+        hub: str | None,
+        port: int | None,
+        switch_seconds: float | None = None,
+        backend: str | None = None,
+    ) -> dict:
+        switch = round(switch_seconds, 3) if switch_seconds is not None else None
+        event = {
+            "powered": powered,
+            "cause": cause,
+            "hub": hub,
+            "port": port,
+            "backend": backend,
+            "at": self._clock(),
+            "switchSeconds": switch,
+            "enumerateSeconds": None,
+            "enumerated": None,
+            "durationSeconds": switch,
+            "blockedRequests": 0,
+            "blockedSeconds": 0.0,
+        }
+        with self._lock:
+            self._events.append(event)
+            self.recorded += 1
+        return event
+
+    def record_enumeration(self, event: dict, enumerated: bool | None, seconds: float) -> None:
+        """Add a power-on's re-enumeration wait to its transition."""
+        with self._lock:
+            event["enumerated"] = enumerated
+            event["enumerateSeconds"] = seconds
+            event["durationSeconds"] = round((event["switchSeconds"] or 0.0) + seconds, 3)
+
+    def record_blocked(self, seconds: float, event: dict | None = None) -> None:
+        """Count one request that waited `seconds` for a wake, against
+        `event` if the wake powered the port on."""
+        with self._lock:
+            self.blocked_requests += 1
+            self.blocked_seconds += seconds
+            self.blocked_max = max(self.blocked_max, seconds)
+            if event is not None:
+                event["blockedRequests"] += 1
+                event["blockedSeconds"] = round(event["blockedSeconds"] + seconds, 3)
+
+    def events(self) -> list[dict]:
+        """Copies of the buffered transitions, oldest first."""
+        with self._lock:
+            return [dict(e) for e in self._events]
+
+    def stats(self, now: float | None = None) -> dict:
+        with self._lock:
+            events = [dict(e) for e in self._events]
+            recorded = self.recorded
+            blocked = {
+                "requests": self.blocked_requests,
+                "totalSeconds": round(self.blocked_seconds, 3),
+                "maxSeconds": round(self.blocked_max, 3),
+            }
+        now = self._clock() if now is None else now
+        by_cause = {cause: {"on": 0, "off": 0} for cause in CAUSES}
+        for event in events:
+            by_cause.setdefault(event["cause"], {"on": 0, "off": 0})
+            by_cause[event["cause"]]["on" if event["powered"] else "off"] += 1
+        return {
+            "history": self._events.maxlen,
+            "recorded": recorded,
+            "since": events[0]["at"] if events else None,
+            "transitions": by_cause,
+            "onHoursByDay": on_hours_by_day(events, now),
+            "wakeLatency": latency_distribution([
+                e["durationSeconds"] for e in events
+                if e["powered"] and e["enumerateSeconds"] is not None
+            ]),
+            "blocked": blocked,
+            "events": events,
+        }
+
+
+# The process-wide log `usb_power` and `power_save` record into.
+log = PowerLog()
@@ -1,16 +1,24 @@
 """Auto-idle USB power saver for the Dymo printer.
 
 Gated by `USB_POWER_SAVE=true`. When enabled, a background thread
-checks every minute whether the server has been idle longer than
-`USB_POWER_SAVE_IDLE_MINUTES` (default 60). If so, the printer's USB
-port is powered off via uhubctl. Manual `/api/power/*` endpoints in
+sleeps until the moment the server will have been idle for
+`USB_POWER_SAVE_IDLE_MINUTES` (default 60), then powers the printer's
+USB port off. Activity in the meantime only moves that deadline: the
+thread notices when it wakes and goes back to sleep. While the port is
+off it sleeps until something powers it on again. Manual `/api/power/*` endpoints in
 `app.py` stay always-on regardless of this gate — they're inert when
 not called, so there's no reason to hide them.
 
 Activity is recorded by `record_activity()` (wired from a Flask
-`before_request` hook). On a printer-using request, the hook also
-calls `ensure_powered()` so the printer is back on the bus by the
-time the handler runs.
+`before_request` hook). Any activity also calls `start_wake()`, which
+powers the port back on in a background thread and returns at once,
+so a page load or preview starts the wake without waiting for it.
+Only requests that talk to USB (print, batch, printer scan) call
+`ensure_powered()`, which joins that wake and blocks until the printer
+is back on the bus. The wake check reads `usb_power`'s cached port
+state, which a second background thread refreshes every
+`USB_POWER_STATE_REFRESH_SECONDS` (default 30), so uhubctl only runs on
+a request when the port is known to be off (or was never checked).
 """
 
 import logging
@@ -19,11 +27,18 @@ import threading
 import time
 import traceback
 
+import power_metrics
 import usb_power
 
 logger = logging.getLogger(__name__)
 
-_CHECK_INTERVAL_SECONDS = 60
+# Wait before trying again when the deadline passed but check_idle()
+# didn't power off (no printer known, uhubctl failed).
+_RETRY_SECONDS = 60
+
+# Wakes the idle scheduler when the port is powered on (it sleeps
+# without a timeout while the port is off), and stops test loops.
+_schedule = threading.Condition()
 
 # Tracks the last "meaningful" request time (not /api/health or
 # /api/power/*). Reads are unlocked (CPython makes a single
@@ -41,9 +56,21 @@ _last_activity: float = time.monotonic()
 # proceed to use the printer just before the daemon issues `off`.
 _LOCK = threading.Lock()
 
-# Power-on settle delay so the device has time to re-enumerate before
-# the next status read / handler runs against it.
-_POWER_ON_SETTLE_SECONDS = 1.5
+# Background wake state. `_wake_done` is clear while a wake thread is
+# running; `_last_wake_powered_on` is what the last one did. Starting a
+# wake is serialized by `_wake_lock` so a burst of requests spawns one
+# thread.
+_wake_lock = threading.Lock()
+_wake_done = threading.Event()
+_wake_done.set()
+_last_wake_powered_on = False
+# The `power_metrics` record of the last wake's power-on (None if it
+# didn't switch anything), so requests that waited for it are counted
+# against it.
+_wake_transition: dict | None = None
+# Longest a USB request waits for a wake: two uhubctl calls (10s timeout
+# each) plus the re-enumeration wait.
+WAKE_TIMEOUT_SECONDS = 20 + usb_power.ENUMERATE_TIMEOUT_SECONDS
 
 
 def is_enabled() -> bool:
@@ -54,36 +81,120 @@ def idle_seconds() -> int:
     return int(os.environ.get("USB_POWER_SAVE_IDLE_MINUTES", "60")) * 60
 
 
+def state_refresh_seconds() -> int:
+    return int(os.environ.get("USB_POWER_STATE_REFRESH_SECONDS", "30"))
+
+
 def record_activity() -> None:
     global _last_activity
     _last_activity = time.monotonic()
 
 
+def start_wake() -> bool:
+    """Start powering the printer's port on in the background, unless
+    it's known to be on already. Never blocks on uhubctl.
+
+    Returns True iff a wake is now in progress (started here or by an
+    earlier caller); `wait_for_wake()` blocks until it's done.
+    """
+    if not is_enabled():
+        return False
+    known = usb_power.known_port_power()
+    if known is not None and known["powered"] is not False and _wake_done.is_set():
+        return False
+    with _wake_lock:
+        if not _wake_done.is_set():
+            return True
+        _wake_done.clear()
+    try:
+        threading.Thread(target=_wake, daemon=True, name="usb-power-wake").start()
+    except Exception:
+        _wake_done.set()
+        raise
+    return True
+
+
+def _wake() -> None:
+    global _last_wake_powered_on, _wake_transition
+    powered_on = False
+    _wake_transition = None
+    try:
+        powered_on = power_on_if_needed()
+        if powered_on:
+            # Wait for re-enumeration outside the lock — other requests
+            # don't need to wait on the device.
+            known = usb_power.known_port_power()
+            if known and known["hub"] is not None:
+                usb_power.wait_until_enumerated(
+                    known["hub"], known["port"], transition=_wake_transition
+                )
+    except Exception:
+        traceback.print_exc()
+    finally:
+        _last_wake_powered_on = powered_on
+        _wake_done.set()
+
+
+def waking() -> bool:
+    """True while a background wake is still running."""
+    return not _wake_done.is_set()
+
+
+def wait_for_wake(timeout: float = WAKE_TIMEOUT_SECONDS) -> bool:
+    """Block until any in-progress wake has finished. Returns False if
+    it's still running after `timeout`."""
+    return _wake_done.wait(timeout)
+
+
+def record_blocked(seconds: float) -> None:
+    """Log a request that waited `seconds` for a wake in
+    `power_metrics`, against the wake's power-on if it made one."""
+    transition = _wake_transition if _wake_done.is_set() and _last_wake_powered_on else None
+    power_metrics.log.record_blocked(seconds, transition)
+
+
 def ensure_powered() -> bool:
-    """If we know the printer's port and it's off, power it on.
+    """If we know the printer's port and it's off, power it on, and wait
+    until it has settled.
 
-    Returns True iff a power-on was performed. No-op when the saver
-    is disabled, the printer isn't known, or it's already powered.
-    Blocks ~1.5s on power-on so callers don't race re-enumeration.
+    Returns True iff a power-on was performed (by this call's wake or
+    one already in progress). No-op when the saver is disabled, the
+    printer isn't known, or it's already powered. On power-on, blocks
+    until the device has re-enumerated so callers don't race it.
+    """
+    if not start_wake():
+        return False
+    started = time.monotonic()
+    done = wait_for_wake()
+    record_blocked(time.monotonic() - started)
+    if not done:
+        logger.warning("USB power-on still running after %ss", WAKE_TIMEOUT_SECONDS)
+        return False
+    return _last_wake_powered_on
+
+
+def power_on_if_needed() -> bool:
+    """Power the port on if it's off, without the settle delay. Runs on
+    the wake thread (`start_wake()`).
 
     Holds `_LOCK` for the status-check + potential power-on so the
     idle daemon can't interleave a power-off into the critical
     region.
     """
+    global _wake_transition
     if not is_enabled():
         return False
     with _LOCK:
-        port = usb_power.find_or_recall_printer_port()
-        if not port:
+        known = usb_power.known_port_power()
+        if known is not None and known["powered"] is not False:
+            # Known to be on, or no printer port known: nothing to wake,
+            # and no uhubctl call.
             return False
-        hub, port_num = port
-        status = usb_power.get_port_status(hub, port_num)
-        if status["powered"]:
+        # Known off, or never checked: confirm with uhubctl first.
+        known = usb_power.refresh_port_power()
+        if known["powered"] is not False:
             return False
-        usb_power.power_on(hub, port_num)
-    # Settle delay outside the lock — other requests don't need to
-    # wait on the device re-enumerating.
-    time.sleep(_POWER_ON_SETTLE_SECONDS)
+        _wake_transition = usb_power.power_on(known["hub"], known["port"], cause="wake")
     return True
 
 
@@ -103,6 +214,9 @@ def check_idle() -> bool:
     with _LOCK:
         if time.monotonic() - _last_activity < idle_seconds():
             return False
+        if _known_off():
+            # Already off; nothing to read or switch.
+            return False
         port = usb_power.find_or_recall_printer_port()
         if not port:
             return False
@@ -110,29 +224,92 @@ def check_idle() -> bool:
         status = usb_power.get_port_status(hub, port_num)
         if not status["powered"]:
             return False
-        usb_power.power_off(hub, port_num)
+        usb_power.power_off(hub, port_num, cause="idle")
     return True
 
 
-def _idle_loop() -> None:
-    """Background loop — runs forever in a daemon thread."""
+def _known_off() -> bool:
+    known = usb_power.known_port_power()
+    return known is not None and known["powered"] is False
+
+
+def _notify_scheduler(*_args) -> None:
+    """Wake the idle scheduler to re-check the port state and deadline.
+    Used as a `usb_power` power listener."""
+    with _schedule:
+        _schedule.notify_all()
+
+
+def _wait_for_deadline(stop: threading.Event) -> None:
+    """Sleep until the idle deadline (`_last_activity + idle_seconds()`)
+    has passed while the port isn't known to be off.
+
+    `record_activity()` doesn't signal: it only ever moves the deadline
+    out, so waking at the old one and re-arming is enough. A power-on
+    does signal, since it ends the untimed wait below.
+    """
+    with _schedule:
+        while not stop.is_set():
+            if _known_off():
+                _schedule.wait()
+                continue
+            remaining = _last_activity + idle_seconds() - time.monotonic()
+            if remaining <= 0:
+                return
+            _schedule.wait(remaining)
+
+
+def _idle_loop(stop: threading.Event | None = None) -> None:
+    """Background loop — runs until `stop` is set (forever in the daemon
+    thread)."""
+    stop = stop or threading.Event()
     while True:
-        time.sleep(_CHECK_INTERVAL_SECONDS)
+        _wait_for_deadline(stop)
+        if stop.is_set():
+            return
+        powered_off = False
         try:
-            if check_idle():
+            powered_off = check_idle()
+            if powered_off:
                 logger.info("USB power-save: idle exceeded, port powered off")
         except Exception:
             # Swallow + log so the thread survives transient uhubctl
             # failures (USB hub momentarily missing, etc.)
             traceback.print_exc()
+        if not powered_off and not _known_off() and time.monotonic() - _last_activity >= idle_seconds():
+            # Still past the deadline but nothing switched off (no
+            # printer found, uhubctl failed): don't spin, retry later.
+            with _schedule:
+                _schedule.wait(_RETRY_SECONDS)
+
+
+def _refresh_loop(interval: int) -> None:
+    """Background loop keeping `usb_power`'s cached port state current,
+    so a port switched outside this process (or a printer moved to
+    another port) is noticed without a request paying for uhubctl."""
+    while True:
+        try:
+            usb_power.refresh_port_power()
+            # A port found switched on again re-arms the idle scheduler.
+            _notify_scheduler()
+        except Exception:
+            traceback.print_exc()
+        time.sleep(interval)
 
 
 def start() -> None:
-    """Spin up the background idle-check thread if the saver is enabled."""
+    """Spin up the background idle-check and port-state refresh threads
+    if the saver is enabled."""
     if not is_enabled():
         return
+    usb_power.add_power_listener(_notify_scheduler)
     thread = threading.Thread(target=_idle_loop, daemon=True, name="usb-power-save")
     thread.start()
+    interval = state_refresh_seconds()
+    if interval > 0:
+        threading.Thread(
+            target=_refresh_loop, args=(interval,), daemon=True, name="usb-power-state"
+        ).start()
     logger.info(
         "USB power-save enabled: will power off Dymo port after %d minutes idle",
         idle_seconds() // 60,
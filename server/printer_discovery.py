@@ -0,0 +1,124 @@
+"""Cached USB printer discovery with single-flight scans.
+
+`DeviceManager().scan()` walks the whole USB bus. `/api/printers` used
+to run one per request, so several browsers loading the page together
+each scanned in parallel. `DeviceDiscovery` keeps the last device list
+for a short TTL and lets concurrent callers share one in-flight scan,
+which turns `list_printers()` into a memory read in the common case.
+
+The cache is invalidated from outside when the answer is known to have
+changed: a USB power transition (wired via `usb_power`'s listener hook)
+or a print failing against a device.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_TTL_SECONDS = 5.0
+
+
+class _Flight:
+    """One in-progress scan that late arrivals wait on instead of re-running."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: list | None = None
+        self.error: BaseException | None = None
+
+
+class DeviceDiscovery:
+    """TTL cache in front of a device-scan callable.
+
+    `scan` returns the attached devices and may raise; failures are
+    shared with every caller waiting on that scan but never cached.
+    """
+
+    def __init__(self, scan: Callable[[], list], ttl: float = _DEFAULT_TTL_SECONDS):
+        self._scan = scan
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._devices: list | None = None
+        self._scanned_at = 0.0
+        # Bumped by invalidate() so a scan that started before the
+        # invalidation doesn't repopulate the cache with a stale answer.
+        self._generation = 0
+        self._inflight: _Flight | None = None
+        self._scans = 0
+        self._hits = 0
+        self._shared = 0
+
+    def devices(self) -> list:
+        """Cached device list, scanning only if it's missing or older than the TTL."""
+        with self._lock:
+            if self._devices is not None and time.monotonic() - self._scanned_at < self.ttl:
+                self._hits += 1
+                return list(self._devices)
+        return self.refresh()
+
+    def cached(self) -> list | None:
+        """The cached list regardless of age, or None if there is none.
+        Never scans."""
+        with self._lock:
+            return None if self._devices is None else list(self._devices)
+
+    def refresh(self) -> list:
+        """Scan now, or join a scan that another caller already started."""
+        with self._lock:
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = _Flight()
+                generation = self._generation
+            else:
+                self._shared += 1
+
+        if leader:
+            try:
+                flight.result = self._scan()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    self._inflight = None
+                    self._scans += 1
+                    if flight.error is None and generation == self._generation:
+                        self._devices = flight.result
+                        self._scanned_at = time.monotonic()
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return list(flight.result)
+
+    def retain(self, keep: Callable[[object], bool]) -> None:
+        """Filter the cached list in place, without rescanning.
+
+        Used to apply a known detach: rescanning through libusb could
+        resume an auto-suspended hub and undo a power-off.
+        """
+        with self._lock:
+            if self._devices is not None:
+                self._devices = [dev for dev in self._devices if keep(dev)]
+
+    def invalidate(self) -> None:
+        """Drop the cached list so the next read rescans."""
+        with self._lock:
+            self._devices = None
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            age = time.monotonic() - self._scanned_at if self._devices is not None else None
+            return {
+                "scans": self._scans,
+                "cacheHits": self._hits,
+                "sharedScans": self._shared,
+                "cachedDevices": None if self._devices is None else len(self._devices),
+                "ageSeconds": None if age is None else round(age, 3),
+            }
@@ -0,0 +1,75 @@
+"""Splitting a batch's rows across the printers of a pool.
+
+A pool (`pool:<name>` printer id, configured via `PRINTER_POOLS`) lets
+one batch print on several printers side by side. Rows are the unit of
+distribution, so every copy of a row lands on the same printer back to
+back — the same row-major order a single-printer batch uses.
+
+Two strategies:
+- "round-robin": row i goes to member i % n, fixed up front.
+- "throughput": members pull the next unprinted row whenever they're
+  ready, so a faster (or less busy) printer naturally takes more rows.
+
+A plain single-printer batch is a one-member round-robin plan.
+"""
+
+import collections
+import threading
+from typing import Callable, Iterable, Iterator
+
+
+class PoolPlan:
+    """Hands out row indices to pool members.
+
+    `rows` are the row indices still to print, in order — every row for a
+    new batch, only the unfinished ones for a resumed batch.
+    """
+
+    def __init__(self, rows: Iterable[int], members: list[str], strategy: str = "round-robin"):
+        if not members:
+            raise ValueError("A pool plan needs at least one member")
+        self.members = list(members)
+        self.rows = list(rows)
+        self.strategy = strategy
+        self._lock = threading.Lock()
+        self._shared: collections.deque[int] | None = None
+        self._own: dict[str, collections.deque[int]] = {}
+        if strategy == "throughput":
+            self._shared = collections.deque(self.rows)
+        else:
+            n = len(self.members)
+            self._own = {
+                member: collections.deque(self.rows[i::n])
+                for i, member in enumerate(self.members)
+            }
+
+    def _rows(self, member: str) -> collections.deque[int]:
+        if self._shared is not None:
+            return self._shared
+        return self._own[member]
+
+    def take(self, member: str) -> int | None:
+        """Next row for `member` to print, or None when it's done."""
+        with self._lock:
+            rows = self._rows(member)
+            return rows.popleft() if rows else None
+
+    def has_more(self, member: str) -> bool:
+        """Whether `member` would get another row if it asked now."""
+        with self._lock:
+            return bool(self._rows(member))
+
+    def rows_for(self, member: str) -> Iterator[int]:
+        while (row := self.take(member)) is not None:
+            yield row
+
+    def share(self, member: str, labels: Callable[[int], int] | None = None) -> int:
+        """Rows `member` is expected to print, for ETAs: exact for
+        round-robin (before any are taken), an even split for throughput.
+        With `labels(row)` (labels a row still prints), counts labels
+        instead of rows."""
+        labels = labels or (lambda row: 1)
+        n = len(self.members)
+        if self._shared is not None:
+            return -(-sum(labels(row) for row in self.rows) // n)
+        return sum(labels(row) for row in self.rows[self.members.index(member)::n])
@@ -0,0 +1,102 @@
+"""Configured virtual printers, built once and looked up by id.
+
+`config.get_virtual_printers()` parses the `VIRTUAL_PRINTERS` JSON and
+validates every entry, and constructing a `VirtualPrinter` creates its
+output directory and logs. Print, list and pool lookups used to do both
+per call. `VirtualPrinterRegistry` does them once and keeps the
+printers in config order plus a dict by id, so a lookup is a dict get.
+
+The registry is rebuilt only when the raw config value changes (tests
+point `VIRTUAL_PRINTERS` at a fresh directory each; a running server
+never changes it), so checking for a change is one string comparison.
+Printers replaced by a rebuild are closed, which drains their
+write-behind queues.
+"""
+
+import threading
+from typing import Callable
+
+from virtual_printer import VirtualPrinter
+
+
+class _Built:
+    """One immutable build: swapped in whole so readers never lock."""
+
+    def __init__(self, source: str, printers: list[VirtualPrinter]):
+        self.source = source
+        self.printers = printers
+        self.by_id: dict[str, VirtualPrinter] = {}
+        for printer in printers:
+            # First wins on a name clash, as the old linear lookup did.
+            self.by_id.setdefault(printer.id, printer)
+
+
+class VirtualPrinterRegistry:
+    """`VirtualPrinter`s for the configured entries.
+
+    `load` returns the validated config entries (`name`, `path`,
+    `output`); `source` returns the raw config value they come from,
+    which decides whether the last build is still current.
+    """
+
+    def __init__(self, load: Callable[[], list[dict]], source: Callable[[], str]):
+        self._load = load
+        self._source = source
+        self._lock = threading.Lock()
+        self._built: _Built | None = None
+        self.builds = 0
+
+    def _current(self) -> _Built:
+        source = self._source()
+        built = self._built
+        if built is not None and built.source == source:
+            return built
+        with self._lock:
+            built = self._built
+            if built is None or built.source != source:
+                previous = built
+                built = _Built(source, [VirtualPrinter.from_config(entry) for entry in self._load()])
+                self._built = built
+                self.builds += 1
+                if previous is not None:
+                    for printer in previous.printers:
+                        printer.close()
+            return built
+
+    def printers(self) -> list[VirtualPrinter]:
+        """All configured virtual printers, in config order."""
+        return list(self._current().printers)
+
+    def get(self, printer_id: str) -> VirtualPrinter | None:
+        return self._current().by_id.get(printer_id)
+
+    def first(self) -> VirtualPrinter | None:
+        """The auto-select fallback: the first configured printer."""
+        printers = self._current().printers
+        return printers[0] if printers else None
+
+    def ids(self) -> list[str]:
+        return list(self._current().by_id)
+
+    def __len__(self) -> int:
+        return len(self._current().printers)
+
+    def write_stats(self) -> dict[str, dict]:
+        """Write-behind stats by printer id, for printers that use it.
+        Doesn't build the registry."""
+        built = self._built
+        if built is None:
+            return {}
+        return {
+            printer.id: stats
+            for printer in built.printers
+            if (stats := printer.write_stats()) is not None
+        }
+
+    def close(self) -> None:
+        """Drain every write-behind queue. Printers stay usable; later
+        saves are written synchronously."""
+        built = self._built
+        if built is not None:
+            for printer in built.printers:
+                printer.close()
@@ -1,40 +1,270 @@
+import atexit
+import logging
+import math
+import os
 import traceback
 
 from PIL import Image
 
-from labelle.lib.devices.device_manager import DeviceManager
+from labelle.lib.devices.device_manager import DeviceManager, DeviceManagerNoDevices
 from labelle.lib.devices.dymo_labeler import DymoLabeler
 
-from config import get_virtual_printers
-from label_builder import render_payload, render_preview
+import usb_power
+from config import get_hotplug_interval, get_printer_discovery_ttl, get_printer_pools, get_virtual_printers
+from label_builder import RenderCache, render_payload, render_preview
+from hotplug_monitor import HotplugMonitor, SysfsDeviceSource
+from printer_discovery import DeviceDiscovery
+from printer_registry import VirtualPrinterRegistry
+from printer_sessions import PrinterSessions
 from virtual_printer import VirtualPrinter
 
+logger = logging.getLogger(__name__)
+
 # Note: libusb cache invalidation lives in `usb_power.power_on()`, not
 # here. Scans rely on the cache being already-fresh from the last power
-# transition. See `usb_power._invalidate_libusb_cache` for the rationale
+# transition. See `usb_power.invalidate_libusb_cache` for the rationale
 # (resetting libusb in the read path triggers kernel hub auto-resume
 # which re-energizes off ports).
 
 
+def _scan_devices() -> list:
+    """Enumerate attached Dymo devices (one full USB bus scan).
+
+    "No devices" is a normal answer here (virtual-only setups, printer
+    powered off), so it's returned as an empty list — cacheable — rather
+    than labelle's `DeviceManagerNoDevices`.
+    """
+    device_manager = DeviceManager()
+    try:
+        device_manager.scan()
+    except DeviceManagerNoDevices:
+        return []
+    return device_manager.devices
+
+
+# Last device list, shared by /api/printers callers for a few seconds
+# so concurrent page loads don't each walk the USB bus.
+_discovery = DeviceDiscovery(
+    scan=_scan_devices,
+    ttl=get_printer_discovery_ttl(),
+)
+
+# Configured virtual printers, rebuilt only if VIRTUAL_PRINTERS changes.
+_virtual_printers = VirtualPrinterRegistry(
+    load=get_virtual_printers,
+    source=lambda: os.environ.get("VIRTUAL_PRINTERS", ""),
+)
+# Write-behind printers finish their queued labels before the process
+# exits (main.py turns SIGTERM into a normal exit so this runs).
+atexit.register(_virtual_printers.close)
+
+
+def virtual_writer_stats() -> dict[str, dict]:
+    """Queue depth and write latency of write-behind virtual printers."""
+    return _virtual_printers.write_stats()
+
+# Set by `start_hotplug_monitor()`. While it runs, the discovery cache
+# is kept current by hotplug events and never expires on its own.
+_hotplug: HotplugMonitor | None = None
+
+
+def _session_scan() -> list:
+    # Without the hotplug monitor a session miss rescans (sharing any
+    # in-flight scan) rather than trusting the cached list, since a miss
+    # usually means something changed. With it, the registry is current.
+    if _hotplug is not None and _hotplug.running:
+        return _discovery.devices()
+    return _discovery.refresh()
+
+
+# Opened USB handles reused across labels and requests.
+_sessions = PrinterSessions(scan=_session_scan)
+
+
+def _on_power_transition(hub: str, port: int, on: bool) -> None:
+    # The printer re-enumerates at a new bus address after power-on and
+    # vanishes after power-off, so both caches are stale either way.
+    _discovery.invalidate()
+    _sessions.invalidate()
+
+
+usb_power.add_power_listener(_on_power_transition)
+
+
+def _on_hotplug(attached: set[str], detached: set[str]) -> None:
+    """Apply a hotplug change to the device registry and open sessions."""
+    for printer_id in detached:
+        _sessions.invalidate(printer_id)
+    if attached:
+        # A newly attached device means its port is powered, so resetting
+        # libusb (needed for a long-lived context to see the new device)
+        # can't undo a power-off here.
+        usb_power.invalidate_libusb_cache()
+        _discovery.invalidate()
+        _discovery.refresh()
+    else:
+        _discovery.retain(lambda dev: dev.usb_id not in detached)
+
+
+def start_hotplug_monitor() -> None:
+    """Start polling sysfs for Dymo attach/detach, if enabled and available.
+
+    `PRINTER_HOTPLUG_INTERVAL_SECONDS` sets the poll interval (default 2,
+    `0` disables). Without sysfs (non-Linux dev machines) the list falls
+    back to TTL-cached scans.
+    """
+    global _hotplug
+    interval = get_hotplug_interval()
+    if interval <= 0 or _hotplug is not None:
+        return
+    source = SysfsDeviceSource()
+    if not source.available():
+        logger.info("USB hotplug monitor disabled: %s not found", source.root)
+        return
+    _hotplug = HotplugMonitor(source, _on_hotplug, interval=interval)
+    _hotplug.start()
+    _discovery.ttl = math.inf
+    logger.info("USB hotplug monitor polling every %.1fs", interval)
+
+
+def hotplug_stats() -> dict | None:
+    return _hotplug.stats() if _hotplug is not None else None
+
+
+def printer_readiness() -> dict:
+    """Printer availability from caches only: no USB scan.
+
+    `usbPrinters` is None when no scan result is cached (nothing has
+    asked yet, or a power transition just dropped it).
+    """
+    devices = _discovery.cached()
+    return {
+        "usbPrinters": None if devices is None else len(devices),
+        "virtualPrinters": len(_virtual_printers),
+        "hotplugMonitor": _hotplug is not None and _hotplug.running,
+        "discoveryAgeSeconds": _discovery.stats()["ageSeconds"],
+    }
+
+
+def _print_usb(device, bitmap: Image.Image, settings: dict) -> None:
+    """Send a payload bitmap to an already set-up session device.
+
+    Any failure drops the cached session and device list so the next
+    print re-scans instead of writing to a handle that may have gone away.
+    """
+    dymo_labeler = DymoLabeler(
+        tape_size_mm=settings.get("tapeSizeMm", 12),
+        device=device,
+    )
+    try:
+        dymo_labeler.print(bitmap)
+    except Exception:
+        _sessions.invalidate(device.usb_id)
+        _discovery.invalidate()
+        raise
+
+
 def _find_virtual_printer(printer_id: str) -> VirtualPrinter:
     """Resolve a virtual printer by its ID (e.g. 'virtual:Office_Printer')."""
-    for config in get_virtual_printers():
-        vp = VirtualPrinter(config["name"], config["path"], output_mode=config.get("output", "image"))
-        if vp.id == printer_id:
-            return vp
-    raise ValueError(f"Virtual printer not found: {printer_id}")
+    vp = _virtual_printers.get(printer_id)
+    if vp is None:
+        raise ValueError(f"Virtual printer not found: {printer_id}")
+    return vp
 
 
-def _fallback_to_virtual(widgets: list[dict], settings: dict, upload_dir: str) -> None:
-    """Print to the first configured virtual printer as a fallback."""
-    virtual_printers_config = get_virtual_printers()
-    if not virtual_printers_config:
+def _first_virtual_printer() -> VirtualPrinter:
+    vp = _virtual_printers.first()
+    if vp is None:
         raise ValueError("No printers available (no USB printers found and no virtual printers configured)")
+    return vp
+
+
+def _fallback_to_virtual(
+    widgets: list[dict],
+    settings: dict,
+    upload_dir: str,
+    render_cache: RenderCache | None = None,
+    job: tuple[str, int] | None = None,
+) -> None:
+    """Print to the first configured virtual printer as a fallback."""
+    vp = _first_virtual_printer()
+    preview = render_cache.preview if render_cache else render_preview
+    vp.save(preview(widgets, settings, upload_dir), widgets, settings, job=job)
 
-    config = virtual_printers_config[0]
-    vp = VirtualPrinter(config["name"], config["path"], output_mode=config.get("output", "image"))
-    preview_bitmap = render_preview(widgets, settings, upload_dir)
-    vp.save(preview_bitmap, widgets, settings)
+
+def queue_key(printer_id: str | None) -> str:
+    """The printer a print for `printer_id` will actually land on.
+
+    Jobs are queued per printer, so auto-select has to resolve the same
+    way `print_label()` does — first supported USB device, else the first
+    virtual printer — or an auto-selected print could interleave with an
+    explicitly-targeted one on the same device. Uses the cached device
+    list; "auto" if nothing resolves.
+    """
+    if printer_id:
+        return printer_id
+    try:
+        for dev in _discovery.devices():
+            if dev.is_supported:
+                return dev.usb_id
+    except Exception:
+        pass
+    vp = _virtual_printers.first()
+    return vp.id if vp is not None else "auto"
+
+
+POOL_PREFIX = "pool:"
+
+
+def _pool_id(name: str) -> str:
+    # Same sanitising as VirtualPrinter.id so ids look alike in the UI.
+    return POOL_PREFIX + name.replace(" ", "_").replace("(", "").replace(")", "")
+
+
+def get_printer_pool(printer_id: str | None) -> dict | None:
+    """The configured pool for a `pool:<name>` printer id, else None."""
+    if not printer_id or not printer_id.startswith(POOL_PREFIX):
+        return None
+    for pool in get_printer_pools():
+        if _pool_id(pool["name"]) == printer_id:
+            return pool
+    return None
+
+
+def healthy_pool_members(pool: dict) -> list[str]:
+    """The pool's members that can take work right now, in config order.
+
+    Virtual members count when they're configured; USB members when the
+    cached device list has them attached — no bus scan beyond what
+    `/api/printers` would do anyway.
+    """
+    available = set(_virtual_printers.ids())
+    try:
+        available.update(dev.usb_id for dev in _discovery.devices() if dev.is_supported)
+    except Exception:
+        traceback.print_exc()
+    return [member for member in pool["members"] if member in available]
+
+
+def is_known_printer(printer_id: str | None) -> bool:
+    """Whether `printer_id` names something a print can go to: auto-select
+    (empty), a configured virtual printer or pool, or a supported USB
+    printer in the cached device list.
+
+    Checked before queueing, since every distinct printer id gets its
+    own queue and worker thread.
+    """
+    if not printer_id:
+        return True
+    if printer_id.startswith("virtual:"):
+        return _virtual_printers.get(printer_id) is not None
+    if printer_id.startswith(POOL_PREFIX):
+        return get_printer_pool(printer_id) is not None
+    try:
+        return any(dev.is_supported and dev.usb_id == printer_id for dev in _discovery.devices())
+    except Exception:
+        traceback.print_exc()
+        return False
 
 
 def list_printers() -> list[dict]:
@@ -46,10 +276,7 @@ def list_printers() -> list[dict]:
 
     # Add real USB printers
     try:
-        device_manager = DeviceManager()
-        device_manager.scan()
-
-        for dev in device_manager.devices:
+        for dev in _discovery.devices():
             parts = []
             if dev.manufacturer:
                 parts.append(dev.manufacturer)
@@ -71,8 +298,7 @@ def list_printers() -> list[dict]:
 
     # Add virtual printers from configuration
     try:
-        for config in get_virtual_printers():
-            virtual = VirtualPrinter(config["name"], config["path"], output_mode=config.get("output", "image"))
+        for virtual in _virtual_printers.printers():
             printers.append({
                 "id": virtual.id,
                 "name": virtual.display_name,
@@ -82,11 +308,28 @@ def list_printers() -> list[dict]:
     except Exception:
         traceback.print_exc()
 
+    # Add printer pools (batches to these are split across members)
+    try:
+        for pool in get_printer_pools():
+            printers.append({
+                "id": _pool_id(pool["name"]),
+                "name": f"{pool['name']} (Pool of {len(pool['members'])})",
+                "vendorProductId": "pool",
+                "serialNumber": None,
+            })
+    except Exception:
+        traceback.print_exc()
+
     return printers
 
 
 def print_label(
-    widgets: list[dict], settings: dict, upload_dir: str = "", printer_id: str | None = None
+    widgets: list[dict],
+    settings: dict,
+    upload_dir: str = "",
+    printer_id: str | None = None,
+    render_cache: RenderCache | None = None,
+    job: tuple[str, int] | None = None,
 ) -> None:
     """Resolve printer and dispatch a label for printing.
 
@@ -98,44 +341,32 @@ def print_label(
                    - USB ID (e.g. "Bus 001 Device 005: ID 0922:1234") for real printer
                    - virtual:name (e.g. "virtual:Office_Printer") for virtual printer
                    - None to auto-select first available real printer
+        render_cache: Optional per-batch cache so repeated identical labels
+                   (copies, duplicate rows) are rendered once.
+        job: Optional (batch job id, label index), recorded by virtual
+                   printers that keep an index (hourly layout).
     """
     # Virtual printer request
     if printer_id and printer_id.startswith("virtual:"):
         virtual_printer = _find_virtual_printer(printer_id)
-        preview_bitmap = render_preview(widgets, settings, upload_dir)
-        virtual_printer.save(preview_bitmap, widgets, settings)
+        preview = render_cache.preview if render_cache else render_preview
+        virtual_printer.save(preview(widgets, settings, upload_dir), widgets, settings, job=job)
         return
 
     # Try real USB printer
-    device = None
     try:
-        device_manager = DeviceManager()
-        device_manager.scan()
-
         # TODO: Future improvement - store per-printer settings (tape size, margins, color)
-        if printer_id:
-            matching_devices = [dev for dev in device_manager.devices if dev.usb_id == printer_id]
-            if not matching_devices:
-                raise ValueError(f"Printer not found: {printer_id}")
-            device = matching_devices[0]
-        else:
-            device = device_manager.find_and_select_device()
+        device = _sessions.device(printer_id)
     except Exception:
         # If a specific printer was requested but not found, don't fall back
         if printer_id:
             raise
         # Auto-select: fall back to first virtual printer
-        _fallback_to_virtual(widgets, settings, upload_dir)
+        _fallback_to_virtual(widgets, settings, upload_dir, render_cache, job)
         return
 
-    device.setup()
-
-    dymo_labeler = DymoLabeler(
-        tape_size_mm=settings.get("tapeSizeMm", 12),
-        device=device,
-    )
-    bitmap = render_payload(widgets, settings, upload_dir)
-    dymo_labeler.print(bitmap)
+    payload = render_cache.payload if render_cache else render_payload
+    _print_usb(device, payload(widgets, settings, upload_dir), settings)
 
 
 def _bitmap_to_viewable(bitmap: Image.Image) -> Image.Image:
@@ -145,19 +376,11 @@ def _bitmap_to_viewable(bitmap: Image.Image) -> Image.Image:
 
 
 def _fallback_to_virtual_bitmap(
-    bitmap: Image.Image, widgets: list[dict], settings: dict
+    bitmap: Image.Image, widgets: list[dict], settings: dict, job: tuple[str, int] | None = None
 ) -> None:
     """Print a pre-rendered bitmap to the first configured virtual printer."""
-    virtual_printers_config = get_virtual_printers()
-    if not virtual_printers_config:
-        raise ValueError(
-            "No printers available (no USB printers found and no virtual printers configured)"
-        )
-    config = virtual_printers_config[0]
-    vp = VirtualPrinter(
-        config["name"], config["path"], output_mode=config.get("output", "image")
-    )
-    vp.save(_bitmap_to_viewable(bitmap), widgets, settings)
+    vp = _first_virtual_printer()
+    vp.save(_bitmap_to_viewable(bitmap), widgets, settings, job=job)
 
 
 def print_bitmap(
@@ -165,6 +388,7 @@ def print_bitmap(
     settings: dict,
     printer_id: str | None = None,
     widgets: list[dict] | None = None,
+    job: tuple[str, int] | None = None,
 ) -> None:
     """Send a pre-rendered mode-"1" bitmap to the printer.
 
@@ -183,33 +407,19 @@ def print_bitmap(
     # Virtual printer
     if printer_id and printer_id.startswith("virtual:"):
         virtual_printer = _find_virtual_printer(printer_id)
-        virtual_printer.save(_bitmap_to_viewable(bitmap), widgets, settings)
+        virtual_printer.save(_bitmap_to_viewable(bitmap), widgets, settings, job=job)
         return
 
     # Try real USB printer
-    device = None
     try:
-        device_manager = DeviceManager()
-        device_manager.scan()
-        if printer_id:
-            matching = [d for d in device_manager.devices if d.usb_id == printer_id]
-            if not matching:
-                raise ValueError(f"Printer not found: {printer_id}")
-            device = matching[0]
-        else:
-            device = device_manager.find_and_select_device()
+        device = _sessions.device(printer_id)
     except Exception:
         if printer_id:
             raise
         # Auto-select failed: fall back to the first virtual printer rather
         # than silently swallowing the print and emitting a misleading
         # `printed` SSE event upstream.
-        _fallback_to_virtual_bitmap(bitmap, widgets, settings)
+        _fallback_to_virtual_bitmap(bitmap, widgets, settings, job)
         return
 
-    device.setup()
-    dymo_labeler = DymoLabeler(
-        tape_size_mm=settings.get("tapeSizeMm", 12),
-        device=device,
-    )
-    dymo_labeler.print(bitmap)
+    _print_usb(device, bitmap, settings)
@@ -0,0 +1,141 @@
+"""Persistent USB printer sessions reused across prints.
+
+Without this, every label ran `DeviceManager().scan()` (a full USB bus
+enumeration) plus `device.setup()` before printing — a 1000-label batch
+did 1000 enumerations. `PrinterSessions` keeps one set-up `UsbDevice`
+per printer id and hands it back on subsequent prints.
+
+The cached handle is dropped, forcing a fresh scan, when:
+- a print against it fails (`invalidate(printer_id)` from the caller),
+- a USB port power transition happens (`usb_power` notifies listeners;
+  the device re-enumerates at a new bus address after power-on),
+- a health check fails. Handles idle for longer than
+  `health_check_interval` are re-`setup()` before reuse — a control
+  transfer on the existing handle, much cheaper than a bus scan — so a
+  printer unplugged between prints is noticed before we write to it.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable
+
+from labelle.lib.devices.device_manager import DeviceManagerError
+from labelle.lib.devices.usb_device import UsbDevice
+
+logger = logging.getLogger(__name__)
+
+_HEALTH_CHECK_INTERVAL_SECONDS = 30.0
+
+
+class PrinterSessions:
+    """Cache of opened, set-up USB devices keyed by printer id.
+
+    `scan` returns the currently attached devices; it's injected so the
+    caller controls how enumeration happens (and tests can fake it).
+    """
+
+    def __init__(
+        self,
+        scan: Callable[[], list[UsbDevice]],
+        health_check_interval: float = _HEALTH_CHECK_INTERVAL_SECONDS,
+    ):
+        self._scan = scan
+        self._health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        # usb_id -> (device, last_used monotonic)
+        self._devices: dict[str, tuple[UsbDevice, float]] = {}
+        # Which usb_id auto-select (printer_id=None) resolved to last time.
+        self._auto_id: str | None = None
+        self._scans = 0
+        self._scan_seconds = 0.0
+        self._reuses = 0
+        self._health_checks = 0
+        self._health_failures = 0
+
+    def device(self, printer_id: str | None = None) -> UsbDevice:
+        """Return a set-up device for `printer_id`, scanning only on a miss.
+
+        `printer_id=None` auto-selects the first supported device, like
+        `DeviceManager.find_and_select_device()`.
+
+        Raises:
+            ValueError: `printer_id` was given but isn't attached.
+            DeviceManagerError: auto-select found no supported device.
+            Whatever `scan` or `setup()` raise.
+        """
+        with self._lock:
+            key = printer_id or self._auto_id
+            cached = self._devices.get(key) if key else None
+            if cached is not None:
+                device, last_used = cached
+                if self._healthy(device, last_used):
+                    self._reuses += 1
+                    self._devices[key] = (device, time.monotonic())
+                    return device
+                self._drop(key)
+
+            device = self._select(self._timed_scan(), printer_id)
+            device.setup()
+            self._devices[device.usb_id] = (device, time.monotonic())
+            if printer_id is None:
+                self._auto_id = device.usb_id
+            return device
+
+    def invalidate(self, printer_id: str | None = None) -> None:
+        """Forget one cached device (by id), or all of them when None."""
+        with self._lock:
+            if printer_id is None:
+                self._devices.clear()
+                self._auto_id = None
+            else:
+                self._drop(printer_id)
+
+    def stats(self) -> dict:
+        """Counters for measuring the per-label overhead saved."""
+        with self._lock:
+            return {
+                "open": len(self._devices),
+                "scans": self._scans,
+                "scanSeconds": round(self._scan_seconds, 6),
+                "reuses": self._reuses,
+                "healthChecks": self._health_checks,
+                "healthFailures": self._health_failures,
+            }
+
+    def _drop(self, usb_id: str) -> None:
+        self._devices.pop(usb_id, None)
+        if self._auto_id == usb_id:
+            self._auto_id = None
+
+    def _timed_scan(self) -> list[UsbDevice]:
+        started = time.perf_counter()
+        try:
+            return self._scan()
+        finally:
+            self._scans += 1
+            self._scan_seconds += time.perf_counter() - started
+
+    @staticmethod
+    def _select(devices: list[UsbDevice], printer_id: str | None) -> UsbDevice:
+        if printer_id:
+            for dev in devices:
+                if dev.usb_id == printer_id:
+                    return dev
+            raise ValueError(f"Printer not found: {printer_id}")
+        for dev in devices:
+            if dev.is_supported:
+                return dev
+        raise DeviceManagerError("No matching devices found")
+
+    def _healthy(self, device: UsbDevice, last_used: float) -> bool:
+        if time.monotonic() - last_used < self._health_check_interval:
+            return True
+        self._health_checks += 1
+        try:
+            device.setup()
+            return True
+        except Exception as e:
+            self._health_failures += 1
+            logger.info("Cached printer session failed health check: %s", e)
+            return False
@@ -0,0 +1,147 @@
+"""In-memory, precompressed serving of the built client (`dist-client`).
+
+The Vite bundle is fixed once the container starts, so instead of
+touching the filesystem per request `build_manifest()` reads it once:
+every file's bytes, MIME type, ETag and cache policy, plus gzip and (if
+the optional `brotli` package is installed) brotli variants of the
+text assets. Pre-built `.gz` / `.br` siblings, should the build ever
+produce them, are used as those variants instead of compressing again.
+
+Cache policy:
+- Vite's content-hashed files under `assets/` never change under the
+  same name: `max-age` one year plus `immutable`.
+- `index.html` and the PWA service worker / manifest must be
+  revalidated so a deploy is picked up: `no-cache` (ETag makes that a
+  cheap 304).
+- Everything else (icons, robots.txt): one hour.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone still covers every browser
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+DEFAULT_CACHE = "public, max-age=3600"
+
+# Vite names bundle files `<name>-<hash>.<ext>` under assets/.
+_HASHED_ASSET = re.compile(r"assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+")
+_REVALIDATE_FILES = {"index.html", "sw.js", "registerSW.js", "manifest.webmanifest"}
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+    "application/wasm",
+)
+# Below this, compression overhead outweighs the saving.
+_MIN_COMPRESS_BYTES = 512
+# Encodings in order of preference, with the file suffix of a prebuilt variant.
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("text/javascript", ".js")
+
+
+class Asset:
+    """One file's bytes and headers, plus compressed variants by
+    encoding name."""
+
+    def __init__(self, body: bytes, mimetype: str, etag: str, cache_control: str):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        self.variants: dict[str, bytes] = {}
+
+    def negotiate(self, accepts) -> tuple[str | None, bytes, str]:
+        """Pick the first encoding in `_ENCODINGS` that has a variant and
+        that the client accepts (`accepts(encoding) -> float`, the
+        Accept-Encoding quality). Returns (content_encoding, body, etag);
+        each variant gets its own ETag."""
+        for encoding, _ in _ENCODINGS:
+            if encoding in self.variants and accepts(encoding) > 0:
+                return encoding, self.variants[encoding], f"{self.etag}-{encoding}"
+        return None, self.body, self.etag
+
+
+def _cache_control(rel_path: str) -> str:
+    if rel_path in _REVALIDATE_FILES:
+        return REVALIDATE_CACHE
+    if _HASHED_ASSET.fullmatch(rel_path):
+        return IMMUTABLE_CACHE
+    return DEFAULT_CACHE
+
+
+def _compressible(mimetype: str) -> bool:
+    return mimetype.startswith(_COMPRESSIBLE_TYPES)
+
+
+def _compress(encoding: str, body: bytes) -> bytes | None:
+    if encoding == "gzip":
+        # mtime=0 keeps the output byte-identical across restarts.
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=11)
+    return None
+
+
+def _load(path: str, rel_path: str) -> Asset:
+    with open(path, "rb") as f:
+        body = f.read()
+    mimetype = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+    asset = Asset(
+        body=body,
+        mimetype=mimetype,
+        etag=hashlib.sha1(body).hexdigest()[:16],
+        cache_control=_cache_control(rel_path),
+    )
+    if not _compressible(mimetype) or len(body) < _MIN_COMPRESS_BYTES:
+        return asset
+    for encoding, suffix in _ENCODINGS:
+        prebuilt = path + suffix
+        if os.path.isfile(prebuilt):
+            with open(prebuilt, "rb") as f:
+                compressed = f.read()
+        else:
+            compressed = _compress(encoding, body)
+        if compressed is not None and len(compressed) < len(body):
+            asset.variants[encoding] = compressed
+    return asset
+
+
+def build_manifest(root: str) -> dict[str, Asset]:
+    """Load every file under `root`, keyed by its URL path relative to
+    it (forward slashes). Prebuilt `.gz` / `.br` files are folded into
+    their originals rather than served on their own. Missing root:
+    empty manifest."""
+    manifest: dict[str, Asset] = {}
+    if not os.path.isdir(root):
+        return manifest
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+            if any(name.endswith(suffix) and os.path.isfile(path[: -len(suffix)]) for _, suffix in _ENCODINGS):
+                continue
+            try:
+                manifest[rel_path] = _load(path, rel_path)
+            except OSError as e:
+                logger.warning("Skipping static asset %s: %s", path, e)
+    logger.info(
+        "Loaded %d static assets (%d KiB) from %s",
+        len(manifest), sum(len(a.body) for a in manifest.values()) // 1024, root,
+    )
+    return manifest
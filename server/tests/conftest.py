@@ -1,12 +1,42 @@
+import asyncio
 import os
+import shutil
 import sys
 import tempfile
+from pathlib import Path
 
 import pytest
 
 # Add server directory to path so tests can import app modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+# Importing app starts the USB hotplug monitor; a background thread
+# rescanning the real bus would race the DeviceManager mocks.
+os.environ.setdefault("PRINTER_HOTPLUG_INTERVAL_SECONDS", "0")
+
+# The preview rate limiter is per client address, and every test client
+# is 127.0.0.1; tests that exercise it build their own limiter.
+os.environ.setdefault("PREVIEW_RATE_LIMIT_PER_SECOND", "0")
+
+# Keep persisted state (printer port, batch journals) out of the real
+# output volume.
+os.environ.setdefault(
+    "LABELLE_STATE_FILE",
+    os.path.join(tempfile.mkdtemp(prefix="labelle-test-state-"), "state.json"),
+)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "asgi: also run the test's `client` through asgi.app (SERVER_MODE=async)"
+    )
+
+
+def pytest_generate_tests(metafunc):
+    # A `client` fixture reads `request.param` to pick the serving mode.
+    if metafunc.definition.get_closest_marker("asgi") and "client" in metafunc.fixturenames:
+        metafunc.parametrize("client", ["wsgi", "asgi"], indirect=True)
+
 
 @pytest.fixture
 def tmp_output_dir(tmp_path):
@@ -42,3 +72,121 @@ def no_virtual_printers_env():
     yield
     if old is not None:
         os.environ["VIRTUAL_PRINTERS"] = old
+
+
+class FakeSysfs:
+    """A `/sys/bus/usb/devices` tree for tests: hubs with power-switchable
+    ports (`add_port`) and devices on them (`attach`), named like the
+    kernel does (`1-1:1.0/1-1-port3/disable`, `1-1.3/idVendor`)."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True)
+
+    def _port_dir(self, hub: str, port: int) -> Path:
+        if "-" in hub:
+            return self.root / f"{hub}:1.0" / f"{hub}-port{port}"
+        return self.root / f"{hub}-0:1.0" / f"usb{hub}-port{port}"
+
+    def _device_dir(self, hub: str, port: int) -> Path:
+        return self.root / (f"{hub}.{port}" if "-" in hub else f"{hub}-{port}")
+
+    def add_port(self, hub: str, port: int, powered: bool = True) -> None:
+        port_dir = self._port_dir(hub, port)
+        port_dir.mkdir(parents=True, exist_ok=True)
+        (port_dir / "disable").write_text("0\n" if powered else "1\n")
+
+    def disable_value(self, hub: str, port: int) -> str:
+        return (self._port_dir(hub, port) / "disable").read_text().strip()
+
+    def attach(self, hub: str, port: int, usb_id: str = "0922:1002", configuration: str = "1") -> None:
+        device_dir = self._device_dir(hub, port)
+        device_dir.mkdir()
+        vendor, product = usb_id.split(":")
+        (device_dir / "idVendor").write_text(vendor + "\n")
+        (device_dir / "idProduct").write_text(product + "\n")
+        (device_dir / "bConfigurationValue").write_text(configuration + "\n")
+
+    def detach(self, hub: str, port: int) -> None:
+        shutil.rmtree(self._device_dir(hub, port))
+
+
+@pytest.fixture
+def fake_sysfs(tmp_path):
+    """An empty fake sysfs USB device tree (see FakeSysfs)."""
+    return FakeSysfs(tmp_path / "sys" / "bus" / "usb" / "devices")
+
+
+class AsgiClient:
+    """Sends requests through `asgi.app` (`SERVER_MODE=async`) with the
+    Flask test client's call style, so API tests can run in both
+    serving modes. Responses are read in full."""
+
+    def open(self, path: str, method: str = "GET", **kwargs):
+        from werkzeug.test import EnvironBuilder
+        from werkzeug.wrappers import Response
+
+        environ = EnvironBuilder(path, method=method, **kwargs).get_environ()
+        body = environ["wsgi.input"].read()
+        headers = [
+            (name[5:].replace("_", "-").lower().encode(), str(value).encode("latin-1"))
+            for name, value in environ.items()
+            if name.startswith("HTTP_")
+        ]
+        for name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            if environ.get(name):
+                headers.append((name.replace("_", "-").lower().encode(), environ[name].encode("latin-1")))
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": method,
+            "path": environ["PATH_INFO"],
+            "root_path": "",
+            "query_string": environ["QUERY_STRING"].encode("latin-1"),
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        }
+        status, response_headers, content = asyncio.run(self._run(scope, body))
+        return Response(content, status, response_headers)
+
+    @staticmethod
+    async def _run(scope, body: bytes):
+        import asgi
+
+        messages = []
+        pending = [{"type": "http.request", "body": body, "more_body": False}]
+        done = asyncio.Event()
+
+        async def receive():
+            if pending:
+                return pending.pop()
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        await asyncio.wait_for(asgi.app(scope, receive, send), 10)
+        done.set()
+        start = messages[0]
+        return (
+            start["status"],
+            [(k.decode("latin-1"), v.decode("latin-1")) for k, v in start["headers"]],
+            b"".join(m.get("body", b"") for m in messages[1:]),
+        )
+
+    def get(self, path: str, **kwargs):
+        return self.open(path, "GET", **kwargs)
+
+    def post(self, path: str, **kwargs):
+        return self.open(path, "POST", **kwargs)
+
+    def delete(self, path: str, **kwargs):
+        return self.open(path, "DELETE", **kwargs)
+
+
+@pytest.fixture
+def asgi_client():
+    """An AsgiClient; see the `client` fixtures of test_app / test_batch."""
+    return AsgiClient()
@@ -0,0 +1,105 @@
+"""Tests for admission: bulkheads and per-client rate limiting."""
+
+import threading
+import time
+
+import pytest
+
+from admission import Bulkhead, ClientRateLimiter, Saturated, thread_budget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBulkhead:
+    def test_admits_up_to_limit(self):
+        bulkhead = Bulkhead("preview", limit=2, queue_timeout=0)
+        first = bulkhead.acquire()
+        second = bulkhead.acquire()
+        assert bulkhead.stats()["inFlight"] == 2
+        with pytest.raises(Saturated):
+            bulkhead.acquire()
+        first.release()
+        second.release()
+        assert bulkhead.stats()["inFlight"] == 0
+
+    def test_release_is_idempotent(self):
+        bulkhead = Bulkhead("print", limit=1, queue_timeout=0)
+        permit = bulkhead.acquire()
+        permit.release()
+        permit.release()
+        assert bulkhead.stats()["inFlight"] == 0
+        bulkhead.acquire().release()
+
+    def test_waiter_gets_slot_when_released(self):
+        bulkhead = Bulkhead("print", limit=1, queue_timeout=5)
+        held = bulkhead.acquire()
+        admitted = threading.Event()
+
+        def wait_for_slot():
+            bulkhead.acquire().release()
+            admitted.set()
+
+        t = threading.Thread(target=wait_for_slot)
+        t.start()
+        while bulkhead.stats()["waiting"] == 0:
+            pass
+        time.sleep(0.02)
+        held.release()
+        assert admitted.wait(5)
+        t.join(5)
+        stats = bulkhead.stats()
+        assert stats["admitted"] == 2
+        assert stats["waitMs"]["max"] > 0
+
+    def test_full_queue_is_rejected_without_waiting(self):
+        bulkhead = Bulkhead("stream", limit=1, queue_timeout=5)
+        bulkhead.max_waiting = 0
+        bulkhead.acquire()
+        with pytest.raises(Saturated) as exc:
+            bulkhead.acquire()
+        assert exc.value.retry_after >= 1
+        assert bulkhead.stats()["rejected"] == 1
+
+    def test_retry_after_follows_hold_time(self):
+        clock = FakeClock()
+        bulkhead = Bulkhead("print", limit=1, queue_timeout=0, clock=clock)
+        for _ in range(20):
+            permit = bulkhead.acquire()
+            clock.now += 4
+            permit.release()
+        bulkhead.acquire()
+        with pytest.raises(Saturated) as exc:
+            bulkhead.acquire()
+        assert exc.value.retry_after == 4
+
+
+class TestClientRateLimiter:
+    def test_burst_then_limited(self):
+        clock = FakeClock()
+        limiter = ClientRateLimiter(rate=2, burst=3, clock=clock)
+        assert [limiter.take("a") for _ in range(3)] == [0, 0, 0]
+        assert limiter.take("a") == 1
+        # Other clients have their own bucket.
+        assert limiter.take("b") == 0
+
+    def test_tokens_refill_over_time(self):
+        clock = FakeClock()
+        limiter = ClientRateLimiter(rate=1, burst=1, clock=clock)
+        assert limiter.take("a") == 0
+        assert limiter.take("a") == 1
+        clock.now += 1
+        assert limiter.take("a") == 0
+
+    def test_zero_rate_disables(self):
+        limiter = ClientRateLimiter(rate=0, burst=1)
+        assert all(limiter.take("a") == 0 for _ in range(100))
+
+
+def test_thread_budget_covers_every_class_full():
+    assert thread_budget({"preview": 2, "print": 3}) == 2 * 2 + 3 * 2 + 4
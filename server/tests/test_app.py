@@ -8,15 +8,20 @@ from PIL import Image
 
 
 @pytest.fixture
-def client(virtual_printer_env):
-    """Flask test client with virtual printers configured."""
+def client(request, virtual_printer_env):
+    """Flask test client with virtual printers configured. Tests marked
+    `asgi` also run through the async serving mode (`asgi.app`)."""
     from app import app
 
     app.config["TESTING"] = True
+    if getattr(request, "param", "wsgi") == "asgi":
+        yield request.getfixturevalue("asgi_client")
+        return
     with app.test_client() as client:
         yield client
 
 
+@pytest.mark.asgi
 class TestApiPrintWithVirtualPrinter:
     @patch("app.print_label")
     def test_print_with_virtual_printer_id(self, mock_print, client):
@@ -103,6 +108,95 @@ class TestApiPrintWithVirtualPrinter:
         assert call_kwargs[1]["printer_id"] == ""
 
 
+    @patch("app.print_label")
+    def test_print_queued_behind_other_work_returns_202_at_once(self, mock_print, client):
+        import threading
+
+        from app import _bulkheads, _scheduler
+        from job_queue import PrintJob
+
+        release = threading.Event()
+        blocker = PrintJob(lambda job: release.wait(5))
+        _scheduler.submit("virtual:Test_Printer", blocker)
+        payload = {
+            "widgets": [{"type": "text", "text": "Hello", "id": "1"}],
+            "settings": {"tapeSizeMm": 12, "printerId": "virtual:Test_Printer"},
+        }
+        try:
+            resp = client.post("/api/print", json=payload)
+            assert resp.status_code == 202
+            body = resp.get_json()
+            assert body["status"] == "queued"
+            assert body["queuePosition"] == 1
+            assert body["statusUrl"] == f"/api/print/{body['jobId']}"
+            assert _bulkheads["print"].in_flight == 0
+            status = client.get(body["statusUrl"]).get_json()
+            assert status["state"] == "queued"
+            assert status["queuePosition"] == 1
+        finally:
+            release.set()
+        from app import _print_history
+
+        assert _print_history[body["jobId"]].wait(5)
+        assert client.get(body["statusUrl"]).get_json()["state"] == "done"
+        mock_print.assert_called_once()
+
+    def test_print_status_unknown_job(self, client):
+        assert client.get("/api/print/nope").status_code == 404
+
+    @patch("app.print_label")
+    def test_unknown_printer_id_is_rejected_without_a_queue(self, mock_print, client):
+        from app import _scheduler
+
+        payload = {
+            "widgets": [{"type": "text", "text": "Hello", "id": "1"}],
+            "settings": {"tapeSizeMm": 12, "printerId": "Bus 001 Device 999: ID 0922:1001"},
+        }
+        with patch("printer_service._discovery.devices", return_value=[]):
+            resp = client.post("/api/print", json=payload)
+        assert resp.status_code == 400
+        assert resp.get_json()["message"].startswith("Unknown printer")
+        mock_print.assert_not_called()
+        assert "Bus 001 Device 999: ID 0922:1001" not in _scheduler.snapshot()
+
+    def test_write_behind_printer_reports_writer_stats(self, tmp_path, monkeypatch):
+        from app import app
+        from printer_service import _virtual_printers
+
+        monkeypatch.setenv("VIRTUAL_PRINTERS", json.dumps([
+            {"name": "Archive", "path": str(tmp_path / "archive"), "write": "behind"},
+        ]))
+        payload = {
+            "widgets": [{"type": "text", "text": "Hello", "id": "1"}],
+            "settings": {"tapeSizeMm": 12, "printerId": "virtual:Archive"},
+        }
+        with app.test_client() as client:
+            assert client.post("/api/print", json=payload).status_code == 200
+            _virtual_printers.get("virtual:Archive").flush()
+            writers = client.get("/api/queue").get_json()["writers"]
+        assert writers["virtual:Archive"]["written"] == 1
+        assert len(list((tmp_path / "archive").glob("*.png"))) == 1
+
+    @patch("app.print_label")
+    def test_print_reports_queue_position(self, mock_print, client):
+        payload = {
+            "widgets": [{"type": "text", "text": "Hello", "id": "1"}],
+            "settings": {"tapeSizeMm": 12, "printerId": "virtual:Test_Printer"},
+        }
+
+        resp = client.post(
+            "/api/print",
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
+
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert body["queuePosition"] == 0
+        assert body["etaSeconds"] >= 0
+
+
+@pytest.mark.asgi
 class TestApiPreview:
     @patch("app.preview_label")
     def test_returns_png_for_valid_text_widget(self, mock_preview, client):
@@ -162,6 +256,70 @@ class TestApiPreview:
         assert "Render failed" in resp.get_json()["message"]
 
 
+@pytest.mark.asgi
+class TestAdmission:
+    _PREVIEW = {
+        "widgets": [{"type": "text", "text": "Hello", "id": "1"}],
+        "settings": {"tapeSizeMm": 12},
+    }
+
+    def _preview(self, client):
+        return client.post(
+            "/api/preview",
+            data=json.dumps(self._PREVIEW),
+            content_type="application/json",
+        )
+
+    @patch("app.preview_label", return_value=b"\x89PNG\r\n\x1a\n")
+    def test_saturated_class_returns_429_with_retry_after(self, mock_preview, client):
+        from admission import Bulkhead
+
+        full = Bulkhead("preview", limit=1, queue_timeout=0)
+        full.acquire()
+        with patch.dict("app._bulkheads", {"preview": full}):
+            resp = self._preview(client)
+            # Other classes are unaffected.
+            assert client.get("/api/printers").status_code == 200
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "1"
+        assert resp.get_json()["status"] == "error"
+        mock_preview.assert_not_called()
+
+    @patch("app.preview_label", return_value=b"\x89PNG\r\n\x1a\n")
+    def test_preview_rate_limited_per_client(self, mock_preview, client):
+        from admission import ClientRateLimiter
+
+        with patch("app._preview_limiter", ClientRateLimiter(rate=1, burst=2)):
+            codes = [self._preview(client).status_code for _ in range(3)]
+        assert codes == [200, 200, 429]
+
+    @patch("app.preview_label", return_value=b"\x89PNG\r\n\x1a\n")
+    def test_admitted_request_reports_wait_and_frees_slot(self, mock_preview, client):
+        resp = self._preview(client)
+        assert resp.headers["Server-Timing"].startswith('admission;desc="preview";dur=')
+        stats = client.get("/api/admission").get_json()["classes"]["preview"]
+        assert stats["inFlight"] == 0
+        assert stats["admitted"] >= 1
+        assert set(stats["waitMs"]) == {"last", "avg", "max"}
+
+    def test_cancel_has_room_while_printer_routes_are_busy(self, client):
+        from admission import Bulkhead
+
+        full = Bulkhead("printer", limit=1, queue_timeout=0)
+        full.acquire()
+        with patch.dict("app._bulkheads", {"printer": full}):
+            assert client.get("/api/printers").status_code == 429
+            assert client.get("/api/power/status").status_code == 429
+            resp = client.post("/api/batch-print/cancel", json={"jobId": "not-running"})
+        # Admitted (and 404 because there is no such batch), not 429.
+        assert resp.status_code == 404
+
+    def test_health_is_never_limited(self, client):
+        resp = client.get("/api/health")
+        assert resp.status_code == 200
+        assert "Server-Timing" not in resp.headers
+
+
 class TestApiUploadImage:
     def test_uploads_png_returns_filename(self, client):
         img = Image.new("RGB", (10, 10), "red")
@@ -242,6 +400,16 @@ class TestApiServeUpload:
 
 
 class TestApiHealth:
+    @pytest.fixture(autouse=True)
+    def fresh_app_info(self):
+        # Build info is computed once per process; recompute it under
+        # each test's environment.
+        from app import _app_info
+
+        _app_info.cache_clear()
+        yield
+        _app_info.cache_clear()
+
     def test_returns_ok_status(self, client):
         resp = client.get("/api/health")
         assert resp.status_code == 200
@@ -291,8 +459,122 @@ class TestApiHealth:
         assert data["status"] == "ok"
         assert "version" in data
 
+    def test_build_info_computed_once(self, client, monkeypatch):
+        monkeypatch.delenv("GIT_SHA", raising=False)
+        monkeypatch.delenv("GIT_BRANCH", raising=False)
+        import subprocess
+
+        calls = []
+        real = subprocess.check_output
+
+        def counting(*args, **kwargs):
+            calls.append(args)
+            return real(*args, **kwargs)
+
+        monkeypatch.setattr(subprocess, "check_output", counting)
+        for _ in range(3):
+            client.get("/api/health")
+        assert len(calls) == 2  # rev-parse for sha + branch, once
+
+
+class TestApiReady:
+    @patch("app.usb_power.cached_power_state", return_value={
+        "hub": None, "port": None, "powered": None, "changedAt": None,
+    })
+    @patch("app.printer_readiness")
+    def test_ready_with_virtual_printers(self, mock_printers, mock_power, client):
+        mock_printers.return_value = {
+            "usbPrinters": None, "virtualPrinters": 2,
+            "hotplugMonitor": False, "discoveryAgeSeconds": None,
+        }
+        resp = client.get("/api/ready")
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["status"] == "ready"
+        assert data["queue"]["running"] == 0
+        assert data["queue"]["queued"] == 0
+        assert "version" in data
+
+    @patch("app.usb_power.cached_power_state")
+    @patch("app.printer_readiness")
+    def test_not_ready_without_any_printer(self, mock_printers, mock_power, client):
+        mock_printers.return_value = {
+            "usbPrinters": 0, "virtualPrinters": 0,
+            "hotplugMonitor": True, "discoveryAgeSeconds": 1.0,
+        }
+        mock_power.return_value = {"hub": None, "port": None, "powered": None, "changedAt": None}
+        assert client.get("/api/ready").status_code == 503
+        # A printer that power-save switched off wakes on demand.
+        mock_power.return_value = {"hub": "1-1", "port": 2, "powered": False, "changedAt": 1.0}
+        assert client.get("/api/ready").status_code == 200
+
+    @patch("printer_service._scan_devices")
+    @patch("usb_power._run")
+    def test_never_scans_or_runs_uhubctl(self, mock_run, mock_scan, client):
+        client.get("/api/ready")
+        mock_scan.assert_not_called()
+        mock_run.assert_not_called()
+
+
+class TestServeStatic:
+    @pytest.fixture
+    def dist(self, tmp_path):
+        from static_assets import build_manifest
+
+        (tmp_path / "assets").mkdir()
+        (tmp_path / "index.html").write_text("<!doctype html><title>Labelle</title>")
+        (tmp_path / "assets" / "index-BxY3k9aZ.js").write_text("console.log(1);\n" * 200)
+        with patch("app._static_manifest", build_manifest(str(tmp_path))):
+            yield
+
+    def test_hashed_asset_is_immutable_and_gzipped(self, client, dist):
+        resp = client.get("/assets/index-BxY3k9aZ.js", headers={"Accept-Encoding": "gzip, deflate"})
+        assert resp.status_code == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert "immutable" in resp.headers["Cache-Control"]
+        assert resp.headers["Vary"] == "Accept-Encoding"
+
+    def test_identity_without_accept_encoding(self, client, dist):
+        resp = client.get("/assets/index-BxY3k9aZ.js")
+        assert "Content-Encoding" not in resp.headers
+        assert resp.data == b"console.log(1);\n" * 200
+
+    def test_etag_revalidation_returns_304(self, client, dist):
+        etag = client.get("/").headers["ETag"]
+        resp = client.get("/", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.data == b""
+
+    def test_spa_fallback_serves_index_from_memory(self, client, dist):
+        resp = client.get("/some/client/route")
+        assert resp.status_code == 200
+        assert b"<title>Labelle</title>" in resp.data
+        assert resp.headers["Cache-Control"] == "no-cache"
+
+    def test_not_built_returns_404(self, client):
+        with patch("app._static_manifest", {}):
+            assert client.get("/").status_code == 404
+
 
 class TestApiPower:
+    def test_metrics_reports_logged_transitions(self, client, monkeypatch):
+        import power_metrics
+
+        log = power_metrics.PowerLog()
+        monkeypatch.setattr(power_metrics, "log", log)
+        transition = log.record(True, "wake", "1-1", 3, switch_seconds=0.2)
+        log.record_enumeration(transition, True, 0.6)
+        log.record_blocked(0.7, transition)
+        with patch("app.usb_power.get_port_status") as mock_status:
+            resp = client.get("/api/power/metrics")
+        mock_status.assert_not_called()
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["transitions"]["wake"] == {"on": 1, "off": 0}
+        assert data["wakeLatency"]["p50"] == 0.8
+        assert data["blocked"]["requests"] == 1
+        assert data["events"][0]["cause"] == "wake"
+
     @patch("app.usb_power.get_port_status")
     @patch("app.usb_power.find_or_recall_printer_port")
     def test_status_returns_hub_port_and_state(self, mock_find, mock_status, client):
@@ -313,18 +595,20 @@ class TestApiPower:
         assert resp.status_code == 404
         assert "not detected" in resp.get_json()["message"].lower()
 
-    @patch("app.time.sleep")
+    @patch("app.usb_power.wait_until_enumerated")
     @patch("app.usb_power.get_port_status")
     @patch("app.usb_power.power_on")
     @patch("app.usb_power.find_or_recall_printer_port")
     def test_on_powers_and_returns_status(
-        self, mock_find, mock_on, mock_status, mock_sleep, client
+        self, mock_find, mock_on, mock_status, mock_wait, client
     ):
         mock_find.return_value = ("1-1", 3)
         mock_status.return_value = {"powered": True, "connected": True}
         resp = client.post("/api/power/on")
         assert resp.status_code == 200
         mock_on.assert_called_once_with("1-1", 3)
+        # The enumeration wait is added to the transition's metrics.
+        mock_wait.assert_called_once_with("1-1", 3, transition=mock_on.return_value)
         data = resp.get_json()
         assert data["powered"] is True
 
@@ -353,11 +637,11 @@ class TestApiPower:
         resp = client.post("/api/power/off")
         assert resp.status_code == 404
 
-    @patch("app.time.sleep")
+    @patch("app.usb_power.wait_until_enumerated")
     @patch("app.usb_power.power_on")
     @patch("app.usb_power.find_or_recall_printer_port")
     def test_on_returns_500_when_uhubctl_fails(
-        self, mock_find, mock_on, mock_sleep, client
+        self, mock_find, mock_on, mock_wait, client
     ):
         import subprocess
 
@@ -436,11 +720,12 @@ class TestPowerSaveHook:
         mock_record.assert_called_once()
         mock_ensure.assert_called_once()
 
+    @patch("app.power_save.start_wake")
     @patch("app.power_save.ensure_powered")
     @patch("app.power_save.record_activity")
     @patch("app.preview_label")
-    def test_preview_records_activity_and_wakes(
-        self, mock_preview, mock_record, mock_ensure, client
+    def test_preview_starts_wake_without_waiting(
+        self, mock_preview, mock_record, mock_ensure, mock_start_wake, client
     ):
         import io
 
@@ -456,7 +741,8 @@ class TestPowerSaveHook:
             content_type="application/json",
         )
         mock_record.assert_called_once()
-        mock_ensure.assert_called_once()
+        mock_start_wake.assert_called_once()
+        mock_ensure.assert_not_called()
 
     @patch("app.power_save.ensure_powered")
     @patch("app.power_save.record_activity")
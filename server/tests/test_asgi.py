@@ -0,0 +1,223 @@
+"""Tests for asgi: the async serving mode, driven directly with asyncio."""
+
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+
+def _settings():
+    return {"tapeSizeMm": 12, "printerId": "virtual:Test_Printer"}
+
+
+async def _request(method, path, body=None, headers=(), query=b"", disconnect_after=None):
+    """Run one request through the ASGI app. Returns (status, headers,
+    body); `disconnect_after` simulates the client hanging up once that
+    many body chunks have arrived."""
+    import asgi
+
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "path": path,
+        "root_path": "",
+        "query_string": query,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+            *headers,
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    sent_body = False
+    hang_up = asyncio.Event()
+    messages = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await hang_up.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        chunks = sum(1 for m in messages if m["type"] == "http.response.body")
+        if disconnect_after is not None and chunks >= disconnect_after:
+            hang_up.set()
+
+    await asyncio.wait_for(asgi.app(scope, receive, send), 10)
+    start = messages[0]
+    return (
+        start["status"],
+        {k.decode(): v.decode() for k, v in start["headers"]},
+        b"".join(m.get("body", b"") for m in messages[1:]),
+    )
+
+
+def _call(*args, **kwargs):
+    return asyncio.run(_request(*args, **kwargs))
+
+
+def _sse_events(body: bytes) -> list[tuple[int, dict]]:
+    events = []
+    for frame in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.split("\n") if ": " in line and not line.startswith(":"))
+        if "data" in fields:
+            events.append((int(fields["id"]), json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def batch_client(virtual_printer_env):
+    from app import _batch_jobs
+
+    _batch_jobs.clear()
+
+
+class TestWsgiBridge:
+    def test_health(self):
+        status, headers, body = _call("GET", "/api/health")
+        assert status == 200
+        assert headers["content-type"] == "application/json"
+        assert json.loads(body)["status"] == "ok"
+
+    def test_preview_renders_on_render_pool(self, virtual_printer_env):
+        threads = []
+
+        def render(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return b"\x89PNG\r\n\x1a\n"
+
+        with patch("app.preview_label", side_effect=render):
+            status, headers, body = _call(
+                "POST", "/api/preview",
+                body={"widgets": [{"type": "text", "text": "Hi", "id": "1"}], "settings": _settings()},
+            )
+        assert status == 200
+        assert body == b"\x89PNG\r\n\x1a\n"
+        assert threads[0].startswith("render")
+
+    def test_validation_errors_pass_through(self):
+        status, _, body = _call("POST", "/api/batch-print", body={"widgets": []})
+        assert status == 400
+        assert json.loads(body)["message"] == "No widgets provided"
+
+
+class TestAsyncBatchEvents:
+    @patch("app.print_label")
+    def test_stream_follows_batch_to_done(self, mock_print, batch_client):
+        status, _, body = _call("POST", "/api/batch-print", body={
+            "widgets": [{"type": "text", "text": "Hello {{name}}", "id": "1"}],
+            "settings": _settings(),
+            "rows": [{"name": "a"}, {"name": "b"}],
+        })
+        assert status == 202
+        url = json.loads(body)["events"]
+
+        status, headers, body = _call("GET", url)
+        assert status == 200
+        assert headers["content-type"].startswith("text/event-stream")
+        assert body.startswith(b"retry: ")
+        events = _sse_events(body)
+        assert [e["event"] for _, e in events][0] == "queued"
+        assert events[-1][1]["event"] == "done"
+        assert [seq for seq, _ in events] == list(range(1, len(events) + 1))
+
+        _, _, replay = _call("GET", url, headers=[(b"last-event-id", b"2")])
+        assert _sse_events(replay) == events[2:]
+        _, _, replay = _call("GET", url, query=b"lastEventId=2")
+        assert _sse_events(replay) == events[2:]
+
+    def test_waits_without_a_thread_and_stops_on_disconnect(self, batch_client):
+        from app import _bulkheads
+
+        release = threading.Event()
+        with patch("app.print_label", side_effect=lambda *a, **k: release.wait(5)):
+            _, _, body = _call("POST", "/api/batch-print", body={
+                "widgets": [{"type": "text", "text": "x", "id": "1"}],
+                "settings": _settings(),
+                "rows": [{}],
+            })
+            url = json.loads(body)["events"]
+            # retry frame + queued + started + printing, then hang up while
+            # the label is still printing.
+            status, _, body = _call("GET", url, disconnect_after=3)
+            assert status == 200
+            assert _bulkheads["stream"].in_flight == 0
+            release.set()
+
+    def test_unknown_job_returns_404(self):
+        status, _, body = _call("GET", "/api/batch-print/nope12345/events")
+        assert status == 404
+        assert json.loads(body)["status"] == "error"
+
+    @patch("app.print_label")
+    def test_saturated_streams_get_429(self, mock_print, batch_client):
+        from admission import Bulkhead
+
+        _, _, body = _call("POST", "/api/batch-print", body={
+            "widgets": [{"type": "text", "text": "x", "id": "1"}],
+            "settings": _settings(),
+            "rows": [{}],
+        })
+        full = Bulkhead("stream", limit=1, queue_timeout=0)
+        full.acquire()
+        with patch.dict("app._bulkheads", {"stream": full}):
+            status, headers, _ = _call("GET", json.loads(body)["events"])
+        assert status == 429
+        assert headers["retry-after"] == "1"
+
+
+class TestAsyncWake:
+    @patch("usb_power.wait_until_enumerated")
+    @patch("power_save.is_enabled", return_value=True)
+    @patch("power_save.ensure_powered")
+    @patch("power_save.power_on_if_needed", return_value=True)
+    def test_printer_request_is_woken_before_flask(
+        self, mock_power_on, mock_ensure, mock_enabled, mock_wait, virtual_printer_env, monkeypatch
+    ):
+        import usb_power
+
+        monkeypatch.setattr(usb_power, "_port_power", None)
+        status, _, _ = _call("GET", "/api/printers")
+        assert status == 200
+        mock_power_on.assert_called_once()
+        # The Flask hook sees the request as already handled.
+        mock_ensure.assert_not_called()
+
+    @patch("power_save.power_on_if_needed")
+    def test_other_requests_do_not_wake(self, mock_power_on):
+        _call("GET", "/api/health")
+        mock_power_on.assert_not_called()
+
+
+def test_lifespan_startup_and_shutdown():
+    import asgi
+
+    async def run():
+        messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        with patch.object(asgi._wsgi_pool, "shutdown"), patch.object(asgi._render_pool, "shutdown"):
+            await asgi.app({"type": "lifespan"}, receive, send)
+        return sent
+
+    warmed = threading.Event()
+    with patch("app.start_background_services") as mock_start, patch("app.warm_up", side_effect=warmed.set):
+        assert asyncio.run(run()) == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        # The warm-up runs on the render pool without delaying startup.
+        assert warmed.wait(5)
+    mock_start.assert_called_once()
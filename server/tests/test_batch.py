@@ -6,7 +6,7 @@ import pytest
 
 
 @pytest.fixture
-def client(virtual_printer_env):
+def client(request, virtual_printer_env):
     from app import app
 
     app.config["TESTING"] = True
@@ -18,6 +18,9 @@ def client(virtual_printer_env):
     from app import _batch_jobs
 
     _batch_jobs.clear()
+    if getattr(request, "param", "wsgi") == "asgi":
+        yield request.getfixturevalue("asgi_client")
+        return
     with app.test_client() as client:
         yield client
 
@@ -40,7 +43,12 @@ def _widget():
 
 
 def _read_sse(resp):
-    """Drain an SSE response into a list of event dicts."""
+    """Drain an SSE response into a list of event dicts. A batch
+    submission (202 + job id) is followed to its progress stream."""
+    if resp.status_code == 202:
+        from app import app
+
+        resp = app.test_client().get(resp.json["events"])
     events = []
     buffer = ""
     for chunk in resp.response:
@@ -239,7 +247,7 @@ class TestBatchPrintValidation:
             }),
             content_type="application/json",
         )
-        assert resp.status_code == 200
+        assert resp.status_code == 202
         _read_sse(resp)
         call_widgets = mock_print.call_args_list[0][0][0]
         assert call_widgets[0]["text"] == "Hello 42"
@@ -286,6 +294,7 @@ class TestBatchPrintValidation:
         assert "string or number" in resp.json["message"]
 
 
+@pytest.mark.asgi
 class TestBatchPrintExecution:
     @patch("app.print_label")
     def test_prints_each_row_with_substitution(self, mock_print, client):
@@ -298,10 +307,12 @@ class TestBatchPrintExecution:
             }),
             content_type="application/json",
         )
-        assert resp.status_code == 200
+        assert resp.status_code == 202
         events = _read_sse(resp)
-        assert events[0]["event"] == "started"
-        assert events[0]["total"] == 2
+        assert events[0]["event"] == "queued"
+        assert events[0]["position"] == 0
+        assert events[1]["event"] == "started"
+        assert events[1]["total"] == 2
         assert events[-1]["event"] == "done"
         assert mock_print.call_count == 2
         # First call substituted "Alice"
@@ -324,7 +335,7 @@ class TestBatchPrintExecution:
             }),
             content_type="application/json",
         )
-        assert resp.status_code == 200
+        assert resp.status_code == 202
         _read_sse(resp)
         call_widgets = mock_print.call_args_list[0][0][0]
         assert call_widgets[0]["text"] == "Hi Alice"
@@ -342,7 +353,7 @@ class TestBatchPrintExecution:
             }),
             content_type="application/json",
         )
-        assert resp.status_code == 200
+        assert resp.status_code == 202
         _read_sse(resp)
         call_widgets = mock_print.call_args_list[0][0][0]
         assert call_widgets[0]["text"] == "Hello {{name}}"
@@ -358,7 +369,7 @@ class TestBatchPrintExecution:
             }),
             content_type="application/json",
         )
-        assert resp.status_code == 200
+        assert resp.status_code == 202
         _read_sse(resp)
         call_widgets = mock_print.call_args_list[0][0][0]
         assert call_widgets[0]["text"] == "Hello "
@@ -375,11 +386,62 @@ class TestBatchPrintExecution:
             }),
             content_type="application/json",
         )
-        assert resp.status_code == 200
+        assert resp.status_code == 202
         events = _read_sse(resp)
         assert events[0]["total"] == 6
         assert mock_print.call_count == 6
 
+    def test_renders_each_distinct_label_once(self, client):
+        # 3 rows (one duplicate) × 3 copies = 9 labels, 2 distinct renders.
+        import label_builder
+
+        with patch(
+            "label_builder.render_preview", wraps=label_builder.render_preview
+        ) as spy:
+            resp = client.post(
+                "/api/batch-print",
+                data=json.dumps({
+                    "widgets": [_widget()],
+                    "settings": _settings(),
+                    "rows": [{"name": "A"}, {"name": "B"}, {"name": "A"}],
+                    "copies": 3,
+                }),
+                content_type="application/json",
+            )
+            events = _read_sse(resp)
+        assert events[-1]["event"] == "done"
+        assert events[-1]["total"] == 9
+        assert spy.call_count == 2
+
+    @patch("app.print_bitmap")
+    def test_cut_mark_does_not_leak_into_cached_render(self, mock_print_bitmap, client):
+        # Every label but the last gets a cut mark painted on a copy; the
+        # last must come out clean even though all three share one render.
+        settings = {**_settings(), "cutMark": True}
+        with patch("app.print_label") as mock_print_label:
+            resp = client.post(
+                "/api/batch-print",
+                data=json.dumps({
+                    "widgets": [_widget()],
+                    "settings": settings,
+                    "rows": [{"name": "A"}],
+                    "copies": 3,
+                }),
+                content_type="application/json",
+            )
+            _read_sse(resp)
+        from app import UPLOAD_DIR
+
+        marked = [c.args[0] for c in mock_print_bitmap.call_args_list]
+        assert len(marked) == 2
+        assert marked[0] is not marked[1]
+        cache = mock_print_label.call_args.kwargs["render_cache"]
+        assert cache.misses == 1
+        clean = cache.payload(
+            mock_print_label.call_args.args[0], settings, upload_dir=UPLOAD_DIR
+        )
+        assert clean.tobytes() != marked[0].tobytes()
+
     @patch("app.print_label")
     def test_pops_completed_job_from_tracking(self, mock_print, client):
         from app import _batch_jobs
@@ -393,12 +455,151 @@ class TestBatchPrintExecution:
             }),
             content_type="application/json",
         )
-        assert resp.status_code == 200
+        assert resp.status_code == 202
         _read_sse(resp)
         # The job should be cleared once the stream completes (no memory leak).
         assert _batch_jobs == {}
 
 
+    def test_hourly_printer_indexes_job_and_label(self, client, tmp_path, monkeypatch):
+        from label_index import read_index
+
+        output = str(tmp_path / "hourly")
+        monkeypatch.setenv("VIRTUAL_PRINTERS", json.dumps([
+            {"name": "Test Printer", "path": output, "layout": "hourly"},
+        ]))
+        resp = client.post(
+            "/api/batch-print",
+            data=json.dumps({
+                "widgets": [_widget()],
+                "settings": _settings(),
+                "rows": [{"name": "Alice"}, {"name": "Bob"}],
+                "copies": 2,
+                "jobId": "indexed-job",
+            }),
+            content_type="application/json",
+        )
+        assert _read_sse(resp)[-1]["event"] == "done"
+        entries = list(read_index(output, job_id="indexed-job"))
+        assert [e["index"] for e in entries] == [0, 1, 2, 3]
+
+
+    def test_unknown_printer_id_returns_400(self, client):
+        resp = client.post(
+            "/api/batch-print",
+            data=json.dumps({
+                "widgets": [_widget()],
+                "settings": {**_settings(), "printerId": "virtual:Nope"},
+                "rows": [{"name": "A"}],
+            }),
+            content_type="application/json",
+        )
+        assert resp.status_code == 400
+        assert resp.json["message"] == "Unknown printer: virtual:Nope"
+
+
+class TestBatchPrintStripMode:
+    def _post(self, client, **extra):
+        body = {
+            "widgets": [_widget()],
+            "settings": _settings(),
+            "rows": [{"name": "A"}, {"name": "B"}, {"name": "C"}],
+            "copies": 2,
+            **extra,
+        }
+        return client.post(
+            "/api/batch-print", data=json.dumps(body), content_type="application/json"
+        )
+
+    @pytest.mark.parametrize(
+        "extra",
+        [
+            {"stripLabels": 0},
+            {"stripLabels": 1.5},
+            {"stripLabels": True},
+            {"stripLabels": 10_000},
+            {"stripMaxLengthMm": 0},
+            {"stripMaxLengthMm": "long"},
+            {"stripMaxLengthMm": 1_000_000},
+        ],
+    )
+    def test_invalid_strip_options_return_400(self, client, extra):
+        resp = self._post(client, **extra)
+        assert resp.status_code == 400
+        assert "strip" in resp.json["message"]
+
+    @patch("app.print_label")
+    @patch("app.print_bitmap")
+    def test_fixed_count_groups_labels_into_jobs(self, mock_bitmap, mock_label, client):
+        resp = self._post(client, stripLabels=4)
+        events = _read_sse(resp)
+        # 6 labels in strips of 4 → 2 print jobs, no per-label prints.
+        assert mock_bitmap.call_count == 2
+        mock_label.assert_not_called()
+        printed = [e["index"] for e in events if e["event"] == "printed"]
+        assert printed == list(range(6))
+        assert events[-1] == {"event": "done", "total": 6}
+
+    @patch("app.print_bitmap")
+    def test_strip_width_is_sum_of_member_labels(self, mock_bitmap, client):
+        from app import UPLOAD_DIR, _substitute_widgets
+        from label_builder import render_payload
+
+        _read_sse(self._post(client, stripLabels=2))
+        single = render_payload(
+            _substitute_widgets([_widget()], {"name": "A"}), _settings(), UPLOAD_DIR
+        )
+        strip = mock_bitmap.call_args_list[0].args[0]
+        assert strip.width == 2 * single.width
+        assert strip.height == single.height
+
+    @patch("app.print_bitmap")
+    def test_max_length_limits_labels_per_strip(self, mock_bitmap, client):
+        from app import UPLOAD_DIR
+        from label_builder import render_payload
+        from labelle.lib.constants import PIXELS_PER_MM
+
+        width = render_payload(
+            [{"type": "text", "text": "Hello A", "id": "1"}], _settings(), UPLOAD_DIR
+        ).width
+        # Room for three labels but not four.
+        max_mm = (width * 3.5) / PIXELS_PER_MM
+        _read_sse(self._post(client, rows=[{"name": "A"}], copies=6, stripMaxLengthMm=max_mm))
+        widths = [c.args[0].width for c in mock_bitmap.call_args_list]
+        assert widths == [3 * width, 3 * width]
+
+    @patch("app.print_bitmap")
+    def test_separators_painted_between_labels_in_strip(self, mock_bitmap, client):
+        from app import UPLOAD_DIR
+        from label_builder import render_payload
+
+        single = render_payload(
+            [{"type": "text", "text": "Hello A", "id": "1"}], _settings(), UPLOAD_DIR
+        )
+        _read_sse(self._post(client, rows=[{"name": "A"}], copies=2, stripLabels=2))
+        strip = mock_bitmap.call_args.args[0]
+        column = single.width - _settings()["marginPx"]
+        assert strip.getpixel((column, 0)) == 1
+        # Last label of the last strip stays clean.
+        assert strip.getpixel((single.width + column, 0)) == 0
+
+    @patch("app.print_bitmap")
+    def test_render_error_reports_failing_index(self, mock_bitmap, client):
+        widget = {"type": "text", "text": "{{name}}", "id": "1"}
+        resp = self._post(
+            client,
+            widgets=[widget],
+            rows=[{"name": "A"}, {"name": ""}],
+            copies=1,
+            stripLabels=5,
+        )
+        events = _read_sse(resp)
+        # Label 0 still goes out; label 1 has nothing to render.
+        assert mock_bitmap.call_count == 1
+        assert events[-1]["event"] == "error"
+        assert events[-1]["index"] == 1
+
+
 class TestBatchPrintHeaders:
     @patch("app.print_label")
     def test_sse_response_has_anti_buffering_headers(self, mock_print, client):
@@ -411,17 +612,18 @@ class TestBatchPrintHeaders:
             }),
             content_type="application/json",
         )
-        assert resp.headers.get("Cache-Control") == "no-cache"
-        assert resp.headers.get("X-Accel-Buffering") == "no"
-        _read_sse(resp)  # drain
+        stream = client.get(resp.json["events"])
+        assert stream.headers.get("Cache-Control") == "no-cache"
+        assert stream.headers.get("X-Accel-Buffering") == "no"
+        _read_sse(stream)  # drain
 
 
 class TestBatchPrintConcurrency:
-    def test_returns_409_when_another_job_running(self, client):
+    def test_returns_409_when_job_id_already_running(self, client):
         # Seed a fake in-flight job in the tracker.
         from app import _batch_jobs
 
-        _batch_jobs["fake"] = {"cancelled": False}
+        _batch_jobs["fake-job-id"] = {"cancelled": False}
 
         resp = client.post(
             "/api/batch-print",
@@ -429,13 +631,188 @@ class TestBatchPrintConcurrency:
                 "widgets": [_widget()],
                 "settings": _settings(),
                 "rows": [{"name": "A"}],
+                "jobId": "fake-job-id",
             }),
             content_type="application/json",
         )
         assert resp.status_code == 409
         assert "already running" in resp.json["message"]
 
+    @patch("app.print_label")
+    def test_other_running_job_does_not_block_new_batch(self, mock_print, client):
+        from app import _batch_jobs
+
+        _batch_jobs["other-job-id"] = {"cancelled": False}
 
+        resp = client.post(
+            "/api/batch-print",
+            data=json.dumps({
+                "widgets": [_widget()],
+                "settings": _settings(),
+                "rows": [{"name": "A"}],
+            }),
+            content_type="application/json",
+        )
+        assert resp.status_code == 202
+        assert _read_sse(resp)[-1]["event"] == "done"
+        assert mock_print.call_count == 1
+
+    def test_batch_waits_behind_same_printer_and_reports_position(self, client):
+        import threading
+
+        from app import _scheduler
+        from job_queue import PrintJob
+
+        release = threading.Event()
+        blocker = PrintJob(lambda job: release.wait(5))
+        _scheduler.submit("virtual:Test_Printer", blocker)
+        try:
+            with patch("app.print_label") as mock_print:
+                resp = client.post(
+                    "/api/batch-print",
+                    data=json.dumps({
+                        "widgets": [_widget()],
+                        "settings": _settings(),
+                        "rows": [{"name": "A"}],
+                    }),
+                    content_type="application/json",
+                )
+                assert resp.status_code == 202
+                assert resp.json["queue"][0]["position"] == 1
+                assert mock_print.call_count == 0
+                release.set()
+                events = _read_sse(resp)
+            assert events[0]["event"] == "queued"
+            assert events[-1]["event"] == "done"
+            assert mock_print.call_count == 1
+        finally:
+            release.set()
+
+
+class TestBatchProgressStream:
+    def _post(self, client, rows=({"name": "A"}, {"name": "B"})):
+        return client.post(
+            "/api/batch-print",
+            data=json.dumps({
+                "widgets": [_widget()],
+                "settings": _settings(),
+                "rows": list(rows),
+            }),
+            content_type="application/json",
+        )
+
+    @staticmethod
+    def _ids(resp):
+        return [
+            int(line[4:])
+            for line in b"".join(resp.response).decode().split("\n")
+            if line.startswith("id: ")
+        ]
+
+    @pytest.mark.asgi
+    @patch("app.print_label")
+    def test_last_event_id_replays_only_newer_events(self, mock_print, client):
+        resp = self._post(client)
+        url = resp.json["events"]
+        full = _read_sse(client.get(url))
+
+        replay = client.get(url, headers={"Last-Event-ID": "2"})
+        assert self._ids(replay) == list(range(3, len(full) + 1))
+        assert _read_sse(client.get(url, query_string={"lastEventId": "2"})) == full[2:]
+
+    @pytest.mark.asgi
+    @patch("app.print_label")
+    def test_second_watcher_sees_same_events(self, mock_print, client):
+        url = self._post(client).json["events"]
+        assert _read_sse(client.get(url)) == _read_sse(client.get(url))
+
+    def test_closing_stream_does_not_cancel_batch(self, client):
+        import threading
+
+        release = threading.Event()
+        with patch("app.print_label", side_effect=lambda *a, **k: release.wait(5)) as mock_print:
+            resp = self._post(client)
+            stream = client.get(resp.json["events"])
+            next(iter(stream.response))
+            stream.close()
+            release.set()
+            events = _read_sse(client.get(resp.json["events"]))
+        assert events[-1]["event"] == "done"
+        assert mock_print.call_count == 2
+
+    @patch("app.print_label")
+    def test_stream_releases_its_admission_slot(self, mock_print, client):
+        from app import _bulkheads
+
+        url = self._post(client).json["events"]
+        _read_sse(client.get(url))
+        stream = client.get(url)
+        next(iter(stream.response))
+        assert _bulkheads["stream"].in_flight == 1
+        stream.close()
+        assert _bulkheads["stream"].in_flight == 0
+
+    @pytest.mark.asgi
+    @patch("app.print_label")
+    def test_status_endpoint_reports_progress(self, mock_print, client):
+        resp = self._post(client)
+        job_id = resp.json["jobId"]
+        _read_sse(resp)
+
+        status = client.get(f"/api/batch-print/{job_id}").json
+        assert status["state"] == "done"
+        assert status["printed"] == 2
+        assert status["total"] == 2
+        assert status["printers"] == [
+            {"printer": "virtual:Test_Printer", "state": "done", "printed": 2}
+        ]
+
+    @pytest.mark.asgi
+    def test_status_is_running_while_labels_print(self, client):
+        import threading
+
+        printing = threading.Event()
+        release = threading.Event()
+
+        def slow_print(*args, **kwargs):
+            printing.set()
+            release.wait(5)
+
+        with patch("app.print_label", side_effect=slow_print):
+            job_id = self._post(client).json["jobId"]
+            try:
+                assert printing.wait(5)
+                assert client.get(f"/api/batch-print/{job_id}").json["state"] == "running"
+            finally:
+                release.set()
+            assert _read_sse(client.get(f"/api/batch-print/{job_id}/events"))[-1]["event"] == "done"
+
+    def test_finished_batch_keeps_no_parts_or_renders(self, client):
+        from app import _batch_history
+        from label_builder import RenderCache
+
+        caches = []
+
+        def make_cache():
+            caches.append(RenderCache())
+            return caches[-1]
+
+        with patch("app.RenderCache", side_effect=make_cache):
+            resp = self._post(client)
+            job_id = resp.json["jobId"]
+            assert _read_sse(resp)[-1]["event"] == "done"
+        assert _batch_history[job_id].parts == []
+        (cache,) = caches
+        assert cache.misses > 0
+        assert not cache._bitmaps
+
+    @pytest.mark.asgi
+    def test_unknown_job_returns_404(self, client):
+        assert client.get("/api/batch-print/nope-nope/events").status_code == 404
+        assert client.get("/api/batch-print/nope-nope").status_code == 404
+
+
+@pytest.mark.asgi
 class TestBatchCancel:
     def test_cancel_unknown_job_returns_404(self, client):
         resp = client.post(
@@ -495,7 +872,238 @@ class TestBatchCancel:
             }),
             content_type="application/json",
         )
-        assert resp.status_code == 200
+        assert resp.status_code == 202
         events = _read_sse(resp)
         assert mock_print.call_count == 1
         assert any(e["event"] == "cancelled" for e in events)
+
+
+@pytest.fixture
+def pool_env(virtual_printer_env, monkeypatch):
+    monkeypatch.setenv("PRINTER_POOLS", json.dumps([
+        {"name": "badges", "members": ["virtual:Test_Printer", "virtual:Office_2nd_Floor"]},
+        {"name": "fast", "members": ["virtual:Test_Printer", "virtual:Office_2nd_Floor"],
+         "strategy": "throughput"},
+        {"name": "ghosts", "members": ["virtual:Nowhere"]},
+    ]))
+
+
+class TestBatchPrintPool:
+    def _post(self, client, printer_id, rows, copies=1):
+        settings = {**_settings(), "printerId": printer_id}
+        return client.post(
+            "/api/batch-print",
+            data=json.dumps({
+                "widgets": [_widget()],
+                "settings": settings,
+                "rows": rows,
+                "copies": copies,
+            }),
+            content_type="application/json",
+        )
+
+    @patch("app.print_label")
+    def test_round_robin_keeps_copies_of_a_row_together(self, mock_print, pool_env, client):
+        resp = self._post(client, "pool:badges", [{"name": n} for n in "ABC"], copies=2)
+        assert resp.status_code == 202
+        events = _read_sse(resp)
+        assert events[-1] == {"event": "done", "total": 6}
+
+        by_printer: dict[str, list[str]] = {}
+        for call in mock_print.call_args_list:
+            by_printer.setdefault(call.kwargs["printer_id"], []).append(call.args[0][0]["text"])
+        assert by_printer == {
+            "virtual:Test_Printer": ["Hello A", "Hello A", "Hello C", "Hello C"],
+            "virtual:Office_2nd_Floor": ["Hello B", "Hello B"],
+        }
+
+    @patch("app.print_label")
+    def test_progress_is_reported_per_printer(self, mock_print, pool_env, client):
+        events = _read_sse(self._post(client, "pool:badges", [{"name": "A"}, {"name": "B"}]))
+        queued = [e for e in events if e["event"] == "queued"]
+        assert {e["printer"] for e in queued} == {"virtual:Test_Printer", "virtual:Office_2nd_Floor"}
+        printed = {e["index"]: e["printer"] for e in events if e["event"] == "printed"}
+        assert printed == {0: "virtual:Test_Printer", 1: "virtual:Office_2nd_Floor"}
+
+    @patch("app.print_label")
+    def test_throughput_pool_prints_every_label_once(self, mock_print, pool_env, client):
+        events = _read_sse(self._post(client, "pool:fast", [{"name": n} for n in "ABCDE"]))
+        assert events[-1]["event"] == "done"
+        texts = sorted(call.args[0][0]["text"] for call in mock_print.call_args_list)
+        assert texts == [f"Hello {n}" for n in "ABCDE"]
+
+    def test_pool_without_healthy_members_returns_503(self, pool_env, client):
+        resp = self._post(client, "pool:ghosts", [{"name": "A"}])
+        assert resp.status_code == 503
+
+    def test_unknown_pool_returns_400(self, pool_env, client):
+        resp = self._post(client, "pool:nope", [{"name": "A"}])
+        assert resp.status_code == 400
+
+
+class TestBatchResume:
+    def _start(self, client, job_id, rows):
+        return client.post(
+            "/api/batch-print",
+            data=json.dumps({
+                "widgets": [_widget()],
+                "settings": _settings(),
+                "rows": rows,
+                "jobId": job_id,
+            }),
+            content_type="application/json",
+        )
+
+    def _resume(self, client, job_id):
+        return client.post(
+            "/api/batch-print/resume",
+            data=json.dumps({"jobId": job_id}),
+            content_type="application/json",
+        )
+
+    def test_resume_continues_from_first_unprinted_label(self, client):
+        rows = [{"name": n} for n in "ABCDE"]
+        with patch("app.print_label") as mock_print:
+            mock_print.side_effect = [None, None, RuntimeError("jammed")]
+            events = _read_sse(self._start(client, "resume-job-1", rows))
+        assert events[-1]["event"] == "error"
+
+        listed = client.get("/api/batch-print/resumable").json["jobs"]
+        job = next(j for j in listed if j["jobId"] == "resume-job-1")
+        assert job["printed"] == 2
+        assert job["total"] == 5
+        assert job["state"] == "failed"
+
+        with patch("app.print_label") as mock_print:
+            resp = self._resume(client, "resume-job-1")
+            assert resp.status_code == 202
+            events = _read_sse(resp)
+        texts = [call.args[0][0]["text"] for call in mock_print.call_args_list]
+        assert texts == ["Hello C", "Hello D", "Hello E"]
+        started = next(e for e in events if e["event"] == "started")
+        assert started["alreadyPrinted"] == 2
+        assert events[-1] == {"event": "done", "total": 5}
+
+        # A finished batch's journal is gone.
+        assert self._resume(client, "resume-job-1").status_code == 404
+
+    @patch("app.print_label")
+    def test_completed_batch_is_not_resumable(self, mock_print, client):
+        _read_sse(self._start(client, "resume-job-2", [{"name": "A"}]))
+        assert self._resume(client, "resume-job-2").status_code == 404
+
+    @patch("app.print_label")
+    def test_resumed_pool_batch_counts_only_pending_labels(self, mock_print, pool_env, client):
+        from batch_journal import BatchJournal
+
+        request = {
+            "widgets": [_widget()],
+            "settings": {**_settings(), "printerId": "pool:badges"},
+            "rows": [{"name": n} for n in "ABC"],
+            "copies": 2,
+            "pauseTime": 0,
+        }
+        journal = BatchJournal.create("resume-pool-1", request)
+        # Row A fully printed, one copy of row B.
+        journal.printed([0, 1, 2])
+        journal.finish("cancelled")
+
+        resp = self._resume(client, "resume-pool-1")
+        assert resp.status_code == 202
+        events = _read_sse(resp)
+        queued = {e["printer"]: e["total"] for e in events if e["event"] == "queued"}
+        # Rows B and C are left: B (1 copy) on the first member, C (2) on the second.
+        assert queued == {"virtual:Test_Printer": 1, "virtual:Office_2nd_Floor": 2}
+        assert mock_print.call_count == 3
+        assert events[-1] == {"event": "done", "total": 6}
+
+    def test_resume_onto_a_re_enumerated_usb_printer(self, client):
+        from unittest.mock import MagicMock
+
+        def usb_device(usb_id):
+            return MagicMock(is_supported=True, usb_id=usb_id)
+
+        settings = {**_settings(), "printerId": "Bus 001 Device 004: ID 0922:1002"}
+        rows = [{"name": n} for n in "ABC"]
+        with patch("printer_service._discovery") as discovery, patch("app.print_label") as mock_print:
+            discovery.devices.return_value = [usb_device("Bus 001 Device 004: ID 0922:1002")]
+            mock_print.side_effect = [None, RuntimeError("unplugged")]
+            events = _read_sse(client.post("/api/batch-print", json={
+                "widgets": [_widget()], "settings": settings, "rows": rows, "jobId": "resume-usb-1",
+            }))
+            assert events[-1]["event"] == "error"
+
+            # After a replug the printer has a new bus address.
+            discovery.devices.return_value = [usb_device("Bus 001 Device 009: ID 0922:1002")]
+            assert self._resume(client, "resume-usb-1").status_code == 400
+
+            mock_print.side_effect = None
+            mock_print.reset_mock()
+            resp = client.post("/api/batch-print/resume", json={
+                "jobId": "resume-usb-1", "printerId": "Bus 001 Device 009: ID 0922:1002",
+            })
+            assert resp.status_code == 202
+            events = _read_sse(resp)
+        assert events[-1]["event"] == "done"
+        assert [call.kwargs["printer_id"] for call in mock_print.call_args_list] == ["Bus 001 Device 009: ID 0922:1002"] * 2
+
+    def test_resume_onto_another_printer_is_remembered(self, client):
+        import batch_journal
+
+        with patch("app.print_label", side_effect=[None, RuntimeError("jammed"), RuntimeError("jammed")]):
+            _read_sse(self._start(client, "resume-move-1", [{"name": n} for n in "ABC"]))
+            resp = client.post("/api/batch-print/resume", json={
+                "jobId": "resume-move-1", "printerId": "virtual:Office_2nd_Floor",
+            })
+            assert _read_sse(resp)[-1]["event"] == "error"
+        request = batch_journal.load("resume-move-1")["request"]
+        assert request["settings"]["printerId"] == "virtual:Office_2nd_Floor"
+
+    def test_resume_rejects_non_string_printer_id(self, client):
+        resp = client.post("/api/batch-print/resume", json={"jobId": "resume-bad-1", "printerId": 7})
+        assert resp.status_code == 400
+
+    def _start_with_image(self, client, job_id):
+        import os
+
+        from app import UPLOAD_DIR
+
+        filename = f"{job_id}.png"
+        with open(os.path.join(UPLOAD_DIR, filename), "wb") as f:
+            f.write(b"png")
+        widgets = [_widget(), {"type": "image", "filename": filename, "id": "2"}]
+        with patch("app.print_label", side_effect=[None, RuntimeError("jammed")]):
+            _read_sse(client.post(
+                "/api/batch-print",
+                json={"widgets": widgets, "settings": _settings(), "rows": [{"name": "A"}, {"name": "B"}],
+                      "jobId": job_id},
+            ))
+        # A restart empties the upload directory.
+        os.remove(os.path.join(UPLOAD_DIR, filename))
+        return os.path.join(UPLOAD_DIR, filename)
+
+    def test_resume_restores_images_from_the_journal(self, client):
+        upload = self._start_with_image(client, "resume-image-1")
+        with patch("app.print_label") as mock_print:
+            events = _read_sse(self._resume(client, "resume-image-1"))
+        assert events[-1]["event"] == "done"
+        with open(upload, "rb") as f:
+            assert f.read() == b"png"
+        assert mock_print.call_count == 1
+
+    def test_resume_with_missing_image_is_refused(self, client):
+        import batch_journal
+
+        self._start_with_image(client, "resume-image-2")
+        batch_journal.image_path("resume-image-2", "resume-image-2.png").unlink()
+        with patch("app.print_label") as mock_print:
+            resp = self._resume(client, "resume-image-2")
+        assert resp.status_code == 409
+        assert "resume-image-2.png" in resp.json["message"]
+        mock_print.assert_not_called()
+
+    def test_resume_unknown_job_returns_404(self, client):
+        assert self._resume(client, "never-existed").status_code == 404
+
+    def test_resume_rejects_bad_job_id(self, client):
+        assert self._resume(client, "../../etc").status_code == 400
@@ -0,0 +1,104 @@
+"""Tests for batch_journal (append-only, resumable batch journals)."""
+
+import pytest
+
+import batch_journal
+import usb_power
+from batch_journal import BatchJournal
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(usb_power, "_STATE_FILE", tmp_path / "state.json")
+    return tmp_path
+
+
+REQUEST = {"widgets": [], "settings": {"printerId": "virtual:X"}, "rows": [{}, {}], "copies": 3}
+
+
+class TestJournal:
+    def test_records_plan_and_printed_labels(self):
+        journal = BatchJournal.create("job-0001", REQUEST)
+        journal.printed([0])
+        journal.printed([1, 2])
+
+        record = batch_journal.load("job-0001")
+        assert record["request"] == REQUEST
+        assert record["printed"] == {0, 1, 2}
+        assert record["state"] == "interrupted"
+
+    def test_cancelled_journal_keeps_end_state(self):
+        journal = BatchJournal.create("job-0002", REQUEST)
+        journal.printed([0])
+        journal.finish("cancelled")
+        assert batch_journal.load("job-0002")["state"] == "cancelled"
+
+    def test_done_journal_is_removed(self):
+        journal = BatchJournal.create("job-0003", REQUEST)
+        journal.finish("done")
+        assert batch_journal.load("job-0003") is None
+
+    def test_reopen_appends_and_marks_resumed(self):
+        first = BatchJournal.create("job-0004", REQUEST)
+        first.printed([0, 1])
+        first.finish("failed")
+
+        resumed = BatchJournal.reopen("job-0004")
+        resumed.printed([2])
+        record = batch_journal.load("job-0004")
+        assert record["printed"] == {0, 1, 2}
+        assert record["state"] == "interrupted"
+
+    def test_resume_records_its_printer(self):
+        BatchJournal.create("job-0008", REQUEST).finish("failed")
+        BatchJournal.reopen("job-0008", "usb:new-address")
+        assert batch_journal.load("job-0008")["request"]["settings"] == {"printerId": "usb:new-address"}
+
+    def test_torn_last_line_is_ignored(self, state_dir):
+        journal = BatchJournal.create("job-0005", REQUEST)
+        journal.printed([0])
+        with open(state_dir / "batches" / "job-0005.jsonl", "a") as f:
+            f.write('{"printed": [1')
+        assert batch_journal.load("job-0005")["printed"] == {0}
+
+    def test_keeps_image_copies_until_done(self, tmp_path):
+        upload = tmp_path / "abc123.png"
+        upload.write_bytes(b"png")
+        journal = BatchJournal.create("job-0006", REQUEST, images=[str(upload)])
+        upload.unlink()
+        assert batch_journal.image_path("job-0006", "abc123.png").read_bytes() == b"png"
+        assert batch_journal.image_path("job-0006", "other.png") is None
+        journal.finish("done")
+        assert batch_journal.image_path("job-0006", "abc123.png") is None
+
+    def test_discard_removes_images(self, tmp_path):
+        upload = tmp_path / "abc123.png"
+        upload.write_bytes(b"png")
+        BatchJournal.create("job-0007", REQUEST, images=[str(upload)]).finish("failed")
+        batch_journal.discard("job-0007")
+        assert batch_journal.image_path("job-0007", "abc123.png") is None
+
+    def test_unwritable_directory_disables_journal(self, state_dir, monkeypatch):
+        blocker = state_dir / "not-a-dir"
+        blocker.write_text("")
+        monkeypatch.setattr(usb_power, "_STATE_FILE", blocker / "state.json")
+        journal = BatchJournal.create("job-0006", REQUEST)
+        journal.printed([0])  # must not raise
+        journal.finish("done")
+        assert batch_journal.load("job-0006") is None
+
+
+class TestListResumable:
+    def test_summarises_unfinished_journals(self):
+        journal = BatchJournal.create("job-0007", REQUEST)
+        journal.printed([0, 1])
+        journal.finish("cancelled")
+        BatchJournal.create("job-0008", REQUEST).finish("done")
+
+        jobs = batch_journal.list_resumable()
+        assert len(jobs) == 1
+        assert jobs[0]["jobId"] == "job-0007"
+        assert jobs[0]["printed"] == 2
+        assert jobs[0]["total"] == 6
+        assert jobs[0]["state"] == "cancelled"
+        assert jobs[0]["printerId"] == "virtual:X"
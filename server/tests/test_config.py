@@ -1,7 +1,15 @@
 import json
 import os
 
-from config import get_virtual_printers
+from config import (
+    DEFAULT_ADMISSION_LIMITS,
+    get_admission_config,
+    get_hotplug_interval,
+    get_printer_discovery_ttl,
+    get_printer_pools,
+    get_usb_power_backend,
+    get_virtual_printers,
+)
 
 
 class TestGetVirtualPrinters:
@@ -112,8 +120,181 @@ class TestGetVirtualPrinters:
         result = get_virtual_printers()
         assert result[0]["output"] == "both"
 
+    def test_layout_field(self):
+        config = [
+            {"name": "A", "path": "/tmp/a", "layout": "hourly"},
+            {"name": "B", "path": "/tmp/b", "layout": "daily"},
+        ]
+        self._set_env(json.dumps(config))
+        result = get_virtual_printers()
+        assert [(p["name"], p["layout"]) for p in result] == [("A", "hourly")]
+
+    def test_output_field_archive_accepted(self):
+        config = [{"name": "Test", "path": "/tmp/test", "output": "archive"}]
+        self._set_env(json.dumps(config))
+        result = get_virtual_printers()
+        assert result[0]["output"] == "archive"
+
     def test_invalid_output_field_skipped(self):
         config = [{"name": "Test", "path": "/tmp/test", "output": "pdf"}]
         self._set_env(json.dumps(config))
         result = get_virtual_printers()
         assert result == []
+
+    def test_write_behind_fields_accepted(self):
+        config = [{"name": "Test", "path": "/tmp/test", "write": "behind", "queue": 16, "fsync": "idle"}]
+        self._set_env(json.dumps(config))
+        result = get_virtual_printers()
+        assert (result[0]["write"], result[0]["queue"], result[0]["fsync"]) == ("behind", 16, "idle")
+
+    def test_invalid_write_behind_fields_skipped(self):
+        config = [
+            {"name": "A", "path": "/tmp/a", "write": "later"},
+            {"name": "B", "path": "/tmp/b", "fsync": "sometimes"},
+            {"name": "C", "path": "/tmp/c", "queue": 0},
+            {"name": "D", "path": "/tmp/d", "queue": "8"},
+        ]
+        self._set_env(json.dumps(config))
+        assert get_virtual_printers() == []
+
+
+class TestGetPrinterPools:
+    def teardown_method(self):
+        os.environ.pop("PRINTER_POOLS", None)
+
+    def test_valid_config_defaults_strategy(self):
+        os.environ["PRINTER_POOLS"] = json.dumps([{"name": "badges", "members": ["virtual:A", "virtual:B"]}])
+        result = get_printer_pools()
+        assert result == [{"name": "badges", "members": ["virtual:A", "virtual:B"], "strategy": "round-robin"}]
+
+    def test_unset_env_var(self):
+        os.environ.pop("PRINTER_POOLS", None)
+        assert get_printer_pools() == []
+
+    def test_invalid_json(self):
+        os.environ["PRINTER_POOLS"] = "not json"
+        assert get_printer_pools() == []
+
+    def test_skips_pool_without_members(self):
+        os.environ["PRINTER_POOLS"] = json.dumps([
+            {"name": "empty", "members": []},
+            {"name": "ok", "members": ["virtual:A"]},
+        ])
+        assert [p["name"] for p in get_printer_pools()] == ["ok"]
+
+    def test_duplicate_members_are_dropped(self, caplog):
+        os.environ["PRINTER_POOLS"] = json.dumps([
+            {"name": "badges", "members": ["virtual:A", "virtual:B", "virtual:A"]},
+        ])
+        assert get_printer_pools()[0]["members"] == ["virtual:A", "virtual:B"]
+        assert "more than once" in caplog.text
+
+    def test_skips_unknown_strategy(self):
+        os.environ["PRINTER_POOLS"] = json.dumps([
+            {"name": "x", "members": ["virtual:A"], "strategy": "random"},
+        ])
+        assert get_printer_pools() == []
+
+
+class TestGetAdmissionConfig:
+    _VARS = (
+        "ADMISSION_PREVIEW_LIMIT",
+        "ADMISSION_QUEUE_TIMEOUT_SECONDS",
+        "PREVIEW_RATE_LIMIT_PER_SECOND",
+        "PREVIEW_RATE_LIMIT_BURST",
+    )
+
+    def setup_method(self):
+        self._saved = {name: os.environ.pop(name, None) for name in self._VARS}
+
+    def teardown_method(self):
+        for name, value in self._saved.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+
+    def test_defaults(self):
+        result = get_admission_config()
+        assert result["limits"] == DEFAULT_ADMISSION_LIMITS
+        assert result["queueTimeout"] == 2.0
+        assert result["previewRate"] == 5.0
+        assert result["previewBurst"] == 10
+
+    def test_overrides(self):
+        os.environ["ADMISSION_PREVIEW_LIMIT"] = "6"
+        os.environ["PREVIEW_RATE_LIMIT_PER_SECOND"] = "0"
+        result = get_admission_config()
+        assert result["limits"]["preview"] == 6
+        assert result["previewRate"] == 0
+
+    def test_invalid_values_fall_back_to_defaults(self):
+        os.environ["ADMISSION_PREVIEW_LIMIT"] = "0"
+        os.environ["ADMISSION_QUEUE_TIMEOUT_SECONDS"] = "soon"
+        result = get_admission_config()
+        assert result["limits"]["preview"] == DEFAULT_ADMISSION_LIMITS["preview"]
+        assert result["queueTimeout"] == 2.0
+
+    def test_non_finite_values_fall_back_to_defaults(self, caplog):
+        os.environ["ADMISSION_QUEUE_TIMEOUT_SECONDS"] = "nan"
+        os.environ["PREVIEW_RATE_LIMIT_PER_SECOND"] = "inf"
+        result = get_admission_config()
+        assert result["queueTimeout"] == 2.0
+        assert result["previewRate"] == 5.0
+        assert "ADMISSION_QUEUE_TIMEOUT_SECONDS must be a finite number" in caplog.text
+
+
+class TestGetPrinterDiscoveryTtl:
+    def test_default(self, monkeypatch):
+        monkeypatch.delenv("PRINTER_DISCOVERY_TTL_SECONDS", raising=False)
+        assert get_printer_discovery_ttl() == 5.0
+
+    def test_invalid_falls_back(self, monkeypatch, caplog):
+        monkeypatch.setenv("PRINTER_DISCOVERY_TTL_SECONDS", "5s")
+        assert get_printer_discovery_ttl() == 5.0
+        assert "PRINTER_DISCOVERY_TTL_SECONDS" in caplog.text
+
+    def test_infinite_falls_back(self, monkeypatch):
+        monkeypatch.setenv("PRINTER_DISCOVERY_TTL_SECONDS", "inf")
+        assert get_printer_discovery_ttl() == 5.0
+
+
+class TestGetHotplugInterval:
+    def test_zero_disables(self, monkeypatch):
+        monkeypatch.setenv("PRINTER_HOTPLUG_INTERVAL_SECONDS", "0")
+        assert get_hotplug_interval() == 0
+
+    def test_invalid_falls_back(self, monkeypatch, caplog):
+        monkeypatch.setenv("PRINTER_HOTPLUG_INTERVAL_SECONDS", "fast")
+        assert get_hotplug_interval() == 2.0
+        assert "PRINTER_HOTPLUG_INTERVAL_SECONDS" in caplog.text
+
+
+class TestLoadDotenv:
+    def test_existing_variables_win(self, monkeypatch, tmp_path):
+        import config
+
+        env_file = tmp_path / ".env"
+        env_file.write_text("LABELLE_TEST_SET=from-file\nLABELLE_TEST_UNSET=from-file\n")
+        monkeypatch.setenv("LABELLE_TEST_SET", "from-env")
+        monkeypatch.delenv("LABELLE_TEST_UNSET", raising=False)
+        try:
+            config.load_dotenv(str(env_file))
+            assert os.environ["LABELLE_TEST_SET"] == "from-env"
+            assert os.environ["LABELLE_TEST_UNSET"] == "from-file"
+        finally:
+            os.environ.pop("LABELLE_TEST_UNSET", None)
+
+
+class TestGetUsbPowerBackend:
+    def test_default_is_uhubctl(self, monkeypatch):
+        monkeypatch.delenv("USB_POWER_BACKEND", raising=False)
+        assert get_usb_power_backend() == "uhubctl"
+
+    def test_sysfs(self, monkeypatch):
+        monkeypatch.setenv("USB_POWER_BACKEND", " SysFS ")
+        assert get_usb_power_backend() == "sysfs"
+
+    def test_invalid_falls_back(self, monkeypatch, caplog):
+        monkeypatch.setenv("USB_POWER_BACKEND", "gpio")
+        assert get_usb_power_backend() == "uhubctl"
+        assert "USB_POWER_BACKEND" in caplog.text
@@ -0,0 +1,111 @@
+"""Tests for hotplug_monitor: sysfs enumeration and change detection."""
+
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from hotplug_monitor import HotplugMonitor, SysfsDeviceSource
+
+DYMO_A = "Bus 001 Device 005: ID 0922:1002"
+DYMO_B = "Bus 001 Device 009: ID 0922:1002"
+
+
+class FakeSource:
+    """Device source that replays a scripted sequence of snapshots."""
+
+    def __init__(self, *snapshots):
+        self._snapshots = list(snapshots)
+
+    def snapshot(self):
+        if len(self._snapshots) > 1:
+            return set(self._snapshots.pop(0))
+        return set(self._snapshots[0])
+
+
+def _add_sysfs_device(root: Path, name: str, vendor: str, product: str, bus: int, dev: int):
+    d = root / name
+    d.mkdir(parents=True)
+    (d / "idVendor").write_text(f"{vendor}\n")
+    (d / "idProduct").write_text(f"{product}\n")
+    (d / "busnum").write_text(f"{bus}\n")
+    (d / "devnum").write_text(f"{dev}\n")
+
+
+class TestSysfsDeviceSource:
+    def test_lists_only_matching_vendor_as_usb_ids(self, tmp_path):
+        _add_sysfs_device(tmp_path, "1-1.3", "0922", "1002", 1, 5)
+        _add_sysfs_device(tmp_path, "1-1.4", "046d", "c52b", 1, 6)
+        # Interface directories have no idVendor and must be skipped.
+        (tmp_path / "1-1.3:1.0").mkdir()
+        assert SysfsDeviceSource(str(tmp_path)).snapshot() == {DYMO_A}
+
+    def test_unavailable_when_root_missing(self, tmp_path):
+        assert not SysfsDeviceSource(str(tmp_path / "absent")).available()
+
+    def test_reenumeration_changes_id(self, tmp_path):
+        source = SysfsDeviceSource(str(tmp_path))
+        _add_sysfs_device(tmp_path, "1-1.3", "0922", "1002", 1, 5)
+        before = source.snapshot()
+        (tmp_path / "1-1.3" / "devnum").write_text("9\n")
+        assert source.snapshot() != before
+
+
+class TestHotplugMonitor:
+    def test_first_poll_is_baseline_only(self):
+        on_change = MagicMock()
+        monitor = HotplugMonitor(FakeSource({DYMO_A}), on_change)
+        assert monitor.poll_once() is False
+        on_change.assert_not_called()
+
+    def test_reports_attach_and_detach(self):
+        on_change = MagicMock()
+        monitor = HotplugMonitor(FakeSource(set(), {DYMO_A}, {DYMO_B}), on_change)
+        monitor.poll_once()
+        assert monitor.poll_once() is True
+        on_change.assert_called_with({DYMO_A}, set())
+        monitor.poll_once()
+        on_change.assert_called_with({DYMO_B}, {DYMO_A})
+        kinds = [e["event"] for e in monitor.stats()["events"]]
+        assert kinds == ["attach", "attach", "detach"]
+
+    def test_no_change_no_callback(self):
+        on_change = MagicMock()
+        monitor = HotplugMonitor(FakeSource({DYMO_A}), on_change)
+        for _ in range(3):
+            monitor.poll_once()
+        on_change.assert_not_called()
+
+    def test_records_latency(self):
+        def slow_update(attached, detached):
+            time.sleep(0.02)
+
+        monitor = HotplugMonitor(FakeSource(set(), {DYMO_A}), slow_update)
+        monitor.poll_once()
+        monitor.poll_once()
+        assert monitor.stats()["maxLatencySeconds"] >= 0.02
+
+    def test_failed_callback_is_retried_next_poll(self):
+        on_change = MagicMock(side_effect=[RuntimeError("scan failed"), None])
+        monitor = HotplugMonitor(FakeSource(set(), {DYMO_A}), on_change)
+        monitor.poll_once()
+        with pytest.raises(RuntimeError):
+            monitor.poll_once()
+        assert monitor.poll_once() is True
+        assert on_change.call_count == 2
+
+    def test_background_thread_detects_change(self):
+        seen = []
+        source = FakeSource(set())
+        monitor = HotplugMonitor(source, lambda a, d: seen.append(a), interval=0.01)
+        monitor.start()
+        try:
+            source._snapshots = [{DYMO_A}]
+            deadline = time.monotonic() + 2
+            while not seen and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            monitor.stop()
+        assert seen == [{DYMO_A}]
+        assert not monitor.running
@@ -0,0 +1,279 @@
+"""Tests for job_queue.PrintScheduler (per-printer FIFO queues)."""
+
+import threading
+import time
+
+from job_queue import JobGroup, PrintJob, PrintScheduler
+
+
+def _blocking_job(release):
+    def run(job):
+        release.wait(5)
+        job.label_done()
+    return PrintJob(run)
+
+
+class TestOrdering:
+    def test_same_printer_runs_in_submission_order(self):
+        scheduler = PrintScheduler()
+        order = []
+        jobs = [PrintJob(lambda job, n=n: order.append(n)) for n in range(5)]
+        for job in jobs:
+            scheduler.submit("p1", job)
+        for job in jobs:
+            assert job.wait(5)
+        assert order == [0, 1, 2, 3, 4]
+        assert all(job.state == "done" for job in jobs)
+
+    def test_different_printers_run_concurrently(self):
+        scheduler = PrintScheduler()
+        release = threading.Event()
+        started = threading.Event()
+
+        def run(job):
+            started.set()
+            release.wait(5)
+
+        slow = PrintJob(run)
+        fast = PrintJob(lambda job: None)
+        scheduler.submit("p1", slow)
+        assert started.wait(5)
+        scheduler.submit("p2", fast)
+        try:
+            assert fast.wait(5)
+            assert slow.state == "running"
+        finally:
+            release.set()
+        assert slow.wait(5)
+
+
+class TestPositionAndEta:
+    def test_position_counts_running_and_pending(self):
+        scheduler = PrintScheduler()
+        release = threading.Event()
+        first = _blocking_job(release)
+        second = PrintJob(lambda job: None, labels=3)
+        third = PrintJob(lambda job: None)
+        try:
+            assert scheduler.submit("p1", first)[0] == 0
+            assert scheduler.submit("p1", second)[0] == 1
+            position, eta = scheduler.submit("p1", third)
+            assert position == 2
+            # One label left on the running job plus three queued ahead.
+            assert eta > 0
+            assert scheduler.position(third)[0] == 2
+        finally:
+            release.set()
+        assert third.wait(5)
+        assert scheduler.position(third) is None
+
+    def test_queued_event_is_first(self):
+        scheduler = PrintScheduler()
+        job = PrintJob(lambda job: job.emit({"event": "started"}), labels=4)
+        scheduler.submit("p1", job)
+        assert job.wait(5)
+        events = [event for _, event in job.events_after(0)]
+        assert events[0] == {
+            "event": "queued", "jobId": job.id, "printer": "p1",
+            "total": 4, "position": 0, "etaSeconds": 0.0,
+        }
+        assert events[1] == {"event": "started"}
+
+
+class TestFailureAndCancel:
+    def test_exception_marks_job_failed_and_worker_continues(self):
+        scheduler = PrintScheduler()
+
+        def boom(job):
+            raise RuntimeError("jammed")
+
+        failing = PrintJob(boom)
+        after = PrintJob(lambda job: None)
+        scheduler.submit("p1", failing)
+        scheduler.submit("p1", after)
+        assert after.wait(5)
+        assert failing.state == "failed"
+        assert str(failing.error) == "jammed"
+        assert after.state == "done"
+
+    def test_cancel_pending_job_skips_it(self):
+        scheduler = PrintScheduler()
+        release = threading.Event()
+        ran = []
+        blocker = _blocking_job(release)
+        victim = PrintJob(lambda job: ran.append(True))
+        scheduler.submit("p1", blocker)
+        scheduler.submit("p1", victim)
+        try:
+            assert scheduler.cancel(victim) is True
+            assert victim.state == "cancelled"
+        finally:
+            release.set()
+        assert blocker.wait(5)
+        assert ran == []
+
+    def test_cancel_running_job_is_refused(self):
+        scheduler = PrintScheduler()
+        release = threading.Event()
+        started = threading.Event()
+
+        def run(job):
+            started.set()
+            release.wait(5)
+
+        job = PrintJob(run)
+        scheduler.submit("p1", job)
+        try:
+            assert started.wait(5)
+            assert scheduler.cancel(job) is False
+        finally:
+            release.set()
+        assert job.wait(5)
+        assert job.state == "done"
+
+
+class TestSnapshot:
+    def test_snapshot_lists_running_and_queued(self):
+        scheduler = PrintScheduler()
+        release = threading.Event()
+        started = threading.Event()
+
+        def run(job):
+            started.set()
+            release.wait(5)
+
+        running = PrintJob(run)
+        waiting = PrintJob(lambda job: None)
+        scheduler.submit("p1", running)
+        scheduler.submit("p1", waiting)
+        try:
+            assert started.wait(5)
+            snap = scheduler.snapshot()["p1"]
+            assert snap["running"] == running.id
+            assert snap["queued"] == [waiting.id]
+        finally:
+            release.set()
+        assert waiting.wait(5)
+
+
+class TestIdleQueues:
+    def _wait_retired(self, scheduler, key):
+        deadline = time.monotonic() + 5
+        while key in scheduler.snapshot() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return key not in scheduler.snapshot()
+
+    def test_idle_queue_and_worker_are_dropped(self):
+        scheduler = PrintScheduler(idle_seconds=0.05)
+        job = PrintJob(lambda job: job.label_done())
+        scheduler.submit("p1", job)
+        assert job.wait(5)
+        thread = scheduler._queues["p1"].thread
+        assert self._wait_retired(scheduler, "p1")
+        thread.join(5)
+        assert not thread.is_alive()
+
+    def test_new_job_after_retiring_starts_a_fresh_worker_with_the_learnt_rate(self):
+        scheduler = PrintScheduler(idle_seconds=0.05)
+        first = PrintJob(lambda job: job.label_done())
+        scheduler.submit("p1", first)
+        assert first.wait(5)
+        learnt = scheduler.snapshot()["p1"]["secondsPerLabel"]
+        assert self._wait_retired(scheduler, "p1")
+        release = threading.Event()
+        second = _blocking_job(release)
+        scheduler.submit("p1", second)
+        try:
+            assert scheduler.snapshot()["p1"]["secondsPerLabel"] == learnt
+        finally:
+            release.set()
+        assert second.wait(5)
+
+
+class TestJobGroup:
+    def test_parts_share_log_and_finish_group_once(self):
+        scheduler = PrintScheduler()
+        finished = []
+
+        def on_finish(group, state):
+            finished.append(state)
+            group.emit({"event": "done"})
+
+        group = JobGroup("batch-1", on_finish=on_finish)
+
+        def run(job):
+            job.emit({"event": "printed", "printer": job.printer_key})
+            job.label_done()
+
+        a = group.add(PrintJob(run))
+        b = group.add(PrintJob(run))
+        scheduler.submit("p1", a)
+        scheduler.submit("p2", b)
+        assert group.wait(5)
+        assert group.state == "done"
+        assert finished == ["done"]
+        assert group.completed == 2
+        assert a.id == b.id == "batch-1"
+        events = [event for _, event in group.events_after(0)]
+        assert sorted(e["printer"] for e in events if e["event"] == "printed") == ["p1", "p2"]
+        assert events[-1] == {"event": "done"}
+        # Finished: only the summary is kept, not the parts' closures.
+        assert group.parts == []
+        assert sorted(p["printer"] for p in group.part_states()) == ["p1", "p2"]
+        assert all(p["state"] == "done" and p["printed"] == 1 for p in group.part_states())
+
+    def test_group_runs_from_its_first_part(self):
+        scheduler = PrintScheduler()
+        release = threading.Event()
+        started = threading.Event()
+        blocker = _blocking_job(release)
+        scheduler.submit("p2", blocker)
+        group = JobGroup()
+
+        def run(job):
+            started.set()
+            release.wait(5)
+
+        group.add(PrintJob(run))
+        waiting = group.add(PrintJob(lambda job: None))
+        assert group.state == "queued"
+        scheduler.submit("p1", group.parts[0])
+        scheduler.submit("p2", waiting)
+        try:
+            assert started.wait(5)
+            assert group.state == "running"
+            assert waiting.state == "queued"
+        finally:
+            release.set()
+        assert group.wait(5)
+        assert group.state == "done"
+
+    def test_failed_part_fails_group(self):
+        scheduler = PrintScheduler()
+        group = JobGroup()
+
+        def boom(job):
+            raise RuntimeError("jammed")
+
+        ok = group.add(PrintJob(lambda job: None))
+        bad = group.add(PrintJob(boom))
+        scheduler.submit("p1", ok)
+        scheduler.submit("p2", bad)
+        assert group.wait(5)
+        assert group.state == "failed"
+        assert str(group.error) == "jammed"
+
+    def test_cancelled_queued_part_finishes_group(self):
+        scheduler = PrintScheduler()
+        release = threading.Event()
+        blocker = _blocking_job(release)
+        scheduler.submit("p1", blocker)
+        group = JobGroup()
+        part = group.add(PrintJob(lambda job: None))
+        scheduler.submit("p1", part)
+        try:
+            assert scheduler.cancel(part)
+            assert group.wait(5)
+            assert group.state == "cancelled"
+        finally:
+            release.set()
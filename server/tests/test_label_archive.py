@@ -0,0 +1,83 @@
+"""Tests for label_archive: the SQLite store and its export tool."""
+
+import datetime
+import json
+import os
+import sqlite3
+
+import pytest
+from PIL import Image
+
+from label_archive import LabelArchive, encode_png, export, main, read_labels
+
+
+def _local(year, month, day, hour=0) -> float:
+    return datetime.datetime(year, month, day, hour).timestamp()
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    return str(tmp_path / "labels.sqlite3")
+
+
+@pytest.fixture
+def archive(archive_path):
+    archive = LabelArchive(archive_path)
+    png = encode_png(Image.new("RGB", (20, 10), color="white"))
+    archive.append([
+        ("label_a", "virtual:One", _local(2026, 3, 1, 9), [{"type": "text", "text": "A"}], {}, png),
+        ("label_b", "virtual:Two", _local(2026, 3, 2, 9), [{"type": "text", "text": "B"}], {}, png),
+        ("label_c", "virtual:One", _local(2026, 3, 3, 9), [{"type": "text", "text": "C"}], {}, png),
+    ])
+    yield archive
+    archive.close()
+
+
+class TestLabelArchive:
+    def test_append_round_trips(self, archive, archive_path):
+        labels = list(read_labels(archive_path))
+        assert [label["name"] for label in labels] == ["label_a", "label_b", "label_c"]
+        assert labels[0]["widgets"] == [{"type": "text", "text": "A"}]
+        assert labels[0]["image"].startswith(b"\x89PNG")
+        assert archive.count() == 3
+
+    def test_failed_batch_is_rolled_back(self, archive):
+        with pytest.raises(sqlite3.Error):
+            archive.append([
+                ("label_d", "virtual:One", _local(2026, 3, 4), [], {}, None),
+                ("label_e", "virtual:One", _local(2026, 3, 4), [], {}, object()),
+            ])
+        assert archive.count() == 3
+
+    def test_filters(self, archive, archive_path):
+        since = list(read_labels(archive_path, since=_local(2026, 3, 2)))
+        assert [label["name"] for label in since] == ["label_b", "label_c"]
+        until = list(read_labels(archive_path, until=_local(2026, 3, 2, 9)))
+        assert [label["name"] for label in until] == ["label_a"]
+        one = list(read_labels(archive_path, printer="virtual:One"))
+        assert [label["name"] for label in one] == ["label_a", "label_c"]
+
+
+class TestExport:
+    def test_writes_files_with_label_times(self, archive, archive_path, tmp_path):
+        out_dir = str(tmp_path / "export")
+        assert export(archive_path, out_dir) == 3
+        assert sorted(os.listdir(out_dir)) == [
+            "label_a.json", "label_a.png", "label_b.json", "label_b.png", "label_c.json", "label_c.png",
+        ]
+        with open(os.path.join(out_dir, "label_b.json")) as f:
+            assert json.load(f) == {"widgets": [{"type": "text", "text": "B"}], "settings": {}}
+        assert os.path.getmtime(os.path.join(out_dir, "label_b.png")) == _local(2026, 3, 2, 9)
+
+    def test_cli(self, archive, archive_path, tmp_path, capsys):
+        out_dir = str(tmp_path / "export")
+        assert main([
+            "export", archive_path, out_dir, "--since", "2026-03-02", "--printer", "virtual:One",
+            "--format", "json",
+        ]) == 0
+        assert os.listdir(out_dir) == ["label_c.json"]
+        assert "Exported 1 label(s)" in capsys.readouterr().out
+
+    def test_cli_missing_archive(self, tmp_path):
+        with pytest.raises(SystemExit):
+            main(["export", str(tmp_path / "missing.sqlite3"), str(tmp_path / "out")])
@@ -5,6 +5,7 @@ import pytest
 from PIL import Image
 
 from label_builder import (
+    RenderCache,
     _build_render_engines,
     mm_to_payload_px,
     preview_label,
@@ -158,3 +159,51 @@ class TestMmToPayloadPx:
         margin = 10
         result = mm_to_payload_px(10, margin)
         assert result == (10 * PIXELS_PER_MM) - margin * 2
+
+
+class TestRenderCache:
+    def test_identical_widgets_render_once(self):
+        cache = RenderCache()
+        widgets = [{"type": "text", "text": "Same", "id": "1"}]
+        first = cache.payload(widgets, {"tapeSizeMm": 12})
+        second = cache.payload([dict(widgets[0])], {"tapeSizeMm": 12})
+        assert first is second
+        assert (cache.misses, cache.hits) == (1, 1)
+
+    def test_different_content_renders_separately(self):
+        cache = RenderCache()
+        a = cache.payload([{"type": "text", "text": "A", "id": "1"}], {})
+        b = cache.payload([{"type": "text", "text": "B", "id": "1"}], {})
+        assert a is not b
+        assert cache.misses == 2
+
+    def test_settings_are_part_of_the_key(self):
+        cache = RenderCache()
+        widgets = [{"type": "text", "text": "Same", "id": "1"}]
+        small = cache.payload(widgets, {"tapeSizeMm": 6})
+        large = cache.payload(widgets, {"tapeSizeMm": 19})
+        assert large.height > small.height
+
+    def test_preview_and_payload_cached_independently(self):
+        cache = RenderCache()
+        widgets = [{"type": "text", "text": "Same", "id": "1"}]
+        payload = cache.payload(widgets, {})
+        preview = cache.preview(widgets, {})
+        assert payload.mode == "1"
+        assert preview.mode != "1"
+        assert cache.misses == 2
+
+    def test_least_recently_used_render_is_evicted(self):
+        cache = RenderCache(max_entries=2)
+        a = [{"type": "text", "text": "A", "id": "1"}]
+        b = [{"type": "text", "text": "B", "id": "1"}]
+        c = [{"type": "text", "text": "C", "id": "1"}]
+        cache.payload(a, {})
+        cache.payload(b, {})
+        cache.payload(a, {})  # A is now the most recent
+        cache.payload(c, {})  # evicts B
+        assert len(cache._bitmaps) == 2
+        cache.payload(a, {})
+        assert (cache.misses, cache.hits) == (3, 2)
+        cache.payload(b, {})
+        assert cache.misses == 4
@@ -0,0 +1,74 @@
+"""Tests for label_index: the hourly layout's append-only index."""
+
+import os
+
+import pytest
+
+from label_index import INDEX_FILENAME, LabelIndex, read_index
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return str(tmp_path)
+
+
+def _build(index_dir, entries):
+    index = LabelIndex(os.path.join(index_dir, INDEX_FILENAME))
+    for at, name, job_id, label_index in entries:
+        index.append(at, name, job_id, label_index)
+    index.close()
+
+
+class TestLabelIndex:
+    def test_at_never_goes_backwards(self, index_dir):
+        _build(index_dir, [(100.0, "a", None, None), (99.5, "b", None, None)])
+        assert [e["at"] for e in read_index(index_dir)] == [100.0, 100.0]
+
+    def test_reopen_continues_from_last_entry(self, index_dir):
+        _build(index_dir, [(100.0, "a", None, None)])
+        _build(index_dir, [(50.0, "b", None, None)])
+        assert [(e["name"], e["at"]) for e in read_index(index_dir)] == [("a", 100.0), ("b", 100.0)]
+
+    def test_entries_carry_job_and_path(self, index_dir):
+        _build(index_dir, [(100.0, "2026/03/01/09/label_x", "job1", 3)])
+        (entry,) = read_index(index_dir)
+        assert entry["jobId"] == "job1"
+        assert entry["index"] == 3
+        assert entry["path"] == os.path.join(index_dir, "2026/03/01/09/label_x")
+
+
+class TestReadIndex:
+    @pytest.fixture
+    def entries(self, index_dir):
+        # Uneven gaps and name lengths, so bisection lands mid-line.
+        rows, at = [], 1000.0
+        for i in range(500):
+            rows.append((at, f"label_{i}" + "x" * (i % 7), f"job{i % 4}", i))
+            at += i % 3
+        _build(index_dir, rows)
+        return rows
+
+    @pytest.mark.parametrize("since,until", [
+        (None, None), (0.0, None), (1000.0, 1001.0), (1234.0, 1400.0),
+        (1498.5, None), (5000.0, None), (None, 1000.0), (1100.0, 1100.0),
+    ])
+    def test_time_range_matches_a_scan(self, index_dir, entries, since, until):
+        expected = [
+            name for at, name, _, _ in entries
+            if (since is None or at >= since) and (until is None or at < until)
+        ]
+        assert [e["name"] for e in read_index(index_dir, since, until)] == expected
+
+    def test_job_query(self, index_dir, entries):
+        found = list(read_index(index_dir, job_id="job2"))
+        assert [e["index"] for e in found] == [i for i in range(500) if i % 4 == 2]
+
+    def test_torn_last_line_is_skipped(self, index_dir, entries):
+        with open(os.path.join(index_dir, INDEX_FILENAME), "ab") as f:
+            f.write(b'{"at": 99999.0, "na')
+        assert len(list(read_index(index_dir, since=1200.0))) == len(
+            [at for at, *_ in entries if at >= 1200.0]
+        )
+
+    def test_missing_index_reads_empty(self, tmp_path):
+        assert list(read_index(str(tmp_path / "none"))) == []
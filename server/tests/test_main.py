@@ -0,0 +1,78 @@
+"""Tests for main: the bind-first entry point's deferred app."""
+
+import io
+import json
+import threading
+
+import pytest
+
+from main import _DeferredApp
+
+
+def _call(wsgi_app, path):
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "wsgi.input": io.BytesIO()}
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = status
+        started["headers"] = dict(headers)
+
+    body = b"".join(wsgi_app(environ, start_response))
+    return started["status"], started["headers"], body
+
+
+def _loaded_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [environ["PATH_INFO"].encode()]
+
+
+class TestDeferredApp:
+    def test_health_answers_while_loading(self):
+        release = threading.Event()
+        deferred = _DeferredApp(lambda: release.wait(5) and _loaded_app)
+        deferred.start()
+        status, _, body = _call(deferred, "/api/health")
+        assert status == "200 OK"
+        assert json.loads(body) == {"status": "starting"}
+        release.set()
+
+    def test_requests_wait_for_the_app(self):
+        release = threading.Event()
+        deferred = _DeferredApp(lambda: release.wait(5) and _loaded_app)
+        deferred.start()
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(_call(deferred, "/api/printers")))
+        waiter.start()
+        waiter.join(0.05)
+        assert not results
+        release.set()
+        waiter.join(5)
+        assert results[0][0] == "200 OK"
+        assert results[0][2] == b"/api/printers"
+
+    def test_health_delegates_once_loaded(self):
+        deferred = _DeferredApp(lambda: _loaded_app)
+        deferred.start().join(5)
+        assert _call(deferred, "/api/health")[2] == b"/api/health"
+
+    def test_timeout_returns_503(self):
+        release = threading.Event()
+        deferred = _DeferredApp(lambda: release.wait(5) and _loaded_app, timeout=0.01)
+        deferred.start()
+        status, headers, body = _call(deferred, "/api/print")
+        assert status.startswith("503")
+        assert headers["Retry-After"] == "1"
+        assert json.loads(body)["status"] == "error"
+        release.set()
+
+    @pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+    def test_failed_load_releases_waiters(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        deferred = _DeferredApp(fail)
+        thread = threading.Thread(target=deferred._run_load)
+        thread.start()
+        thread.join(5)
+        status, _, _ = _call(deferred, "/api/print")
+        assert status.startswith("503")
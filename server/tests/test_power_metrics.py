@@ -0,0 +1,118 @@
+"""Tests for power_metrics: the transition ring buffer and its aggregates."""
+
+import datetime
+
+from power_metrics import PowerLog, latency_distribution, on_hours_by_day
+
+
+def _local(year, month, day, hour=0, minute=0) -> float:
+    return datetime.datetime(year, month, day, hour, minute).timestamp()
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPowerLog:
+    def test_ring_buffer_keeps_newest(self):
+        log = PowerLog(history=3)
+        for i in range(5):
+            log.record(i % 2 == 0, "manual", "1-1", i)
+        assert [e["port"] for e in log.events()] == [2, 3, 4]
+        assert log.stats()["recorded"] == 5
+
+    def test_wake_fills_in_enumeration_and_blocked_requests(self):
+        log = PowerLog()
+        transition = log.record(True, "wake", "1-1", 3, switch_seconds=0.2104, backend="uhubctl")
+        log.record_enumeration(transition, True, 0.8)
+        log.record_blocked(0.9, transition)
+        log.record_blocked(0.5, transition)
+        # A wait for a wake that found the port already on.
+        log.record_blocked(0.05)
+
+        event = log.events()[0]
+        assert event["switchSeconds"] == 0.21
+        assert event["durationSeconds"] == 1.01
+        assert event["enumerated"] is True
+        assert event["blockedRequests"] == 2
+        assert event["blockedSeconds"] == 1.4
+        assert log.stats()["blocked"] == {"requests": 3, "totalSeconds": 1.45, "maxSeconds": 0.9}
+
+    def test_stats_counts_by_cause(self):
+        log = PowerLog()
+        log.record(False, "idle", "1-1", 3)
+        log.record(True, "wake", "1-1", 3)
+        log.record(True, "external", "1-1", 3)
+        transitions = log.stats()["transitions"]
+        assert transitions["idle"] == {"on": 0, "off": 1}
+        assert transitions["wake"] == {"on": 1, "off": 0}
+        assert transitions["external"] == {"on": 1, "off": 0}
+        assert transitions["manual"] == {"on": 0, "off": 0}
+
+    def test_wake_latency_only_counts_measured_power_ons(self):
+        log = PowerLog()
+        measured = log.record(True, "wake", "1-1", 3, switch_seconds=0.1)
+        log.record_enumeration(measured, True, 0.4)
+        log.record(True, "external", "1-1", 3)
+        log.record(False, "idle", "1-1", 3, switch_seconds=0.1)
+        latency = log.stats()["wakeLatency"]
+        assert latency["count"] == 1
+        assert latency["max"] == 0.5
+
+    def test_empty_stats(self):
+        stats = PowerLog().stats()
+        assert stats["since"] is None
+        assert stats["onHoursByDay"] == {}
+        assert stats["wakeLatency"]["count"] == 0
+        assert stats["events"] == []
+
+
+class TestOnHoursByDay:
+    def test_splits_at_local_midnight(self):
+        events = [
+            {"powered": True, "at": _local(2026, 3, 1, 22)},
+            {"powered": False, "at": _local(2026, 3, 2, 1)},
+        ]
+        assert on_hours_by_day(events, _local(2026, 3, 2, 12)) == {
+            "2026-03-01": 2.0,
+            "2026-03-02": 1.0,
+        }
+
+    def test_open_interval_runs_to_now_and_off_days_are_zero(self):
+        events = [
+            {"powered": False, "at": _local(2026, 3, 1, 9)},
+            {"powered": True, "at": _local(2026, 3, 3, 9)},
+        ]
+        assert on_hours_by_day(events, _local(2026, 3, 3, 10, 30)) == {
+            "2026-03-01": 0.0,
+            "2026-03-02": 0.0,
+            "2026-03-03": 1.5,
+        }
+
+    def test_log_stats_uses_its_clock(self):
+        clock = FakeClock(_local(2026, 3, 1, 8))
+        log = PowerLog(clock=clock)
+        log.record(True, "wake", "1-1", 3)
+        clock.now = _local(2026, 3, 1, 8, 45)
+        assert log.stats()["onHoursByDay"] == {"2026-03-01": 0.75}
+
+
+class TestLatencyDistribution:
+    def test_percentiles_and_buckets(self):
+        latencies = [0.3, 0.6, 0.7, 1.5, 12.0] + [0.4] * 5
+        dist = latency_distribution(latencies)
+        assert dist["count"] == 10
+        assert dist["p50"] == 0.4
+        assert dist["p90"] == 1.5
+        assert dist["max"] == 12.0
+        assert dist["buckets"] == {"le0.5": 6, "le1": 2, "le2": 1, "le5": 0, "le10": 0, "gt10": 1}
+
+    def test_empty(self):
+        dist = latency_distribution([])
+        assert dist["count"] == 0
+        assert dist["p50"] is None
+        assert sum(dist["buckets"].values()) == 0
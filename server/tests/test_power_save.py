@@ -1,8 +1,10 @@
+import threading
 import time
 from unittest.mock import patch
 
 import pytest
 
+import power_metrics
 import power_save
 import usb_power
 
@@ -11,6 +13,8 @@ import usb_power
 def reset_state(monkeypatch):
     """Fresh module state per test so cross-test pollution can't hide bugs."""
     monkeypatch.setattr(power_save, "_last_activity", time.monotonic())
+    monkeypatch.setattr(usb_power, "_port_power", None)
+    monkeypatch.setattr(power_metrics, "log", power_metrics.PowerLog())
     yield
 
 
@@ -83,18 +87,139 @@ class TestEnsurePowered:
         assert power_save.ensure_powered() is False
         mock_on.assert_not_called()
 
-    @patch("power_save.time.sleep")
+    @patch("power_save.usb_power.wait_until_enumerated")
     @patch("power_save.usb_power.power_on")
     @patch("power_save.usb_power.get_port_status")
     @patch("power_save.usb_power.find_or_recall_printer_port")
     def test_powers_on_when_off(
-        self, mock_find, mock_status, mock_on, mock_sleep, monkeypatch
+        self, mock_find, mock_status, mock_on, mock_wait, monkeypatch
     ):
         monkeypatch.setenv("USB_POWER_SAVE", "true")
         mock_find.return_value = ("1-1", 3)
         mock_status.return_value = {"powered": False, "connected": False}
         assert power_save.ensure_powered() is True
-        mock_on.assert_called_once_with("1-1", 3)
+        mock_on.assert_called_once_with("1-1", 3, cause="wake")
+        # Waits for re-enumeration rather than a fixed settle delay.
+        mock_wait.assert_called_once_with("1-1", 3, transition=mock_on.return_value)
+
+    @patch("power_save.usb_power.wait_until_enumerated")
+    @patch("power_save.usb_power.power_on")
+    @patch("power_save.usb_power.refresh_port_power")
+    def test_wait_is_logged_against_the_wake(self, mock_refresh, mock_on, mock_wait, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        mock_refresh.return_value = {"hub": "1-1", "port": 3, "powered": False}
+        mock_on.side_effect = lambda hub, port, cause: power_metrics.log.record(True, cause, hub, port)
+        monkeypatch.setattr(usb_power, "_port_power", ("1-1", 3, False, time.monotonic()))
+        assert power_save.ensure_powered() is True
+        event = power_metrics.log.events()[0]
+        assert event["cause"] == "wake"
+        assert event["blockedRequests"] == 1
+        assert power_metrics.log.stats()["blocked"]["requests"] == 1
+
+    @patch("power_save.power_on_if_needed", return_value=False)
+    def test_wait_for_noop_wake_is_logged_without_transition(self, mock_power_on, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        assert power_save.ensure_powered() is False
+        assert power_metrics.log.events() == []
+        assert power_metrics.log.stats()["blocked"]["requests"] == 1
+
+
+class TestBackgroundWake:
+    @patch("power_save.usb_power.wait_until_enumerated")
+    @patch("power_save.power_on_if_needed")
+    def test_start_wake_returns_before_power_on(self, mock_power_on, mock_wait, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        release = threading.Event()
+        mock_power_on.side_effect = lambda: release.wait(5)
+        started = time.monotonic()
+        assert power_save.start_wake() is True
+        assert time.monotonic() - started < 1
+        assert power_save.waking()
+        # A burst of activity joins the running wake.
+        assert power_save.start_wake() is True
+        release.set()
+        assert power_save.wait_for_wake(5)
+        mock_power_on.assert_called_once()
+
+    @patch("power_save.usb_power.wait_until_enumerated")
+    @patch("power_save.power_on_if_needed")
+    def test_ensure_powered_joins_running_wake(self, mock_power_on, mock_wait, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        release = threading.Event()
+        mock_power_on.side_effect = lambda: release.wait(5)
+        power_save.start_wake()
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(power_save.ensure_powered()))
+        waiter.start()
+        waiter.join(0.05)
+        assert result == []
+        release.set()
+        waiter.join(5)
+        assert result == [True]
+        mock_power_on.assert_called_once()
+
+    @patch("power_save.power_on_if_needed")
+    def test_known_on_starts_no_thread(self, mock_power_on, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        usb_power._remember_port_power("1-1", 3, True, time.monotonic())
+        with patch("power_save.threading.Thread") as mock_thread:
+            assert power_save.start_wake() is False
+        mock_thread.assert_not_called()
+
+    @patch("power_save.power_on_if_needed", side_effect=RuntimeError("uhubctl gone"))
+    def test_failed_wake_releases_waiters(self, mock_power_on, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        assert power_save.ensure_powered() is False
+        assert not power_save.waking()
+
+
+class TestCachedPortPower:
+    @patch("power_save.usb_power.power_on")
+    @patch("power_save.usb_power.get_port_status")
+    @patch("power_save.usb_power.find_or_recall_printer_port")
+    def test_known_on_skips_uhubctl(
+        self, mock_find, mock_status, mock_on, monkeypatch
+    ):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        usb_power._remember_port_power("1-1", 3, True, time.monotonic())
+        assert power_save.power_on_if_needed() is False
+        mock_find.assert_not_called()
+        mock_status.assert_not_called()
+        mock_on.assert_not_called()
+
+    @patch("power_save.usb_power.find_or_recall_printer_port")
+    def test_no_known_port_checked_once(self, mock_find, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        mock_find.return_value = None
+        assert power_save.power_on_if_needed() is False
+        assert power_save.power_on_if_needed() is False
+        mock_find.assert_called_once()
+
+    @patch("power_save.usb_power.power_on")
+    @patch("power_save.usb_power.get_port_status")
+    @patch("power_save.usb_power.find_or_recall_printer_port")
+    def test_known_off_is_confirmed_before_power_on(
+        self, mock_find, mock_status, mock_on, monkeypatch
+    ):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        usb_power._remember_port_power("1-1", 3, False, time.monotonic())
+        mock_find.return_value = ("1-1", 3)
+        # Switched back on outside this process since the last reading.
+        mock_status.return_value = {"powered": True, "connected": True}
+        assert power_save.power_on_if_needed() is False
+        mock_on.assert_not_called()
+        assert usb_power.known_port_power()["powered"] is True
+
+    @patch("power_save.usb_power.power_off")
+    @patch("power_save.usb_power.find_or_recall_printer_port")
+    def test_check_idle_skips_port_known_off(self, mock_find, mock_off, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        monkeypatch.setenv("USB_POWER_SAVE_IDLE_MINUTES", "1")
+        power_save._last_activity = time.monotonic() - 1000
+        usb_power._remember_port_power("1-1", 3, False, time.monotonic())
+        assert power_save.check_idle() is False
+        mock_find.assert_not_called()
+        mock_off.assert_not_called()
 
 
 class TestCheckIdle:
@@ -147,7 +272,7 @@ class TestCheckIdle:
         mock_find.return_value = ("1-1", 3)
         mock_status.return_value = {"powered": True, "connected": True}
         assert power_save.check_idle() is True
-        mock_off.assert_called_once_with("1-1", 3)
+        mock_off.assert_called_once_with("1-1", 3, cause="idle")
 
     @patch("power_save.usb_power.power_off")
     @patch("power_save.usb_power.find_or_recall_printer_port")
@@ -191,6 +316,76 @@ class TestCheckIdle:
         mock_find.assert_not_called()
 
 
+class TestIdleScheduler:
+    @pytest.fixture
+    def loop(self, monkeypatch):
+        """Run `_idle_loop` on a thread with a 0.2 s idle threshold and a
+        recording `check_idle` that marks the port off."""
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        monkeypatch.setattr(power_save, "idle_seconds", lambda: 0.2)
+        fired = []
+
+        def check_idle():
+            fired.append(time.monotonic())
+            usb_power._remember_port_power("1-1", 3, False, time.monotonic())
+            return True
+
+        monkeypatch.setattr(power_save, "check_idle", check_idle)
+        stop = threading.Event()
+        started = time.monotonic()
+        power_save._last_activity = started
+        thread = threading.Thread(target=power_save._idle_loop, args=(stop,), daemon=True)
+        thread.start()
+        yield started, fired
+        stop.set()
+        power_save._notify_scheduler()
+        thread.join(5)
+
+    def test_powers_off_at_the_deadline(self, loop):
+        started, fired = loop
+        time.sleep(0.5)
+        assert len(fired) == 1
+        assert 0.2 <= fired[0] - started < 0.4
+
+    def test_activity_pushes_the_deadline_out(self, loop):
+        started, fired = loop
+        time.sleep(0.1)
+        power_save.record_activity()
+        time.sleep(0.15)
+        assert fired == []
+        time.sleep(0.3)
+        assert len(fired) == 1
+        assert fired[0] - started >= 0.3
+
+    def test_sleeps_while_off_until_power_on(self, loop):
+        started, fired = loop
+        time.sleep(0.5)
+        assert len(fired) == 1
+        # Port off and the deadline long past: nothing runs.
+        time.sleep(0.3)
+        assert len(fired) == 1
+        # Powered on again: the scheduler re-arms from the last activity.
+        power_save.record_activity()
+        usb_power._remember_port_power("1-1", 3, True, time.monotonic())
+        power_save._notify_scheduler()
+        time.sleep(0.5)
+        assert len(fired) == 2
+
+    def test_failed_power_off_does_not_spin(self, monkeypatch):
+        monkeypatch.setattr(power_save, "idle_seconds", lambda: 0)
+        monkeypatch.setattr(power_save, "_RETRY_SECONDS", 0.2)
+        calls = []
+        monkeypatch.setattr(power_save, "check_idle", lambda: calls.append(1) or False)
+        stop = threading.Event()
+        thread = threading.Thread(target=power_save._idle_loop, args=(stop,), daemon=True)
+        thread.start()
+        time.sleep(0.3)
+        stop.set()
+        power_save._notify_scheduler()
+        thread.join(5)
+        assert 1 <= len(calls) <= 3
+
+
 class TestStart:
     def test_does_not_start_thread_when_disabled(self, monkeypatch):
         monkeypatch.delenv("USB_POWER_SAVE", raising=False)
@@ -198,10 +393,20 @@ class TestStart:
             power_save.start()
             mock_thread.assert_not_called()
 
-    def test_starts_daemon_thread_when_enabled(self, monkeypatch):
+    def test_starts_daemon_threads_when_enabled(self, monkeypatch):
+        monkeypatch.setenv("USB_POWER_SAVE", "true")
+        monkeypatch.delenv("USB_POWER_STATE_REFRESH_SECONDS", raising=False)
+        with patch("power_save.threading.Thread") as mock_thread:
+            power_save.start()
+            # Idle checker plus port-state refresher.
+            assert mock_thread.call_count == 2
+            assert all(c.kwargs["daemon"] is True for c in mock_thread.call_args_list)
+            assert mock_thread.return_value.start.call_count == 2
+
+    def test_zero_refresh_interval_disables_refresher(self, monkeypatch):
         monkeypatch.setenv("USB_POWER_SAVE", "true")
+        monkeypatch.setenv("USB_POWER_STATE_REFRESH_SECONDS", "0")
         with patch("power_save.threading.Thread") as mock_thread:
             power_save.start()
             mock_thread.assert_called_once()
-            assert mock_thread.call_args.kwargs["daemon"] is True
-            mock_thread.return_value.start.assert_called_once()
+            assert mock_thread.call_args.kwargs["name"] == "usb-power-save"
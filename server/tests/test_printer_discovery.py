@@ -0,0 +1,127 @@
+"""Tests for printer_discovery.DeviceDiscovery (TTL cache + single-flight)."""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from printer_discovery import DeviceDiscovery
+
+
+class TestDevices:
+    def test_cached_within_ttl(self):
+        scan = MagicMock(return_value=["dev"])
+        discovery = DeviceDiscovery(scan, ttl=60)
+        assert discovery.devices() == ["dev"]
+        assert discovery.devices() == ["dev"]
+        scan.assert_called_once()
+        assert discovery.stats()["cacheHits"] == 1
+
+    def test_rescans_after_ttl(self):
+        scan = MagicMock(side_effect=[["a"], ["b"]])
+        discovery = DeviceDiscovery(scan, ttl=0)
+        assert discovery.devices() == ["a"]
+        assert discovery.devices() == ["b"]
+
+    def test_returns_copy_not_cache(self):
+        discovery = DeviceDiscovery(MagicMock(return_value=["dev"]), ttl=60)
+        discovery.devices().append("junk")
+        assert discovery.devices() == ["dev"]
+
+    def test_invalidate_forces_rescan(self):
+        scan = MagicMock(return_value=["dev"])
+        discovery = DeviceDiscovery(scan, ttl=60)
+        discovery.devices()
+        discovery.invalidate()
+        discovery.devices()
+        assert scan.call_count == 2
+
+    def test_cached_never_scans(self):
+        scan = MagicMock(return_value=["dev"])
+        discovery = DeviceDiscovery(scan, ttl=0)
+        assert discovery.cached() is None
+        discovery.devices()
+        # Stale by TTL, but still returned as-is.
+        assert discovery.cached() == ["dev"]
+        scan.assert_called_once()
+
+    def test_scan_errors_propagate_and_are_not_cached(self):
+        scan = MagicMock(side_effect=[RuntimeError("no backend"), ["dev"]])
+        discovery = DeviceDiscovery(scan, ttl=60)
+        with pytest.raises(RuntimeError):
+            discovery.devices()
+        assert discovery.devices() == ["dev"]
+
+
+class TestSingleFlight:
+    def _blocking_scan(self, release, result):
+        calls = []
+
+        def scan():
+            calls.append(1)
+            release.wait(5)
+            return result
+
+        return scan, calls
+
+    def test_concurrent_callers_share_one_scan(self):
+        release = threading.Event()
+        scan, calls = self._blocking_scan(release, ["dev"])
+        discovery = DeviceDiscovery(scan, ttl=60)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(discovery.devices()))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        # Give the followers time to queue up behind the leader's scan.
+        deadline = time.monotonic() + 2
+        while discovery.stats()["sharedScans"] < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join(5)
+        assert len(calls) == 1
+        assert results == [["dev"]] * 5
+
+    def test_waiters_see_leader_failure(self):
+        release = threading.Event()
+
+        def scan():
+            release.wait(5)
+            raise RuntimeError("bus error")
+
+        discovery = DeviceDiscovery(scan, ttl=60)
+        errors = []
+
+        def call():
+            try:
+                discovery.refresh()
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 2
+        while discovery.stats()["sharedScans"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join(5)
+        assert errors == ["bus error"] * 3
+
+    def test_invalidate_during_scan_discards_stale_result(self):
+        release = threading.Event()
+        scan, calls = self._blocking_scan(release, ["stale"])
+        discovery = DeviceDiscovery(scan, ttl=60)
+        t = threading.Thread(target=discovery.devices)
+        t.start()
+        while not calls:
+            time.sleep(0.01)
+        discovery.invalidate()
+        release.set()
+        t.join(5)
+        assert discovery.stats()["cachedDevices"] is None
@@ -0,0 +1,57 @@
+"""Tests for printer_pool.PoolPlan (splitting batch rows across printers)."""
+
+import pytest
+
+from printer_pool import PoolPlan
+
+
+class TestRoundRobin:
+    def test_rows_alternate_between_members(self):
+        plan = PoolPlan(range(5), ["a", "b"])
+        assert list(plan.rows_for("a")) == [0, 2, 4]
+        assert list(plan.rows_for("b")) == [1, 3]
+
+    def test_share_matches_assignment(self):
+        plan = PoolPlan(range(5), ["a", "b", "c"])
+        assert [plan.share(m) for m in ("a", "b", "c")] == [2, 2, 1]
+
+    def test_share_counts_labels_per_row(self):
+        plan = PoolPlan([0, 1, 2], ["a", "b"])
+        labels = {0: 1, 1: 3, 2: 3}.get
+        assert [plan.share(m, labels) for m in ("a", "b")] == [4, 3]
+
+    def test_has_more_is_per_member(self):
+        plan = PoolPlan(range(2), ["a", "b"])
+        assert plan.take("a") == 0
+        assert not plan.has_more("a")
+        assert plan.has_more("b")
+
+    def test_single_member_gets_every_row_in_order(self):
+        plan = PoolPlan(range(3), ["only"])
+        assert list(plan.rows_for("only")) == [0, 1, 2]
+
+
+class TestThroughput:
+    def test_members_pull_from_shared_rows(self):
+        plan = PoolPlan(range(4), ["fast", "slow"], strategy="throughput")
+        assert plan.take("slow") == 0
+        # The fast printer keeps pulling while the slow one is busy.
+        assert [plan.take("fast") for _ in range(3)] == [1, 2, 3]
+        assert plan.take("slow") is None
+        assert not plan.has_more("fast")
+
+    def test_share_is_even_split_estimate(self):
+        plan = PoolPlan(range(5), ["a", "b"], strategy="throughput")
+        assert plan.share("a") == 3
+        assert plan.share("a", lambda row: 2 if row else 1) == 5
+
+
+def test_only_given_rows_are_planned():
+    plan = PoolPlan([1, 4, 5], ["a", "b"])
+    assert list(plan.rows_for("a")) == [1, 5]
+    assert list(plan.rows_for("b")) == [4]
+
+
+def test_empty_member_list_rejected():
+    with pytest.raises(ValueError):
+        PoolPlan(range(3), [])
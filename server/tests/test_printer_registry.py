@@ -0,0 +1,94 @@
+"""Tests for printer_registry: virtual printers built once, looked up by id."""
+
+import threading
+
+import pytest
+
+from printer_registry import VirtualPrinterRegistry
+
+
+class FakeConfig:
+    """Config source whose entries and raw value the test controls."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.source = "v1"
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return self.entries
+
+    def registry(self):
+        return VirtualPrinterRegistry(load=self.load, source=lambda: self.source)
+
+
+@pytest.fixture
+def config(tmp_path):
+    return FakeConfig([
+        {"name": "Desk 1", "path": str(tmp_path / "d1"), "output": "image"},
+        {"name": "Desk (2)", "path": str(tmp_path / "d2"), "output": "json"},
+    ])
+
+
+class TestVirtualPrinterRegistry:
+    def test_builds_once_across_lookups(self, config):
+        registry = config.registry()
+        assert [p.id for p in registry.printers()] == ["virtual:Desk_1", "virtual:Desk_2"]
+        assert registry.get("virtual:Desk_2").output_mode == "json"
+        assert registry.first().name == "Desk 1"
+        assert len(registry) == 2
+        assert config.loads == 1
+        assert registry.builds == 1
+
+    def test_returns_the_same_instances(self, config):
+        registry = config.registry()
+        assert registry.get("virtual:Desk_1") is registry.printers()[0]
+
+    def test_unknown_id(self, config):
+        assert config.registry().get("virtual:Nope") is None
+
+    def test_rebuilds_when_config_changes(self, config, tmp_path):
+        registry = config.registry()
+        registry.printers()
+        config.entries = [{"name": "Archive", "path": str(tmp_path / "a"), "output": "image"}]
+        config.source = "v2"
+        assert registry.ids() == ["virtual:Archive"]
+        assert registry.builds == 2
+
+    def test_empty_config(self):
+        registry = FakeConfig([]).registry()
+        assert registry.printers() == []
+        assert registry.first() is None
+        assert len(registry) == 0
+
+    def test_first_wins_on_duplicate_ids(self, tmp_path):
+        registry = FakeConfig([
+            {"name": "Desk 1", "path": str(tmp_path / "a"), "output": "image"},
+            {"name": "Desk_1", "path": str(tmp_path / "b"), "output": "image"},
+        ]).registry()
+        assert registry.get("virtual:Desk_1").output_path == str(tmp_path / "a")
+
+    def test_concurrent_first_use_builds_once(self, config):
+        registry = config.registry()
+        threads = [threading.Thread(target=registry.printers) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert registry.builds == 1
+
+    def test_rebuild_drains_replaced_write_behind_printers(self, config, tmp_path):
+        config.entries = [{"name": "Archive", "path": str(tmp_path / "a"), "write": "behind"}]
+        registry = config.registry()
+        old = registry.first()
+        assert registry.write_stats()["virtual:Archive"]["closed"] is False
+        config.source = "v2"
+        registry.printers()
+        assert old.write_stats()["closed"] is True
+        registry.close()
+        assert registry.first().write_stats()["closed"] is True
+
+    def test_write_stats_skips_sync_printers(self, config):
+        registry = config.registry()
+        assert registry.write_stats() == {}
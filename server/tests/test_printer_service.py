@@ -4,6 +4,20 @@ import os
 from unittest.mock import MagicMock, patch
 
 import pytest
+from PIL import Image
+
+
+@pytest.fixture(autouse=True)
+def reset_usb_caches():
+    """Cached device lists and USB sessions are module-global; don't leak
+    mocks across tests."""
+    from printer_service import _discovery, _sessions
+
+    _discovery.invalidate()
+    _sessions.invalidate()
+    yield
+    _discovery.invalidate()
+    _sessions.invalidate()
 
 
 @pytest.fixture
@@ -63,6 +77,41 @@ class TestListPrinters:
         assert len(ids) == len(set(ids))
 
 
+class TestPrinterPools:
+    @pytest.fixture
+    def pools_env(self, virtual_printer_env, monkeypatch):
+        import json
+
+        monkeypatch.setenv("PRINTER_POOLS", json.dumps([
+            {"name": "Badge Desk", "members": ["virtual:Test_Printer", "Bus 001 Device 009: ID 0922:1002"]},
+        ]))
+
+    @patch("printer_service.DeviceManager")
+    def test_pools_are_listed(self, mock_dm_cls, pools_env):
+        mock_dm_cls.return_value.devices = []
+
+        from printer_service import list_printers
+
+        pools = [p for p in list_printers() if p["vendorProductId"] == "pool"]
+        assert pools == [{
+            "id": "pool:Badge_Desk",
+            "name": "Badge Desk (Pool of 2)",
+            "vendorProductId": "pool",
+            "serialNumber": None,
+        }]
+
+    @patch("printer_service.DeviceManager")
+    def test_healthy_members_skip_missing_usb_printer(self, mock_dm_cls, pools_env):
+        mock_dm_cls.return_value.devices = []
+
+        from printer_service import get_printer_pool, healthy_pool_members
+
+        pool = get_printer_pool("pool:Badge_Desk")
+        assert healthy_pool_members(pool) == ["virtual:Test_Printer"]
+        assert get_printer_pool("pool:Unknown") is None
+        assert get_printer_pool("virtual:Test_Printer") is None
+
+
 class TestListPrintersUsbScanFailure:
     @patch("printer_service.DeviceManager")
     def test_returns_virtual_printers_when_usb_scan_throws(self, mock_dm_cls, virtual_printer_env):
@@ -132,3 +181,173 @@ class TestAutoSelectWithVirtualPrinters:
 
         with pytest.raises(Exception):
             print_label(sample_widgets, sample_settings, printer_id=None)
+
+
+def _usb_device(usb_id="Bus 001 Device 005: ID 0922:1002"):
+    dev = MagicMock()
+    dev.usb_id = usb_id
+    dev.is_supported = True
+    dev.manufacturer = "Dymo"
+    dev.product = "LabelManager PnP"
+    dev.serial_number = None
+    dev.vendor_product_id = "0922:1002"
+    return dev
+
+
+class TestUsbSessionReuse:
+    @patch("printer_service.DymoLabeler")
+    @patch("printer_service.DeviceManager")
+    def test_consecutive_prints_scan_once(
+        self, mock_dm_cls, mock_labeler_cls, sample_widgets, sample_settings
+    ):
+        dev = _usb_device()
+        mock_dm_cls.return_value.devices = [dev]
+
+        from printer_service import print_label
+
+        for _ in range(3):
+            print_label(sample_widgets, sample_settings, printer_id=dev.usb_id)
+
+        assert mock_dm_cls.return_value.scan.call_count == 1
+        dev.setup.assert_called_once()
+        assert mock_labeler_cls.return_value.print.call_count == 3
+
+    @patch("printer_service.DymoLabeler")
+    @patch("printer_service.DeviceManager")
+    def test_print_failure_drops_session(
+        self, mock_dm_cls, mock_labeler_cls, sample_widgets, sample_settings
+    ):
+        dev = _usb_device()
+        mock_dm_cls.return_value.devices = [dev]
+        mock_labeler_cls.return_value.print.side_effect = [RuntimeError("pipe error"), None]
+
+        from printer_service import print_label
+
+        with pytest.raises(RuntimeError):
+            print_label(sample_widgets, sample_settings, printer_id=dev.usb_id)
+        print_label(sample_widgets, sample_settings, printer_id=dev.usb_id)
+
+        assert mock_dm_cls.return_value.scan.call_count == 2
+
+    @patch("printer_service.DymoLabeler")
+    @patch("printer_service.DeviceManager")
+    def test_power_transition_drops_sessions(
+        self, mock_dm_cls, mock_labeler_cls, sample_widgets, sample_settings
+    ):
+        import usb_power
+
+        dev = _usb_device()
+        mock_dm_cls.return_value.devices = [dev]
+
+        from printer_service import print_bitmap, print_label
+
+        print_label(sample_widgets, sample_settings, printer_id=None)
+        with patch.object(usb_power, "set_port_power"):
+            usb_power.power_on("1-1", 3)
+        print_bitmap(Image.new("1", (10, 64)), sample_settings, printer_id=None)
+
+        assert mock_dm_cls.return_value.scan.call_count == 2
+
+
+class TestListPrintersCaching:
+    @patch("printer_service.DeviceManager")
+    def test_repeat_calls_within_ttl_scan_once(self, mock_dm_cls, no_virtual_printers_env):
+        mock_dm_cls.return_value.devices = [_usb_device()]
+
+        from printer_service import list_printers
+
+        assert len(list_printers()) == 1
+        assert len(list_printers()) == 1
+        assert mock_dm_cls.return_value.scan.call_count == 1
+
+    @patch("printer_service.DeviceManager")
+    def test_no_devices_is_cached_as_empty(self, mock_dm_cls, no_virtual_printers_env):
+        from labelle.lib.devices.device_manager import DeviceManagerNoDevices
+
+        mock_dm_cls.return_value.scan.side_effect = DeviceManagerNoDevices("none")
+
+        from printer_service import list_printers
+
+        assert list_printers() == []
+        assert list_printers() == []
+        assert mock_dm_cls.return_value.scan.call_count == 1
+
+    @patch("printer_service.DeviceManager")
+    def test_power_transition_invalidates_list(self, mock_dm_cls, no_virtual_printers_env):
+        import usb_power
+
+        mock_dm_cls.return_value.devices = [_usb_device()]
+
+        from printer_service import list_printers
+
+        list_printers()
+        with patch.object(usb_power, "set_port_power"):
+            usb_power.power_off("1-1", 3)
+        list_printers()
+        assert mock_dm_cls.return_value.scan.call_count == 2
+
+    @patch("printer_service.DymoLabeler")
+    @patch("printer_service.DeviceManager")
+    def test_print_failure_invalidates_list(
+        self, mock_dm_cls, mock_labeler_cls, sample_widgets, sample_settings, no_virtual_printers_env
+    ):
+        dev = _usb_device()
+        mock_dm_cls.return_value.devices = [dev]
+        mock_labeler_cls.return_value.print.side_effect = RuntimeError("device gone")
+
+        from printer_service import list_printers, print_label
+
+        with pytest.raises(RuntimeError):
+            print_label(sample_widgets, sample_settings, printer_id=dev.usb_id)
+        list_printers()
+        assert mock_dm_cls.return_value.scan.call_count == 2
+
+
+class TestVirtualPrinterRegistry:
+    def test_config_is_parsed_once_across_calls(self, virtual_printer_env, sample_widgets, sample_settings):
+        from printer_service import _virtual_printers, list_printers, print_label, queue_key
+
+        with patch("printer_service.DeviceManager") as mock_dm_cls:
+            mock_dm_cls.return_value.devices = []
+            list_printers()
+            builds = _virtual_printers.builds
+            list_printers()
+            queue_key(None)
+            print_label(sample_widgets, sample_settings, printer_id="virtual:Test_Printer")
+        assert _virtual_printers.builds == builds
+
+    def test_unknown_virtual_printer_raises(self, virtual_printer_env, sample_widgets, sample_settings):
+        from printer_service import print_label
+
+        with pytest.raises(ValueError, match="not found"):
+            print_label(sample_widgets, sample_settings, printer_id="virtual:Nope")
+
+
+class TestHotplugRegistry:
+    @patch("printer_service.usb_power.invalidate_libusb_cache")
+    @patch("printer_service.DeviceManager")
+    def test_attach_rescans_and_detach_filters_without_scanning(
+        self, mock_dm_cls, mock_invalidate, no_virtual_printers_env
+    ):
+        import printer_service
+
+        dev = _usb_device()
+        mock_dm_cls.return_value.devices = [dev]
+
+        printer_service._on_hotplug({dev.usb_id}, set())
+        assert [p["id"] for p in printer_service.list_printers()] == [dev.usb_id]
+        mock_invalidate.assert_called_once()
+
+        printer_service._on_hotplug(set(), {dev.usb_id})
+        assert printer_service.list_printers() == []
+        # Detach was applied to the cache; libusb wasn't touched again.
+        assert mock_dm_cls.return_value.scan.call_count == 1
+        mock_invalidate.assert_called_once()
+
+    def test_monitor_disabled_by_zero_interval(self, monkeypatch):
+        import printer_service
+
+        monkeypatch.setenv("PRINTER_HOTPLUG_INTERVAL_SECONDS", "0")
+        monkeypatch.setattr(printer_service, "_hotplug", None)
+        printer_service.start_hotplug_monitor()
+        assert printer_service._hotplug is None
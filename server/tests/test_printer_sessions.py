@@ -0,0 +1,106 @@
+"""Tests for printer_sessions.PrinterSessions (persistent USB handles)."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from labelle.lib.devices.device_manager import DeviceManagerError
+
+from printer_sessions import PrinterSessions
+
+
+def _device(usb_id: str, supported: bool = True) -> MagicMock:
+    dev = MagicMock()
+    dev.usb_id = usb_id
+    dev.is_supported = supported
+    return dev
+
+
+@pytest.fixture
+def devices():
+    return [_device("Bus 001 Device 005: ID 0922:1002"), _device("Bus 001 Device 006: ID 0922:1002")]
+
+
+@pytest.fixture
+def scan(devices):
+    return MagicMock(return_value=devices)
+
+
+class TestDevice:
+    def test_first_call_scans_and_sets_up(self, scan, devices):
+        sessions = PrinterSessions(scan)
+        assert sessions.device(devices[1].usb_id) is devices[1]
+        scan.assert_called_once()
+        devices[1].setup.assert_called_once()
+
+    def test_repeat_calls_reuse_handle_without_scanning(self, scan, devices):
+        sessions = PrinterSessions(scan)
+        for _ in range(5):
+            sessions.device(devices[0].usb_id)
+        scan.assert_called_once()
+        devices[0].setup.assert_called_once()
+        stats = sessions.stats()
+        assert stats["scans"] == 1
+        assert stats["reuses"] == 4
+
+    def test_auto_select_picks_first_supported_and_is_cached(self, devices):
+        devices[0].is_supported = False
+        scan = MagicMock(return_value=devices)
+        sessions = PrinterSessions(scan)
+        assert sessions.device(None) is devices[1]
+        assert sessions.device(None) is devices[1]
+        scan.assert_called_once()
+
+    def test_unknown_printer_id_raises_value_error(self, scan):
+        sessions = PrinterSessions(scan)
+        with pytest.raises(ValueError, match="Printer not found"):
+            sessions.device("Bus 009 Device 009: ID 0922:1002")
+
+    def test_auto_select_without_supported_device_raises(self):
+        sessions = PrinterSessions(MagicMock(return_value=[_device("x", supported=False)]))
+        with pytest.raises(DeviceManagerError):
+            sessions.device(None)
+
+    def test_scan_failure_is_not_cached(self, devices):
+        scan = MagicMock(side_effect=[RuntimeError("bus gone"), devices])
+        sessions = PrinterSessions(scan)
+        with pytest.raises(RuntimeError):
+            sessions.device(None)
+        assert sessions.device(None) is devices[0]
+
+
+class TestInvalidate:
+    def test_invalidate_one_forces_rescan_for_that_id(self, scan, devices):
+        sessions = PrinterSessions(scan)
+        sessions.device(devices[0].usb_id)
+        sessions.device(devices[1].usb_id)
+        sessions.invalidate(devices[0].usb_id)
+        sessions.device(devices[1].usb_id)
+        assert scan.call_count == 2
+        sessions.device(devices[0].usb_id)
+        assert scan.call_count == 3
+
+    def test_invalidate_all_clears_auto_selection(self, scan):
+        sessions = PrinterSessions(scan)
+        sessions.device(None)
+        sessions.invalidate()
+        sessions.device(None)
+        assert scan.call_count == 2
+        assert sessions.stats()["open"] == 1
+
+
+class TestHealthCheck:
+    def test_stale_handle_is_rechecked_before_reuse(self, scan, devices):
+        sessions = PrinterSessions(scan, health_check_interval=0)
+        sessions.device(devices[0].usb_id)
+        sessions.device(devices[0].usb_id)
+        assert devices[0].setup.call_count == 2
+        scan.assert_called_once()
+        assert sessions.stats()["healthChecks"] == 1
+
+    def test_failed_health_check_rescans(self, scan, devices):
+        sessions = PrinterSessions(scan, health_check_interval=0)
+        sessions.device(devices[0].usb_id)
+        devices[0].setup.side_effect = [RuntimeError("unplugged"), None]
+        sessions.device(devices[0].usb_id)
+        assert scan.call_count == 2
+        assert sessions.stats()["healthFailures"] == 1
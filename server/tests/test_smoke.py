@@ -11,11 +11,25 @@ import pytest
 # cross-check test below will fail — reminding you to update
 # the Dockerfile's COPY instruction too.
 SERVER_MODULES = [
+    "admission",
     "app",
+    "asgi",
+    "batch_journal",
     "config",
+    "hotplug_monitor",
+    "job_queue",
+    "label_archive",
     "label_builder",
+    "label_index",
+    "main",
+    "power_metrics",
     "power_save",
+    "printer_discovery",
+    "printer_pool",
+    "printer_registry",
     "printer_service",
+    "printer_sessions",
+    "static_assets",
     "usb_power",
     "virtual_printer",
 ]
@@ -77,6 +91,13 @@ class TestFlaskApp:
             "/api/upload-image",
             "/api/uploads/<filename>",
             "/api/health",
+            "/api/ready",
+            "/api/queue",
+            "/api/admission",
+            "/api/batch-print/resume",
+            "/api/batch-print/resumable",
+            "/api/batch-print/<job_id>/events",
+            "/api/batch-print/<job_id>",
             "/api/power/status",
             "/api/power/on",
             "/api/power/off",
@@ -0,0 +1,66 @@
+"""Tests for static_assets: the in-memory dist-client manifest."""
+
+import gzip
+
+from static_assets import (
+    DEFAULT_CACHE,
+    IMMUTABLE_CACHE,
+    REVALIDATE_CACHE,
+    build_manifest,
+)
+
+BUNDLE_JS = b"console.log('labelle');\n" * 100
+
+
+def _write_dist(root):
+    (root / "assets").mkdir(parents=True)
+    (root / "index.html").write_text("<!doctype html><div id=root></div>")
+    (root / "assets" / "index-BxY3k9aZ.js").write_bytes(BUNDLE_JS)
+    (root / "icon-192.png").write_bytes(b"\x89PNG" + bytes(2000))
+    return root
+
+
+class TestBuildManifest:
+    def test_missing_root_is_empty(self, tmp_path):
+        assert build_manifest(str(tmp_path / "nope")) == {}
+
+    def test_keys_are_url_paths(self, tmp_path):
+        manifest = build_manifest(str(_write_dist(tmp_path)))
+        assert set(manifest) == {"index.html", "assets/index-BxY3k9aZ.js", "icon-192.png"}
+
+    def test_cache_policy(self, tmp_path):
+        manifest = build_manifest(str(_write_dist(tmp_path)))
+        assert manifest["assets/index-BxY3k9aZ.js"].cache_control == IMMUTABLE_CACHE
+        assert manifest["index.html"].cache_control == REVALIDATE_CACHE
+        assert manifest["icon-192.png"].cache_control == DEFAULT_CACHE
+
+    def test_text_assets_get_gzip_variant(self, tmp_path):
+        asset = build_manifest(str(_write_dist(tmp_path)))["assets/index-BxY3k9aZ.js"]
+        assert gzip.decompress(asset.variants["gzip"]) == BUNDLE_JS
+        assert asset.mimetype == "text/javascript"
+
+    def test_binary_and_tiny_files_are_not_compressed(self, tmp_path):
+        manifest = build_manifest(str(_write_dist(tmp_path)))
+        assert manifest["icon-192.png"].variants == {}
+        assert manifest["index.html"].variants == {}
+
+    def test_prebuilt_variant_is_used_and_not_listed(self, tmp_path):
+        root = _write_dist(tmp_path)
+        prebuilt = gzip.compress(BUNDLE_JS, compresslevel=1)
+        (root / "assets" / "index-BxY3k9aZ.js.gz").write_bytes(prebuilt)
+        manifest = build_manifest(str(root))
+        assert "assets/index-BxY3k9aZ.js.gz" not in manifest
+        assert manifest["assets/index-BxY3k9aZ.js"].variants["gzip"] == prebuilt
+
+
+class TestNegotiate:
+    def test_prefers_accepted_variant(self, tmp_path):
+        asset = build_manifest(str(_write_dist(tmp_path)))["assets/index-BxY3k9aZ.js"]
+        encoding, body, etag = asset.negotiate(lambda enc: 1.0 if enc == "gzip" else 0)
+        assert encoding == "gzip"
+        assert body == asset.variants["gzip"]
+        assert etag == f"{asset.etag}-gzip"
+
+    def test_identity_when_nothing_accepted(self, tmp_path):
+        asset = build_manifest(str(_write_dist(tmp_path)))["assets/index-BxY3k9aZ.js"]
+        assert asset.negotiate(lambda enc: 0) == (None, BUNDLE_JS, asset.etag)
@@ -2,6 +2,7 @@ from unittest.mock import patch
 
 import pytest
 
+import power_metrics
 import usb_power
 
 
@@ -47,8 +48,10 @@ def _result(stdout: str):
 @pytest.fixture
 def mock_run():
     """Patch subprocess.run inside usb_power so tests stay hermetic."""
+    usb_power.invalidate_snapshot()
     with patch.object(usb_power.subprocess, "run") as m:
         yield m
+    usb_power.invalidate_snapshot()
 
 
 class TestFindPrinterPort:
@@ -98,6 +101,41 @@ class TestGetPortStatus:
         assert s == {"powered": False, "connected": False}
 
 
+class TestTopologySnapshot:
+    def test_parses_every_hub_and_port(self):
+        topology = usb_power.parse_topology(UHUBCTL_DEFAULT_OUTPUT)
+        assert set(topology.hubs) == {"2", "1-1"}
+        assert topology.port("1-1", 3) == {"powered": True, "connected": True, "device": "0922:1002"}
+        assert topology.port("2", 3) == {"powered": True, "connected": False, "device": None}
+        assert topology.port("1-1", 9) is None
+        # Hub header descriptors aren't devices.
+        assert topology.find("2109:3431") is None
+
+    def test_find_and_status_share_one_uhubctl_call(self, mock_run):
+        mock_run.return_value = _result(UHUBCTL_DEFAULT_OUTPUT)
+        hub, port = usb_power.find_printer_port()
+        assert usb_power.get_port_status(hub, port) == {"powered": True, "connected": True}
+        assert mock_run.call_count == 1
+        # A full listing, not a per-port one.
+        assert mock_run.call_args.args[0] == [usb_power.UHUBCTL_BIN]
+
+    def test_expired_snapshot_is_retaken(self, mock_run):
+        mock_run.return_value = _result(UHUBCTL_DEFAULT_OUTPUT)
+        usb_power.snapshot()
+        usb_power.snapshot(max_age=0)
+        assert mock_run.call_count == 2
+
+    def test_power_transition_drops_snapshot(self, mock_run):
+        mock_run.side_effect = [
+            _result(UHUBCTL_DEFAULT_OUTPUT),
+            _result("OK"),
+            _result(UHUBCTL_PORT_OFF),
+        ]
+        assert usb_power.get_port_status("1-1", 3)["powered"] is True
+        usb_power.power_off("1-1", 3)
+        assert usb_power.get_port_status("1-1", 3)["powered"] is False
+
+
 class TestFindOrRecall:
     def setup_method(self):
         usb_power._last_known_port = None
@@ -243,3 +281,260 @@ class TestLibusbCacheInvalidation:
 
         assert usb.backend.libusb1._lib_object == "sentinel"
         assert usb.backend.libusb1._lib == "sentinel"
+
+
+class TestPowerListeners:
+    @pytest.fixture(autouse=True)
+    def isolated_listeners(self, monkeypatch):
+        monkeypatch.setattr(usb_power, "_power_listeners", [])
+
+    def test_listeners_notified_on_power_on_and_off(self, mock_run):
+        mock_run.return_value = _result("OK")
+        calls = []
+        usb_power.add_power_listener(lambda hub, port, on: calls.append((hub, port, on)))
+        usb_power.power_on("1-1", 3)
+        usb_power.power_off("1-1", 3)
+        assert calls == [("1-1", 3, True), ("1-1", 3, False)]
+
+    def test_failing_listener_does_not_break_transition(self, mock_run):
+        mock_run.return_value = _result("OK")
+        calls = []
+
+        def boom(hub, port, on):
+            raise RuntimeError("listener bug")
+
+        usb_power.add_power_listener(boom)
+        usb_power.add_power_listener(lambda hub, port, on: calls.append(on))
+        usb_power.power_off("1-1", 3)
+        assert calls == [False]
+
+    def test_listeners_not_notified_when_uhubctl_fails(self, mock_run):
+        import subprocess
+
+        mock_run.side_effect = subprocess.CalledProcessError(1, "uhubctl")
+        calls = []
+        usb_power.add_power_listener(lambda hub, port, on: calls.append(on))
+        with pytest.raises(subprocess.CalledProcessError):
+            usb_power.power_on("1-1", 3)
+        assert calls == []
+
+
+class TestCachedPowerState:
+    def test_reflects_last_transition_without_uhubctl(self, mock_run, monkeypatch):
+        monkeypatch.setattr(usb_power, "_last_transition", None)
+        monkeypatch.setattr(usb_power, "_port_power", None)
+        monkeypatch.setattr(usb_power, "_last_known_port", ("1-1", 3))
+        assert usb_power.cached_power_state()["powered"] is None
+
+        mock_run.return_value = _result("OK")
+        usb_power.power_off("1-1", 3)
+        calls = mock_run.call_count
+        state = usb_power.cached_power_state()
+        assert state["hub"] == "1-1"
+        assert state["port"] == 3
+        assert state["powered"] is False
+        assert mock_run.call_count == calls
+
+
+class TestKnownPortPower:
+    @pytest.fixture(autouse=True)
+    def reset(self, monkeypatch):
+        monkeypatch.setattr(usb_power, "_port_power", None)
+        monkeypatch.setattr(usb_power, "_last_known_port", None)
+
+    def test_status_reads_and_transitions_are_cached(self, mock_run):
+        assert usb_power.known_port_power() is None
+        mock_run.return_value = _result(UHUBCTL_PORT_OFF)
+        usb_power.get_port_status("1-1", 3)
+        assert usb_power.known_port_power()["powered"] is False
+        mock_run.return_value = _result("OK")
+        usb_power.power_on("1-1", 3)
+        known = usb_power.known_port_power()
+        assert (known["hub"], known["port"], known["powered"]) == ("1-1", 3, True)
+
+    def test_older_reading_does_not_overwrite_newer(self):
+        usb_power._remember_port_power("1-1", 3, True, 200.0)
+        usb_power._remember_port_power("1-1", 3, False, 100.0)
+        assert usb_power._port_power[2] is True
+
+    def test_refresh_without_printer_caches_unknown_port(self, mock_run):
+        mock_run.return_value = _result("Current status for hub 1-1 [2109:3431, ppps]\n")
+        known = usb_power.refresh_port_power()
+        assert (known["hub"], known["port"], known["powered"]) == (None, None, None)
+
+    def test_refresh_reads_found_port(self, mock_run):
+        mock_run.side_effect = [_result(UHUBCTL_DEFAULT_OUTPUT), _result(UHUBCTL_PORT_ON)]
+        known = usb_power.refresh_port_power()
+        assert (known["hub"], known["port"], known["powered"]) == ("1-1", 3, True)
+
+
+
+class TestTransitionMetrics:
+    @pytest.fixture(autouse=True)
+    def reset(self, monkeypatch):
+        monkeypatch.setattr(power_metrics, "log", power_metrics.PowerLog())
+        monkeypatch.setattr(usb_power, "_port_power", None)
+        monkeypatch.setattr(usb_power, "_last_known_port", None)
+        monkeypatch.setattr(usb_power, "_backend", None)
+        monkeypatch.delenv("USB_POWER_BACKEND", raising=False)
+
+    def test_power_on_and_off_are_logged_with_cause(self, mock_run):
+        mock_run.return_value = _result("OK")
+        on = usb_power.power_on("1-1", 3, cause="wake")
+        usb_power.power_off("1-1", 3)
+        events = power_metrics.log.events()
+        assert [(e["powered"], e["cause"]) for e in events] == [(True, "wake"), (False, "manual")]
+        assert on["backend"] == "uhubctl"
+        assert on["switchSeconds"] >= 0
+
+    def test_enumeration_wait_completes_the_transition(self, mock_run, fake_sysfs):
+        mock_run.return_value = _result("OK")
+        fake_sysfs.attach("1-1", 3)
+        transition = usb_power.power_on("1-1", 3)
+        usb_power.wait_until_enumerated("1-1", 3, root=str(fake_sysfs.root), transition=transition)
+        event = power_metrics.log.events()[0]
+        assert event["enumerated"] is True
+        assert event["durationSeconds"] >= event["enumerateSeconds"]
+
+    def test_refresh_logs_change_made_elsewhere(self, mock_run):
+        usb_power._remember_port_power("1-1", 3, True, 0.0)
+        usb_power._last_known_port = ("1-1", 3)
+        # One listing serves the find and the status read.
+        mock_run.return_value = _result(UHUBCTL_PORT_OFF)
+        usb_power.refresh_port_power()
+        events = power_metrics.log.events()
+        assert [(e["powered"], e["cause"]) for e in events] == [(False, "external")]
+
+    def test_refresh_without_change_logs_nothing(self, mock_run):
+        usb_power._remember_port_power("1-1", 3, True, 0.0)
+        mock_run.return_value = _result(UHUBCTL_DEFAULT_OUTPUT)
+        usb_power.refresh_port_power()
+        assert power_metrics.log.events() == []
+
+
+class TestDeviceEnumerated:
+    def test_device_below_hub(self, fake_sysfs):
+        fake_sysfs.attach("1-1", 3)
+        assert usb_power.device_enumerated("1-1", 3, root=str(fake_sysfs.root)) is True
+
+    def test_device_on_root_hub(self, fake_sysfs):
+        fake_sysfs.attach("1", 3)
+        assert usb_power.device_enumerated("1", 3, root=str(fake_sysfs.root)) is True
+
+    def test_absent_device(self, fake_sysfs):
+        assert usb_power.device_enumerated("1-1", 3, root=str(fake_sysfs.root)) is False
+
+    def test_other_device_on_port(self, fake_sysfs):
+        fake_sysfs.attach("1-1", 3, usb_id="046d:c52b")
+        assert usb_power.device_enumerated("1-1", 3, root=str(fake_sysfs.root)) is False
+
+    def test_not_yet_configured(self, fake_sysfs):
+        fake_sysfs.attach("1-1", 3, configuration="")
+        assert usb_power.device_enumerated("1-1", 3, root=str(fake_sysfs.root)) is False
+
+
+class TestWaitUntilEnumerated:
+    class Clock:
+        def __init__(self):
+            self.now = 0.0
+            self.sleeps = []
+
+        def __call__(self):
+            return self.now
+
+        def sleep(self, seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+    def test_returns_when_device_appears(self, fake_sysfs):
+        clock = self.Clock()
+        polls = []
+
+        def sleep(seconds):
+            clock.sleep(seconds)
+            polls.append(seconds)
+            if len(polls) == 4:
+                fake_sysfs.attach("1-1", 3)
+
+        result = usb_power.wait_until_enumerated(
+            "1-1", 3, root=str(fake_sysfs.root), clock=clock, sleep=sleep
+        )
+        assert result["enumerated"] is True
+        assert result["seconds"] == round(sum(polls), 3)
+        # Backoff: each poll waits longer than the one before.
+        assert polls == sorted(polls) and polls[0] < polls[-1]
+        assert usb_power.cached_power_state()["lastWake"]["enumerated"] is True
+
+    def test_gives_up_at_deadline(self, tmp_path):
+        clock = self.Clock()
+        result = usb_power.wait_until_enumerated(
+            "1-1", 3, timeout=2, root=str(tmp_path), clock=clock, sleep=clock.sleep
+        )
+        assert result == {"enumerated": False, "seconds": 2.0}
+        assert max(clock.sleeps) <= usb_power._POLL_MAX_SECONDS
+
+    def test_falls_back_to_fixed_settle_without_sysfs(self, tmp_path):
+        clock = self.Clock()
+        result = usb_power.wait_until_enumerated(
+            "1-1", 3, root=str(tmp_path / "missing"), clock=clock, sleep=clock.sleep
+        )
+        assert result["enumerated"] is None
+        assert clock.sleeps == [usb_power.FALLBACK_SETTLE_SECONDS]
+
+
+class TestSysfsBackend:
+    @pytest.fixture
+    def sysfs(self, fake_sysfs, monkeypatch):
+        fake_sysfs.add_port("1-1", 1)
+        fake_sysfs.add_port("1-1", 3)
+        fake_sysfs.attach("1-1", 1, usb_id="046d:c52b")
+        fake_sysfs.attach("1-1", 3)
+        monkeypatch.setattr(usb_power, "_backend", usb_power.SysfsBackend(str(fake_sysfs.root)))
+        monkeypatch.setattr(usb_power, "_port_power", None)
+        return fake_sysfs
+
+    def test_finds_printer_by_id(self, sysfs):
+        assert usb_power.find_printer_port() == ("1-1", 3)
+        assert usb_power.find_printer_port("dead:beef") is None
+
+    def test_finds_printer_on_root_hub(self, fake_sysfs):
+        fake_sysfs.attach("2", 4)
+        assert usb_power.SysfsBackend(str(fake_sysfs.root)).find(usb_power.DYMO_USB_ID) == ("2", 4)
+
+    def test_status_is_file_reads_only(self, sysfs):
+        with patch.object(usb_power.subprocess, "run") as mock_run:
+            assert usb_power.get_port_status("1-1", 3) == {"powered": True, "connected": True}
+        mock_run.assert_not_called()
+        assert usb_power.known_port_power()["powered"] is True
+
+    def test_power_off_and_on_write_disable(self, sysfs, monkeypatch):
+        monkeypatch.setattr(usb_power, "_power_listeners", [])
+        usb_power.power_off("1-1", 3)
+        assert sysfs.disable_value("1-1", 3) == "1"
+        sysfs.detach("1-1", 3)
+        assert usb_power.get_port_status("1-1", 3) == {"powered": False, "connected": False}
+        usb_power.power_on("1-1", 3)
+        assert sysfs.disable_value("1-1", 3) == "0"
+
+    def test_root_hub_port(self, fake_sysfs):
+        fake_sysfs.add_port("2", 4, powered=False)
+        backend = usb_power.SysfsBackend(str(fake_sysfs.root))
+        assert backend.status("2", 4)[0] == {"powered": False, "connected": False}
+
+    def test_unknown_port_raises_value_error(self, sysfs):
+        with pytest.raises(ValueError):
+            usb_power.get_port_status("1-1", 9)
+
+
+class TestBackendSelection:
+    @pytest.fixture(autouse=True)
+    def fresh_backend(self, monkeypatch):
+        monkeypatch.setattr(usb_power, "_backend", None)
+
+    def test_defaults_to_uhubctl(self, monkeypatch):
+        monkeypatch.delenv("USB_POWER_BACKEND", raising=False)
+        assert usb_power.backend().name == "uhubctl"
+
+    def test_sysfs_from_env(self, monkeypatch):
+        monkeypatch.setenv("USB_POWER_BACKEND", "sysfs")
+        assert usb_power.backend().name == "sysfs"
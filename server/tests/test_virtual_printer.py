@@ -1,9 +1,16 @@
+import datetime
 import json
 import os
+import shutil
+import threading
+import time
+from unittest.mock import patch
 
 import pytest
 from PIL import Image
 
+from label_archive import read_labels
+from label_index import read_index
 from virtual_printer import VirtualPrinter
 
 
@@ -184,3 +191,254 @@ class TestVirtualPrinterSave:
 
         for path in paths:
             assert os.path.isfile(path)
+
+    def test_recreates_removed_output_directory(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, output_mode="image")
+        shutil.rmtree(tmp_output_dir)
+        paths = vp.save(self._make_bitmap(), [], {})
+
+        assert os.path.isfile(paths[0])
+
+
+class TestWriteBehind:
+    def _make_bitmap(self):
+        return Image.new("RGB", (200, 50), color="blue")
+
+    def _gate(self, vp):
+        """Make the writer wait on the returned event before each write."""
+        release = threading.Event()
+        write = vp._write
+
+        def gated(*args):
+            release.wait(5)
+            return write(*args)
+
+        vp._write = gated
+        return release
+
+    def _wait_until_taken(self, vp):
+        """Wait for the writer to pick up (and block on) the queued label."""
+        deadline = time.monotonic() + 5
+        while vp.write_stats()["depth"] and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_save_queues_and_returns_planned_paths(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, output_mode="both", write_mode="behind")
+        release = self._gate(vp)
+        paths = vp.save(self._make_bitmap(), [{"type": "text", "text": "Hi"}], {})
+        assert {os.path.splitext(p)[1] for p in paths} == {".png", ".json"}
+        assert not any(os.path.exists(p) for p in paths)
+        release.set()
+        vp.flush()
+        assert all(os.path.isfile(p) for p in paths)
+        stats = vp.write_stats()
+        assert stats["written"] == 1
+        assert stats["depth"] == 0
+        vp.close()
+
+    def test_full_queue_blocks_until_writer_catches_up(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, write_mode="behind", queue_size=1)
+        release = self._gate(vp)
+        vp.save(self._make_bitmap(), [], {})
+        self._wait_until_taken(vp)
+        vp.save(self._make_bitmap(), [], {})  # fills the queue
+        blocked = threading.Thread(target=vp.save, args=(self._make_bitmap(), [], {}))
+        blocked.start()
+        blocked.join(0.1)
+        assert blocked.is_alive()
+        release.set()
+        blocked.join(5)
+        vp.flush()
+        stats = vp.write_stats()
+        assert stats["written"] == 3
+        assert stats["blocked"]["count"] == 1
+        vp.close()
+
+    def test_queue_full_past_timeout_raises(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, write_mode="behind", queue_size=1)
+        release = self._gate(vp)
+        vp._writer._put_timeout = 0.05
+        vp.save(self._make_bitmap(), [], {})
+        self._wait_until_taken(vp)
+        vp.save(self._make_bitmap(), [], {})
+        with pytest.raises(IOError, match="queue still full"):
+            vp.save(self._make_bitmap(), [], {})
+        release.set()
+        vp.close()
+
+    def test_close_drains_queue_then_writes_inline(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, write_mode="behind")
+        release = self._gate(vp)
+        queued = [vp.save(self._make_bitmap(), [], {})[0] for _ in range(5)]
+        release.set()
+        assert vp.close() is True
+        assert all(os.path.isfile(p) for p in queued)
+        after = vp.save(self._make_bitmap(), [], {})[0]
+        assert os.path.isfile(after)
+
+    def test_write_failure_is_counted_not_raised(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, write_mode="behind")
+
+        def fail(*args):
+            raise IOError("disk full")
+
+        vp._write = fail
+        vp.save(self._make_bitmap(), [], {})
+        vp.flush()
+        stats = vp.write_stats()
+        assert stats["failed"] == 1
+        assert stats["lastError"] == "disk full"
+        vp.close()
+
+    def test_sync_printer_has_no_writer(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir)
+        assert vp.write_mode == "sync"
+        assert vp.write_stats() is None
+        assert vp.close() is True
+
+    def test_invalid_write_mode_raises(self, tmp_output_dir):
+        with pytest.raises(ValueError, match="write_mode"):
+            VirtualPrinter("Test", tmp_output_dir, write_mode="later")
+
+    def test_from_config(self, tmp_output_dir):
+        vp = VirtualPrinter.from_config({
+            "name": "Archive", "path": tmp_output_dir, "output": "json",
+            "write": "behind", "queue": 8, "fsync": "idle",
+        })
+        assert (vp.output_mode, vp.write_mode, vp.fsync) == ("json", "behind", "idle")
+        assert vp.write_stats()["capacity"] == 8
+        vp.close()
+
+
+class TestFsyncPolicy:
+    def _save(self, vp):
+        return vp.save(Image.new("RGB", (20, 10)), [], {})
+
+    def test_never_does_not_fsync(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, output_mode="both")
+        with patch("virtual_printer.os.fsync") as mock_fsync:
+            self._save(vp)
+        mock_fsync.assert_not_called()
+
+    def test_each_syncs_every_file_and_the_directory(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, output_mode="both", fsync="each")
+        with patch("virtual_printer.os.fsync") as mock_fsync:
+            self._save(vp)
+        assert mock_fsync.call_count == 3
+
+    def test_idle_syncs_once_the_queue_drains(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, write_mode="behind", fsync="idle")
+        release = threading.Event()
+        write = vp._write
+        vp._write = lambda *args: (release.wait(5), write(*args))[1]
+        with patch("virtual_printer.os.fsync") as mock_fsync:
+            for _ in range(3):
+                self._save(vp)
+            release.set()
+            vp.flush()
+            # Three files plus the directory, in one pass.
+            assert mock_fsync.call_count == 4
+        assert vp.write_stats()["syncs"] == 1
+        vp.close()
+
+
+class TestArchiveMode:
+    def _make_bitmap(self):
+        return Image.new("RGB", (40, 10), color="white")
+
+    def test_save_appends_a_row(self, tmp_output_dir):
+        vp = VirtualPrinter("Archive", tmp_output_dir, output_mode="archive")
+        widgets = [{"type": "text", "text": "Box 1"}]
+        paths = vp.save(self._make_bitmap(), widgets, {"fontSize": 20})
+        assert paths == [vp.archive_path]
+        assert not any(n.endswith((".png", ".json")) for n in os.listdir(tmp_output_dir))
+        (label,) = read_labels(vp.archive_path)
+        assert label["printer"] == "virtual:Archive"
+        assert label["name"].startswith("label_")
+        assert label["widgets"] == widgets
+        assert label["settings"] == {"fontSize": 20}
+        assert label["image"].startswith(b"\x89PNG")
+        vp.close()
+
+    def test_write_behind_commits_queued_labels_together(self, tmp_output_dir):
+        vp = VirtualPrinter("Archive", tmp_output_dir, output_mode="archive", write_mode="behind")
+        release = threading.Event()
+        batches = []
+        write_batch = vp._write_batch
+
+        def gated(labels):
+            release.wait(5)
+            batches.append(len(labels))
+            return write_batch(labels)
+
+        vp._write_batch = gated
+        vp.save(self._make_bitmap(), [], {})
+        TestWriteBehind()._wait_until_taken(vp)
+        for _ in range(4):
+            vp.save(self._make_bitmap(), [], {})
+        release.set()
+        vp.flush()
+        assert batches == [1, 4]
+        stats = vp.write_stats()
+        assert stats["written"] == 5
+        assert stats["batches"] == 2
+        assert len(list(read_labels(vp.archive_path))) == 5
+        vp.close()
+
+    def test_close_releases_the_archive_and_later_saves_reopen_it(self, tmp_output_dir):
+        vp = VirtualPrinter("Archive", tmp_output_dir, output_mode="archive")
+        vp.save(self._make_bitmap(), [], {})
+        vp.close()
+        assert vp._archive is None
+        vp.save(self._make_bitmap(), [], {})
+        assert len(list(read_labels(vp.archive_path))) == 2
+        vp.close()
+
+    def test_idle_fsync_checkpoints_the_archive(self, tmp_output_dir):
+        vp = VirtualPrinter(
+            "Archive", tmp_output_dir, output_mode="archive", write_mode="behind", fsync="idle"
+        )
+        with patch("label_archive.LabelArchive.checkpoint") as mock_checkpoint:
+            vp.save(self._make_bitmap(), [], {})
+            vp.flush()
+        mock_checkpoint.assert_called_once()
+        vp.close()
+
+
+class TestHourlyLayout:
+    def _make_bitmap(self):
+        return Image.new("RGB", (40, 10), color="white")
+
+    def test_files_go_into_the_hour_directory(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, output_mode="both", layout="hourly")
+        created = datetime.datetime(2026, 3, 1, 9, 30).timestamp()
+        with patch("virtual_printer.time.time", return_value=created):
+            paths = vp.save(self._make_bitmap(), [], {}, job=("job1", 4))
+        hour_dir = os.path.join(tmp_output_dir, "2026", "03", "01", "09")
+        assert {os.path.dirname(p) for p in paths} == {hour_dir}
+        assert all(os.path.isfile(p) for p in paths)
+        (entry,) = read_index(tmp_output_dir)
+        assert entry["path"] + ".png" in paths
+        assert (entry["jobId"], entry["index"], entry["at"]) == ("job1", 4, created)
+        vp.close()
+
+    def test_range_query_over_write_behind_saves(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir, write_mode="behind", layout="hourly")
+        start = datetime.datetime(2026, 3, 1, 9).timestamp()
+        for hour in range(4):
+            with patch("virtual_printer.time.time", return_value=start + hour * 3600):
+                vp.save(self._make_bitmap(), [], {}, job=("job1", hour))
+        vp.flush()
+        found = list(read_index(tmp_output_dir, since=start + 3600, until=start + 3 * 3600))
+        assert [e["index"] for e in found] == [1, 2]
+        assert all(os.path.isfile(e["path"] + ".png") for e in found)
+        vp.close()
+
+    def test_flat_layout_keeps_no_index(self, tmp_output_dir):
+        vp = VirtualPrinter("Test", tmp_output_dir)
+        vp.save(self._make_bitmap(), [], {}, job=("job1", 0))
+        assert not os.path.exists(vp.index_path)
+
+    def test_invalid_layout_raises(self, tmp_output_dir):
+        with pytest.raises(ValueError, match="layout"):
+            VirtualPrinter("Test", tmp_output_dir, layout="daily")
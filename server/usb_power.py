@@ -1,33 +1,64 @@
-"""Per-port USB power control via uhubctl.
+"""Per-port USB power control via uhubctl or sysfs.
 
 Lets us power off the Dymo printer's USB port when idle so its transformer
 isn't running 24/7, and power it back on when the user opens the page.
 
-Requires `uhubctl` on PATH (apt-installed in the Docker image). The hub must
-support per-port power switching (ppps) — confirmed for the 2109:3431 USB
-2.0 hub on hector.
+Two backends, picked by `USB_POWER_BACKEND`:
+- `uhubctl` (default): requires `uhubctl` on PATH (apt-installed in the
+  Docker image). Every read comes from one shared listing (`snapshot()`).
+- `sysfs`: reads and writes the kernel's per-port `disable` attribute
+  (`/sys/bus/usb/devices/<hub>:1.0/<hub>-port<N>/disable`, Linux 6.0+)
+  — plain file access, no subprocess. Needs /sys writable by the server.
+
+Either way the hub must support per-port power switching (ppps) —
+confirmed for the 2109:3431 USB 2.0 hub on hector. Hubs and ports are
+named the way uhubctl names them (`1-1`, port 3) for both backends, so
+the persisted port survives a backend switch.
+
+Every power transition, with its cause and timings, is logged in
+`power_metrics` (served by `/api/power/metrics`).
 """
 
 import json
 import logging
 import os
-import re
 import subprocess
+import threading
+import time
 from pathlib import Path
+from typing import Callable
 
 import usb.backend.libusb1
 
+import config
+import power_metrics
+
 logger = logging.getLogger(__name__)
 
 UHUBCTL_BIN = os.environ.get("UHUBCTL_BIN", "uhubctl")
 DYMO_USB_ID = "0922:1002"
 
-_HUB_LINE_RE = re.compile(r"Current status for hub (\S+)")
-_PORT_DEVICE_RE = re.compile(r"\s+Port (\d+):.*\[(\S+) ")
-_PORT_LINE_RE = re.compile(r"\s+Port (\d+):\s+(\w+)(.*)")
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+
+# Longest `wait_until_enumerated()` polls before giving up and letting
+# the caller try the printer anyway.
+ENUMERATE_TIMEOUT_SECONDS = 5.0
+# Fixed wait used instead when sysfs can't be read (not Linux, /sys not
+# mounted into the container).
+FALLBACK_SETTLE_SECONDS = 1.5
+# Poll interval starts here and grows by half each time, up to the max.
+_POLL_INITIAL_SECONDS = 0.02
+_POLL_MAX_SECONDS = 0.25
+
+# How long one uhubctl listing answers find/status calls. Short: it only
+# needs to cover the calls one request or idle check makes together.
+# Power transitions drop it early.
+SNAPSHOT_TTL_SECONDS = 2.0
+
+_HUB_PREFIX = "Current status for hub "
 
 
-def _invalidate_libusb_cache() -> None:
+def invalidate_libusb_cache() -> None:
     """Drop pyusb's cached libusb context so the next scan re-enumerates.
 
     pyusb's `usb.backend.libusb1` caches a `_lib_object` at module level
@@ -60,69 +91,420 @@ def _run(*args: str) -> str:
     return result.stdout.decode()
 
 
-def find_printer_port(vendor_product_id: str = DYMO_USB_ID) -> tuple[str, int] | None:
-    """Locate (hub, port) for a USB device by `VVVV:PPPP` id, or None if absent."""
-    output = _run()
-    current_hub: str | None = None
-    for line in output.splitlines():
-        if m := _HUB_LINE_RE.match(line):
-            current_hub = m.group(1)
-            continue
-        if current_hub and (m := _PORT_DEVICE_RE.match(line)):
-            if m.group(2) == vendor_product_id:
-                return current_hub, int(m.group(1))
-    return None
+class Topology:
+    """One `uhubctl` listing: every hub, and per port its power and
+    connect flags and the attached device's `VVVV:PPPP` id.
+
+    The listing is split into per-hub sections in one pass; a hub's
+    port lines are parsed the first time that hub is asked about, and
+    `find()` only parses the hub whose section mentions the device.
+    Most calls want one port, so that skips nearly all of the text on a
+    busy machine. `taken_at` is the monotonic time the listing started.
+    """
 
+    def __init__(self, sections: dict[str, str], taken_at: float):
+        self._sections = sections
+        self._ports: dict[str, dict[int, dict]] = {}
+        self.taken_at = taken_at
+
+    @property
+    def hubs(self) -> list[str]:
+        return list(self._sections)
+
+    def ports(self, hub: str) -> dict[int, dict]:
+        """port -> {"powered", "connected", "device"} for one hub."""
+        ports = self._ports.get(hub)
+        if ports is None:
+            ports = self._ports[hub] = _parse_ports(self._sections.get(hub, ""))
+        return ports
+
+    def port(self, hub: str, port: int) -> dict | None:
+        return self.ports(hub).get(port)
+
+    def find(self, vendor_product_id: str) -> tuple[str, int] | None:
+        needle = "[" + vendor_product_id
+        for hub, section in self._sections.items():
+            if needle not in section:
+                continue
+            for port, state in self.ports(hub).items():
+                if state["device"] == vendor_product_id:
+                    return hub, port
+        return None
 
-def get_port_status(hub: str, port: int) -> dict:
-    """Return {'powered': bool, 'connected': bool} for a specific hub port.
 
-    uhubctl prints the upstream hub's port alongside the target hub's
-    port, so we have to filter to the right hub before reading the
-    port line — otherwise we read the upstream's status (which never
-    reports `connect`).
+def _parse_ports(section: str) -> dict[int, dict]:
+    """Parse one hub's port lines (`  Port 3: 0103 power enable connect
+    [0922:1002 Dymo ...]`).
 
     The status keywords (`power`, `enable`, `connect`, ...) appear
     before the optional `[VVVV:PPPP Vendor Product ...]` device
-    descriptor, so we strip the descriptor first and tokenize the
-    rest — otherwise a product name containing "power" or "connect"
-    would false-match.
+    descriptor, so only the part before `[` is tokenized — otherwise a
+    product name containing "power" or "connect" would false-match.
     """
-    output = _run("-l", hub, "-p", str(port))
-    in_target_hub = False
-    for line in output.splitlines():
-        if m := _HUB_LINE_RE.match(line):
-            in_target_hub = m.group(1) == hub
+    ports: dict[int, dict] = {}
+    for line in section.split("\n"):
+        head, _, descriptor = line.partition("[")
+        label, sep, flags = head.partition(":")
+        label = label.strip()
+        if not sep or not label.startswith("Port ") or not label[5:].isdigit():
             continue
-        if in_target_hub and (m := _PORT_LINE_RE.match(line)) and int(m.group(1)) == port:
-            flags_part = m.group(3).split("[", 1)[0]
-            tokens = flags_part.split()
-            return {
-                "powered": "power" in tokens,
-                "connected": "connect" in tokens,
-            }
-    raise ValueError(f"Port {port} not found on hub {hub}")
+        tokens = flags.split()
+        device = descriptor.split(" ", 1)[0].rstrip("]")
+        ports[int(label[5:])] = {
+            "powered": "power" in tokens,
+            "connected": "connect" in tokens,
+            "device": device or None,
+        }
+    return ports
+
+
+def parse_topology(output: str, taken_at: float = 0.0) -> Topology:
+    """Split a full `uhubctl` listing into per-hub sections.
+
+    Hubs are kept apart: uhubctl prints a USB 3 hub's companion
+    (upstream) hub with the same port numbers, and only the hub the
+    device is on reports `connect`.
+    """
+    sections: dict[str, str] = {}
+    for chunk in output.split(_HUB_PREFIX)[1:]:
+        hub, _, rest = chunk.partition(" ")
+        # Drop the rest of the header line ("[2109:3431 USB2.0 Hub, ...]"),
+        # which would otherwise look like a device descriptor to find().
+        sections[hub] = rest.partition("\n")[2]
+    return Topology(sections, taken_at)
+
+
+_snapshot: Topology | None = None
+_snapshot_lock = threading.Lock()
+
+
+def snapshot(max_age: float = SNAPSHOT_TTL_SECONDS) -> Topology:
+    """The uhubctl topology, from one `uhubctl` call at most every
+    `max_age` seconds. Concurrent callers share a single call."""
+    global _snapshot
+    current = _snapshot
+    if current is not None and time.monotonic() - current.taken_at < max_age:
+        return current
+    with _snapshot_lock:
+        current = _snapshot
+        if current is not None and time.monotonic() - current.taken_at < max_age:
+            return current
+        taken_at = time.monotonic()
+        current = parse_topology(_run(), taken_at)
+        _snapshot = current
+    return current
+
+
+def invalidate_snapshot() -> None:
+    global _snapshot
+    _snapshot = None
+
+
+class UhubctlBackend:
+    """Port power through the `uhubctl` binary; reads share `snapshot()`."""
+
+    name = "uhubctl"
+
+    def find(self, vendor_product_id: str) -> tuple[str, int] | None:
+        return snapshot().find(vendor_product_id)
+
+    def status(self, hub: str, port: int) -> tuple[dict, float]:
+        topology = snapshot()
+        state = topology.port(hub, port)
+        if state is None:
+            raise ValueError(f"Port {port} not found on hub {hub}")
+        return {"powered": state["powered"], "connected": state["connected"]}, topology.taken_at
+
+    def set_power(self, hub: str, port: int, on: bool) -> None:
+        try:
+            _run("-l", hub, "-p", str(port), "-a", "on" if on else "off")
+        finally:
+            # Even a failed switch may have changed something; re-read next time.
+            invalidate_snapshot()
+
+
+class SysfsBackend:
+    """Port power through the kernel's per-port `disable` attribute.
+
+    A hub's ports live under its first interface: hub `1-1` has
+    `1-1:1.0/1-1-port3`, root hub `1` (sysfs `usb1`) has
+    `1-0:1.0/usb1-port3`. Writing 1 to `disable` switches the port off
+    (and its power, on ppps hubs); 0 switches it back on. A device on
+    the port shows up as its own directory (`1-1.3`).
+    """
+
+    name = "sysfs"
+
+    def __init__(self, root: str = SYSFS_USB_DEVICES):
+        self.root = Path(root)
+
+    def _disable_file(self, hub: str, port: int) -> Path:
+        if "-" in hub:
+            return self.root / f"{hub}:1.0" / f"{hub}-port{port}" / "disable"
+        return self.root / f"{hub}-0:1.0" / f"usb{hub}-port{port}" / "disable"
+
+    def find(self, vendor_product_id: str) -> tuple[str, int] | None:
+        for entry in os.scandir(self.root):
+            name = entry.name
+            # Interfaces (`1-1:1.0`) and root hubs (`usb1`) aren't port devices.
+            if ":" in name or "-" not in name:
+                continue
+            path = Path(entry.path)
+            try:
+                usb_id = f"{(path / 'idVendor').read_text().strip()}:{(path / 'idProduct').read_text().strip()}"
+            except OSError:
+                continue
+            if usb_id != vendor_product_id:
+                continue
+            if "." in name:
+                hub, port = name.rsplit(".", 1)
+            else:
+                hub, port = name.split("-", 1)
+            return hub, int(port)
+        return None
+
+    def status(self, hub: str, port: int) -> tuple[dict, float]:
+        observed_at = time.monotonic()
+        disable_file = self._disable_file(hub, port)
+        try:
+            disabled = disable_file.read_text().strip()
+        except FileNotFoundError:
+            raise ValueError(f"Port {port} not found on hub {hub}") from None
+        return {
+            "powered": disabled == "0",
+            "connected": (self.root / _port_sysfs_name(hub, port)).is_dir(),
+        }, observed_at
+
+    def set_power(self, hub: str, port: int, on: bool) -> None:
+        self._disable_file(hub, port).write_text("0" if on else "1")
+
+
+_backend: UhubctlBackend | SysfsBackend | None = None
+
+
+def backend() -> UhubctlBackend | SysfsBackend:
+    """The configured backend (`USB_POWER_BACKEND`), built on first use."""
+    global _backend
+    if _backend is None:
+        _backend = SysfsBackend() if config.get_usb_power_backend() == "sysfs" else UhubctlBackend()
+        logger.info("USB port power backend: %s", _backend.name)
+    return _backend
+
+
+def find_printer_port(vendor_product_id: str = DYMO_USB_ID) -> tuple[str, int] | None:
+    """Locate (hub, port) for a USB device by `VVVV:PPPP` id, or None if absent."""
+    return backend().find(vendor_product_id)
+
+
+def get_port_status(hub: str, port: int) -> dict:
+    """Return {'powered': bool, 'connected': bool} for a specific hub port."""
+    status, observed_at = backend().status(hub, port)
+    _remember_port_power(hub, port, status["powered"], observed_at)
+    return status
+
+
+# Callbacks run after every `power_on()` / `power_off()` as
+# `fn(hub, port, on)`. Lets caches elsewhere (open printer sessions,
+# device lists) drop state that a power transition made stale without
+# this module having to import them.
+_power_listeners: list[Callable[[str, int, bool], None]] = []
+
+
+def add_power_listener(fn: Callable[[str, int, bool], None]) -> None:
+    _power_listeners.append(fn)
+
+
+# Outcome of the last power_on()/power_off() this process ran, as
+# (powered, wall-clock time). None until the first transition. Read by
+# readiness checks that mustn't run uhubctl.
+_last_transition: tuple[bool, float] | None = None
+# Bumped by every power_on()/power_off(), so a state refresh can tell a
+# change it observed from one this process made while it was reading.
+_transition_count = 0
+
+
+# Last known power state of the printer port as (hub, port, powered,
+# observed_at), kept current by every uhubctl status read, every
+# power_on()/power_off() and power_save's background refresh, so the
+# per-request wake check is a memory read rather than two uhubctl
+# forks. hub/port/powered are None when no printer port is known; the
+# whole tuple is None until the first check. Unlocked for the same
+# reason as `_last_known_port`: one tuple assignment is atomic.
+_port_power: tuple[str | None, int | None, bool | None, float] | None = None
+
+
+def _remember_port_power(
+    hub: str | None, port: int | None, powered: bool | None, observed_at: float
+) -> None:
+    """Record a reading taken at `observed_at` (monotonic), unless a
+    newer one is already recorded: a status read that started before a
+    power transition finished must not overwrite the transition."""
+    global _port_power
+    current = _port_power
+    if current is not None and current[3] > observed_at:
+        return
+    _port_power = (hub, port, powered, observed_at)
+
+
+def known_port_power() -> dict | None:
+    """The cached printer port power state, or None if never checked.
+    Never runs uhubctl."""
+    state = _port_power
+    if state is None:
+        return None
+    hub, port, powered, observed_at = state
+    return {
+        "hub": hub,
+        "port": port,
+        "powered": powered,
+        "ageSeconds": round(time.monotonic() - observed_at, 1),
+    }
+
+
+def refresh_port_power() -> dict:
+    """Re-read the printer port's power state with uhubctl and cache it.
+    Returns the same shape as `known_port_power()`."""
+    observed_at = time.monotonic()
+    previous = _port_power
+    transitions = _transition_count
+    found = find_or_recall_printer_port()
+    if found is None:
+        _remember_port_power(None, None, None, observed_at)
+    else:
+        hub, port = found
+        powered = get_port_status(hub, port)["powered"]
+        _remember_port_power(hub, port, powered, observed_at)
+        if (
+            previous is not None
+            and previous[:2] == (hub, port)
+            and previous[2] is not None
+            and previous[2] != powered
+            and _transition_count == transitions
+        ):
+            # Switched by something other than this process (uhubctl by
+            # hand, a hub reset): log it so the transition history and
+            # powered-on hours stay complete.
+            power_metrics.log.record(powered, "external", hub, port)
+    return known_port_power()
+
+
+def _notify_power_listeners(hub: str, port: int, on: bool) -> None:
+    global _last_transition, _transition_count
+    _last_transition = (on, time.time())
+    _transition_count += 1
+    _remember_port_power(hub, port, on, time.monotonic())
+    for fn in list(_power_listeners):
+        try:
+            fn(hub, port, on)
+        except Exception:
+            # A broken listener must not turn a successful power
+            # transition into a failed request.
+            logger.exception("USB power listener %r failed", fn)
 
 
 def set_port_power(hub: str, port: int, on: bool) -> None:
-    _run("-l", hub, "-p", str(port), "-a", "on" if on else "off")
+    backend().set_power(hub, port, on)
+
 
+def _switch(hub: str, port: int, on: bool, cause: str) -> dict:
+    started = time.monotonic()
+    set_port_power(hub, port, on=on)
+    return power_metrics.log.record(on, cause, hub, port, time.monotonic() - started, backend().name)
 
-def power_on(hub: str, port: int) -> None:
-    set_port_power(hub, port, on=True)
+
+def power_on(hub: str, port: int, cause: str = "manual") -> dict:
+    """Switch the port on. `cause` labels the transition in
+    `power_metrics`; returns its record, which `wait_until_enumerated()`
+    completes with the re-enumeration time."""
+    transition = _switch(hub, port, True, cause)
     # Device just (re-)appeared at a new bus address; drop libusb's
     # cached enumeration so the next scan sees the live state.
-    _invalidate_libusb_cache()
+    invalidate_libusb_cache()
+    _notify_power_listeners(hub, port, True)
+    return transition
 
 
-def power_off(hub: str, port: int) -> None:
-    set_port_power(hub, port, on=False)
+def power_off(hub: str, port: int, cause: str = "manual") -> dict:
+    transition = _switch(hub, port, False, cause)
     # Deliberately NOT invalidating the libusb cache here — see
-    # `_invalidate_libusb_cache` docstring. A libusb re-init would
+    # `invalidate_libusb_cache` docstring. A libusb re-init would
     # trigger a hub auto-resume that re-energizes the port we just
     # turned off. Callers that need to read accurate USB topology
     # while a port is off should use uhubctl-based status (`/api/
     # power/status`) rather than libusb-based device enumeration.
+    _notify_power_listeners(hub, port, False)
+    return transition
+
+
+def _port_sysfs_name(hub: str, port: int) -> str:
+    # uhubctl names hubs by their sysfs device name: a root hub is "1"
+    # (its ports' devices are "1-3"), any hub below it "1-1" ("1-1.3").
+    return f"{hub}.{port}" if "-" in hub else f"{hub}-{port}"
+
+
+def device_enumerated(
+    hub: str,
+    port: int,
+    vendor_product_id: str = DYMO_USB_ID,
+    root: str = SYSFS_USB_DEVICES,
+) -> bool:
+    """True once the device on (hub, port) shows up in sysfs with the
+    expected id and a configuration selected, i.e. libusb can open it.
+    Plain file reads: no uhubctl, no libusb."""
+    path = Path(root) / _port_sysfs_name(hub, port)
+    try:
+        usb_id = f"{(path / 'idVendor').read_text().strip()}:{(path / 'idProduct').read_text().strip()}"
+        configuration = (path / "bConfigurationValue").read_text().strip()
+    except OSError:
+        return False
+    return usb_id == vendor_product_id and configuration != ""
+
+
+# Outcome of the last `wait_until_enumerated()`, for readiness output:
+# {"enumerated": bool | None, "seconds": float, "at": wall-clock time}.
+_last_wake: dict | None = None
+
+
+def wait_until_enumerated(
+    hub: str,
+    port: int,
+    timeout: float = ENUMERATE_TIMEOUT_SECONDS,
+    root: str = SYSFS_USB_DEVICES,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+    transition: dict | None = None,
+) -> dict:
+    """After `power_on()`, wait until the printer has re-enumerated,
+    polling sysfs with backoff, for at most `timeout` seconds.
+
+    Returns {"enumerated", "seconds"}: `enumerated` is False on timeout
+    and None when sysfs isn't available, in which case this falls back
+    to a fixed `FALLBACK_SETTLE_SECONDS` wait. Both are added to
+    `transition` (the record `power_on()` returned), if given.
+    """
+    global _last_wake
+    started = clock()
+    if not os.path.isdir(root):
+        sleep(FALLBACK_SETTLE_SECONDS)
+        enumerated = None
+    else:
+        interval = _POLL_INITIAL_SECONDS
+        while not (enumerated := device_enumerated(hub, port, root=root)):
+            remaining = timeout - (clock() - started)
+            if remaining <= 0:
+                logger.warning(
+                    "Printer on %s port %d not enumerated %.1fs after power-on",
+                    hub, port, timeout,
+                )
+                break
+            sleep(min(interval, remaining))
+            interval = min(interval * 1.5, _POLL_MAX_SECONDS)
+    seconds = round(clock() - started, 3)
+    _last_wake = {"enumerated": enumerated, "seconds": seconds, "at": time.time()}
+    if transition is not None:
+        power_metrics.log.record_enumeration(transition, enumerated, seconds)
+    logger.info("Printer on %s port %d: power-on wait %.3fs (enumerated=%s)", hub, port, seconds, enumerated)
+    return {"enumerated": enumerated, "seconds": seconds}
 
 
 # Path where `_last_known_port` is persisted across container restarts.
@@ -211,3 +593,22 @@ def find_or_recall_printer_port(
         _last_known_port = found
         _save_state(*found)
     return found or _last_known_port
+
+
+def cached_power_state() -> dict:
+    """The printer port and power state as last seen by this process,
+    without running uhubctl. `powered` is None until the port has been
+    checked or switched since startup."""
+    port = _last_known_port
+    known = _port_power
+    transition = _last_transition
+    powered = None
+    if known is not None and port is not None and known[:2] == port:
+        powered = known[2]
+    return {
+        "hub": port[0] if port else None,
+        "port": port[1] if port else None,
+        "powered": powered,
+        "changedAt": transition[1] if transition else None,
+        "lastWake": _last_wake,
+    }
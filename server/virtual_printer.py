@@ -2,36 +2,326 @@
 
 Virtual printers save label output to a configured directory instead of sending
 to a physical USB printer. Output can be a preview PNG, label JSON, or both,
-controlled by the `output_mode` setting.
+controlled by the `output_mode` setting, or, with `"archive"`, one row
+per label in a SQLite database in that directory (see label_archive.py).
+
+By default (`write_mode="sync"`) `save()` encodes and writes the files
+before it returns, so a slow disk (SD card, NFS) throttles a batch
+label by label. With `write_mode="behind"` `save()` only queues the
+label for a writer thread owned by the printer and returns the paths
+the files will have. The queue is bounded: when it's full `save()`
+blocks until the writer catches up (backpressure), and raises `IOError`
+if it stays full for `PUT_TIMEOUT_SECONDS`. Write failures on the
+writer can't fail the print any more; they are logged and counted in
+`write_stats()`. `close()` drains the queue (the registry calls it at
+exit).
+
+`fsync` decides when written files are forced to disk: `"never"`
+(leave it to the OS), `"each"` (every file, plus the directory entry)
+or `"idle"` (in write-behind mode, everything written so far once the
+queue runs empty; the same as `"each"` for sync writes). For the
+archive, `"each"` makes SQLite sync every commit and `"idle"`
+checkpoints its WAL when the queue runs empty.
+
+An archive printer with write-behind commits everything queued at once
+(up to `MAX_ARCHIVE_BATCH` labels) in a single transaction.
+
+With `layout="hourly"` the file modes write into `YYYY/MM/DD/HH`
+subdirectories of the output path and append each label to an index
+file (see label_index.py), so neither the writer nor a reader has to
+work with one huge flat directory.
 """
 
 import datetime
 import json
 import logging
 import os
+import queue
+import sqlite3
+import threading
+import time
 import uuid
 from pathlib import Path
 
 from PIL import Image
 
+from label_archive import ARCHIVE_FILENAME, LabelArchive, encode_png
+from label_index import INDEX_FILENAME, LabelIndex
+
 LOG = logging.getLogger(__name__)
 
+DEFAULT_QUEUE_SIZE = 64
+# Longest `save()` blocks on a full write-behind queue before failing.
+PUT_TIMEOUT_SECONDS = 60.0
+# How long `close()` waits for a write-behind queue to drain.
+CLOSE_TIMEOUT_SECONDS = 30.0
+# Most labels an archive printer's writer commits in one transaction.
+MAX_ARCHIVE_BATCH = 256
 
-class VirtualPrinter:
-    """Virtual printer that saves labels as PNG and/or JSON files."""
+# Queued by `WriteBehind.close()` to stop the writer once the labels
+# ahead of it are written.
+_STOP = object()
+
+
+def _fsync_path(path: str) -> None:
+    """fsync a written file or a directory (its entries) by path."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # Directories can't be opened on every platform; the files
+        # themselves are what matters.
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class WriteBehind:
+    """Bounded queue plus one writer thread for a virtual printer.
+
+    `submit()` queues a label's files; the thread writes them through
+    the printer's `_write_batch()` in order, one label at a time or, for
+    printers that batch (the archive), everything queued at once.
+    Latency is tracked both for the write itself (encode + write +
+    fsync, per label) and from submit to written.
+    """
+
+    def __init__(self, printer: "VirtualPrinter", queue_size: int, put_timeout: float = PUT_TIMEOUT_SECONDS):
+        self._printer = printer
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._put_timeout = put_timeout
+        # Held while checking `_closed` and queuing, so nothing is
+        # queued behind the stop marker.
+        self._submit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._unsynced: list[str] = []
+        self.max_depth = 0
+        self.written = 0
+        self.failed = 0
+        self.last_error: str | None = None
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self.syncs = 0
+        self.batches = 0
+        self._write_last = 0.0
+        self._write_total = 0.0
+        self._write_max = 0.0
+        self._lag_last = 0.0
+        self._lag_max = 0.0
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name=f"virtual-writer-{printer.id}"
+        )
+        self._thread.start()
+
+    def submit(
+        self,
+        base_path: str,
+        bitmap: Image.Image,
+        widgets: list[dict],
+        settings: dict,
+        created: float,
+        job: tuple[str, int] | None = None,
+    ) -> None:
+        """Queue one label, blocking while the queue is full. Once
+        closed, writes it on the caller's thread instead."""
+        with self._submit_lock:
+            if self._closed:
+                self._printer._write(base_path, bitmap, widgets, settings, created, job)
+                return
+            item = (time.monotonic(), base_path, bitmap, widgets, settings, created, job)
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                started = time.monotonic()
+                try:
+                    self._queue.put(item, timeout=self._put_timeout)
+                except queue.Full:
+                    raise IOError(
+                        f"Virtual printer '{self._printer.name}' write queue still full "
+                        f"after {self._put_timeout:g}s"
+                    ) from None
+                finally:
+                    with self._stats_lock:
+                        self.blocked += 1
+                        self.blocked_seconds += time.monotonic() - started
+            with self._stats_lock:
+                self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def _take_batch(self) -> list:
+        batch = [self._queue.get()]
+        if batch[0] is _STOP or not self._printer.batches_writes:
+            return batch
+        while len(batch) < MAX_ARCHIVE_BATCH:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
 
-    VALID_OUTPUT_MODES = ("image", "json", "both")
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            try:
+                stopping = batch[-1] is _STOP
+                labels = batch[:-1] if stopping else batch
+                if labels:
+                    self._write_labels(labels)
+                if stopping:
+                    self._sync_unsynced()
+                    return
+                if self._queue.empty():
+                    self._sync_unsynced()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
 
-    def __init__(self, name: str, output_path: str, output_mode: str = "image"):
-        if output_mode not in self.VALID_OUTPUT_MODES:
-            raise ValueError(
-                f"Invalid output_mode '{output_mode}' for virtual printer '{name}'. "
-                f"Must be one of: {', '.join(self.VALID_OUTPUT_MODES)}"
+    def _write_labels(self, items: list[tuple]) -> None:
+        started = time.monotonic()
+        try:
+            paths = self._printer._write_batch([item[1:] for item in items])
+        except Exception as e:
+            LOG.error(f"Virtual printer '{self._printer.name}' write-behind failed: {e}")
+            with self._stats_lock:
+                self.failed += len(items)
+                self.last_error = str(e)
+            return
+        finished = time.monotonic()
+        with self._stats_lock:
+            self.written += len(items)
+            self.batches += 1
+            self._write_last = (finished - started) / len(items)
+            self._write_total += finished - started
+            self._write_max = max(self._write_max, self._write_last)
+            self._lag_last = finished - items[-1][0]
+            self._lag_max = max(self._lag_max, finished - items[0][0])
+            if self._printer.fsync == "idle":
+                self._unsynced.extend(paths)
+
+    def _sync_unsynced(self) -> None:
+        with self._stats_lock:
+            paths, self._unsynced = self._unsynced, []
+        if not paths:
+            return
+        try:
+            self._printer._sync_written(paths)
+        except (OSError, sqlite3.Error) as e:
+            LOG.error(f"Virtual printer '{self._printer.name}' fsync failed: {e}")
+            with self._stats_lock:
+                self.last_error = str(e)
+            return
+        with self._stats_lock:
+            self.syncs += 1
+
+    def flush(self) -> None:
+        """Block until every label queued so far has been written."""
+        self._queue.join()
+
+    def close(self, timeout: float = CLOSE_TIMEOUT_SECONDS) -> bool:
+        """Stop accepting labels, write out the queue and stop the
+        thread. Returns False if the queue didn't drain in `timeout`."""
+        with self._submit_lock:
+            if self._closed:
+                return not self._thread.is_alive()
+            self._closed = True
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                return False
+        self._thread.join(timeout)
+        drained = not self._thread.is_alive()
+        if not drained:
+            LOG.warning(
+                f"Virtual printer '{self._printer.name}' still has {self._queue.qsize()} "
+                f"label(s) queued after {timeout:g}s"
             )
+        return drained
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "depth": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "maxDepth": self.max_depth,
+                "written": self.written,
+                "failed": self.failed,
+                "lastError": self.last_error,
+                "blocked": {"count": self.blocked, "totalMs": _ms(self.blocked_seconds)},
+                "writeMs": {
+                    "last": _ms(self._write_last),
+                    "avg": _ms(self._write_total / self.written) if self.written else 0.0,
+                    "max": _ms(self._write_max),
+                },
+                "lagMs": {"last": _ms(self._lag_last), "max": _ms(self._lag_max)},
+                "syncs": self.syncs,
+                "batches": self.batches,
+                "closed": self._closed,
+            }
+
+
+class VirtualPrinter:
+    """Virtual printer that saves labels as PNG and/or JSON files, or
+    into a SQLite archive."""
+
+    VALID_OUTPUT_MODES = ("image", "json", "both", "archive")
+    VALID_WRITE_MODES = ("sync", "behind")
+    VALID_FSYNC_POLICIES = ("never", "each", "idle")
+    VALID_LAYOUTS = ("flat", "hourly")
+
+    def __init__(
+        self,
+        name: str,
+        output_path: str,
+        output_mode: str = "image",
+        write_mode: str = "sync",
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        fsync: str = "never",
+        layout: str = "flat",
+    ):
+        for setting, value, valid in (
+            ("output_mode", output_mode, self.VALID_OUTPUT_MODES),
+            ("write_mode", write_mode, self.VALID_WRITE_MODES),
+            ("fsync", fsync, self.VALID_FSYNC_POLICIES),
+            ("layout", layout, self.VALID_LAYOUTS),
+        ):
+            if value not in valid:
+                raise ValueError(
+                    f"Invalid {setting} '{value}' for virtual printer '{name}'. "
+                    f"Must be one of: {', '.join(valid)}"
+                )
         self.name = name
         self.output_path = output_path
         self.output_mode = output_mode
+        self.fsync = fsync
+        self.layout = layout
+        # Archive and index are opened on first write, so a bad one
+        # fails prints rather than building the printer registry.
+        self._archive: LabelArchive | None = None
+        self._open_lock = threading.Lock()
+        self._index: LabelIndex | None = None
         self._ensure_output_directory()
+        self._writer = WriteBehind(self, queue_size) if write_mode == "behind" else None
+
+    @classmethod
+    def from_config(cls, entry: dict) -> "VirtualPrinter":
+        """Build from one validated `config.get_virtual_printers()` entry."""
+        return cls(
+            entry["name"],
+            entry["path"],
+            output_mode=entry.get("output", "image"),
+            write_mode=entry.get("write", "sync"),
+            queue_size=entry.get("queue", DEFAULT_QUEUE_SIZE),
+            fsync=entry.get("fsync", "never"),
+            layout=entry.get("layout", "flat"),
+        )
 
     def _ensure_output_directory(self):
         """Create output directory if it doesn't exist."""
@@ -52,11 +342,38 @@ class VirtualPrinter:
         """Get display name with virtual indicator."""
         return f"{self.name} (Virtual)"
 
-    def _generate_base_path(self) -> str:
-        """Generate a unique base file path (without extension)."""
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    @property
+    def write_mode(self) -> str:
+        return "behind" if self._writer is not None else "sync"
+
+    @property
+    def archive_path(self) -> str:
+        return os.path.join(self.output_path, ARCHIVE_FILENAME)
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.output_path, INDEX_FILENAME)
+
+    @property
+    def batches_writes(self) -> bool:
+        """Whether the write-behind writer may hand `_write_batch()`
+        several labels at once (one transaction for the archive)."""
+        return self.output_mode == "archive"
+
+    def _fsync_each_file(self) -> bool:
+        # "idle" batches syncs on the writer thread; sync writes have no
+        # idle point, so they sync every file.
+        return self.fsync == "each" or (self.fsync == "idle" and self._writer is None)
+
+    def _generate_base_path(self, created: float | None = None) -> str:
+        """Generate a unique base file path (without extension), in the
+        label's hour directory for the hourly layout."""
+        now = datetime.datetime.fromtimestamp(created) if created is not None else datetime.datetime.now()
         unique_id = uuid.uuid4().hex[:8]
-        return os.path.join(self.output_path, f"label_{timestamp}_{unique_id}")
+        name = f"label_{now:%Y%m%d_%H%M%S}_{unique_id}"
+        if self.layout == "hourly" and self.output_mode != "archive":
+            return os.path.join(self.output_path, f"{now:%Y}", f"{now:%m}", f"{now:%d}", f"{now:%H}", name)
+        return os.path.join(self.output_path, name)
 
     def save_preview(self, bitmap: Image.Image, base_path: str | None = None) -> str:
         """Save preview bitmap as PNG.
@@ -69,7 +386,9 @@ class VirtualPrinter:
         """
         filepath = (base_path or self._generate_base_path()) + ".png"
         try:
-            bitmap.save(filepath, format="PNG")
+            with open(filepath, "wb") as f:
+                bitmap.save(f, format="PNG")
+                self._sync_file(f)
             LOG.info(f"Virtual printer '{self.name}' saved preview to: {filepath}")
             return filepath
         except Exception as e:
@@ -90,27 +409,164 @@ class VirtualPrinter:
         try:
             with open(filepath, "w") as f:
                 json.dump(data, f, indent=2)
+                self._sync_file(f)
             LOG.info(f"Virtual printer '{self.name}' saved JSON to: {filepath}")
             return filepath
         except Exception as e:
             LOG.error(f"Failed to save JSON to {filepath}: {e}")
             raise IOError(f"Failed to save JSON: {e}") from e
 
-    def save(
+    def _sync_file(self, f) -> None:
+        if self._fsync_each_file():
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _planned_paths(self, base_path: str) -> list[str]:
+        if self.output_mode == "archive":
+            return [self.archive_path]
+        paths: list[str] = []
+        if self.output_mode in ("image", "both"):
+            paths.append(base_path + ".png")
+        if self.output_mode in ("json", "both"):
+            paths.append(base_path + ".json")
+        return paths
+
+    def _open_archive(self) -> LabelArchive:
+        with self._open_lock:
+            if self._archive is None:
+                self._archive = LabelArchive(
+                    self.archive_path,
+                    synchronous="FULL" if self._fsync_each_file() else "NORMAL",
+                )
+            return self._archive
+
+    def _open_index(self) -> LabelIndex:
+        with self._open_lock:
+            if self._index is None:
+                self._index = LabelIndex(self.index_path)
+            return self._index
+
+    def _write_batch(self, labels: list[tuple]) -> list[str]:
+        """Write `(base_path, bitmap, widgets, settings, created, job)`
+        labels: one archive transaction, or each label's files in turn."""
+        if self.output_mode != "archive":
+            return [path for label in labels for path in self._write(*label)]
+        if not os.path.isdir(self.output_path):
+            self._ensure_output_directory()
+        try:
+            self._open_archive().append([
+                (os.path.basename(base_path), self.id, created, widgets, settings, encode_png(bitmap))
+                for base_path, bitmap, widgets, settings, created, _job in labels
+            ])
+        except (sqlite3.Error, OSError) as e:
+            LOG.error(f"Failed to archive {len(labels)} label(s) to {self.archive_path}: {e}")
+            raise IOError(f"Failed to archive label: {e}") from e
+        LOG.info(f"Virtual printer '{self.name}' archived {len(labels)} label(s) to: {self.archive_path}")
+        return [self.archive_path]
+
+    def _write(
         self,
+        base_path: str,
         preview_bitmap: Image.Image,
         widgets: list[dict],
         settings: dict,
+        created: float | None = None,
+        job: tuple[str, int] | None = None,
     ) -> list[str]:
-        """Save output based on configured output_mode.
-
-        Returns:
-            List of saved file paths.
-        """
+        """Write one label's files: inline for sync printers, on the
+        writer thread for write-behind ones."""
+        created = created if created is not None else time.time()
+        if self.output_mode == "archive":
+            return self._write_batch([(base_path, preview_bitmap, widgets, settings, created, job)])
+        # Instances are long-lived (see printer_registry), so recreate a
+        # directory removed since construction rather than fail the print.
+        if not os.path.isdir(self.output_path):
+            self._ensure_output_directory()
+        directory = os.path.dirname(base_path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                raise IOError(f"Failed to create output directory {directory}: {e}") from e
         paths: list[str] = []
-        base_path = self._generate_base_path()
         if self.output_mode in ("image", "both"):
             paths.append(self.save_preview(preview_bitmap, base_path))
         if self.output_mode in ("json", "both"):
             paths.append(self.save_json(widgets, settings, base_path))
+        if self._fsync_each_file():
+            _fsync_path(directory)
+        if self.layout == "hourly":
+            job_id, index = job if job is not None else (None, None)
+            try:
+                self._open_index().append(
+                    created, os.path.relpath(base_path, self.output_path), job_id, index,
+                    sync=self._fsync_each_file(),
+                )
+            except OSError as e:
+                LOG.error(f"Failed to index {base_path} in {self.index_path}: {e}")
+                raise IOError(f"Failed to index label: {e}") from e
         return paths
+
+    def _sync_written(self, paths: list[str]) -> None:
+        """Force what the write-behind writer wrote since its last idle
+        point (`paths`) to disk."""
+        if self.output_mode == "archive":
+            self._open_archive().checkpoint()
+            return
+        for path in paths:
+            _fsync_path(path)
+        for directory in {os.path.dirname(path) for path in paths}:
+            _fsync_path(directory)
+        if self._index is not None:
+            self._index.sync()
+
+    def save(
+        self,
+        preview_bitmap: Image.Image,
+        widgets: list[dict],
+        settings: dict,
+        job: tuple[str, int] | None = None,
+    ) -> list[str]:
+        """Save output based on configured output_mode.
+
+        In write-behind mode this queues the label and returns at once
+        (blocking only while the queue is full); the bitmap, widgets and
+        settings then belong to the writer and must not be changed.
+        `job` is the batch job id and label index that printed it, for
+        the hourly layout's index.
+
+        Returns:
+            List of saved file paths (for write-behind: where the files
+            will be once written).
+        """
+        created = time.time()
+        base_path = self._generate_base_path(created)
+        if self._writer is not None:
+            self._writer.submit(base_path, preview_bitmap, widgets, settings, created, job)
+            return self._planned_paths(base_path)
+        return self._write(base_path, preview_bitmap, widgets, settings, created, job)
+
+    def flush(self) -> None:
+        """Block until queued write-behind labels are written. No-op for
+        sync printers."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self, timeout: float = CLOSE_TIMEOUT_SECONDS) -> bool:
+        """Drain and stop the write-behind writer and close the archive
+        or index; later saves are written inline (reopening them).
+        Returns False if the writer didn't drain in time."""
+        drained = self._writer.close(timeout) if self._writer is not None else True
+        if drained:
+            with self._open_lock:
+                if self._archive is not None:
+                    self._archive.close()
+                    self._archive = None
+                if self._index is not None:
+                    self._index.close()
+                    self._index = None
+        return drained
+
+    def write_stats(self) -> dict | None:
+        """Write-behind queue depth and latency, or None for sync printers."""
+        return self._writer.stats() if self._writer is not None else None